@@ -5,6 +5,18 @@ It exposes the ASGI callable as a module-level variable named ``application``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.1/howto/deployment/asgi/
+
+Modo ASGI (uvicorn): las vistas de ``/api/async/`` esperan a Odoo sin bloquear
+el worker, así que un proceso mantiene cientos de llamadas en vuelo::
+
+    uvicorn DjangoProject.asgi:application --host 0.0.0.0 --port 8000 --workers 4
+
+o con gunicorn como gestor de procesos::
+
+    gunicorn DjangoProject.asgi:application -k uvicorn.workers.UvicornWorker --bind 0.0.0.0:8000
+
+Las rutas síncronas también funcionan bajo ASGI (Django las ejecuta en un hilo).
+Para comparar ambos modos: ``python -m bench.asgi_vs_wsgi``.
 """
 
 import os
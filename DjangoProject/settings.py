@@ -45,6 +45,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.middleware.MetricsMiddleware',  # Primero: mide también el resto de middlewares
+    'api.middleware.CompressionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -88,6 +90,31 @@ DATABASES = {
     }
 }
 
+# 🔹 Producción: con POSTGRES_DB definido se usa PostgreSQL (los datos de SQLite se
+# copian con "manage.py migrate_from_sqlite")
+if os.environ.get("POSTGRES_DB"):
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ["POSTGRES_DB"],
+            'USER': os.environ.get("POSTGRES_USER", "postgres"),
+            'PASSWORD': os.environ.get("POSTGRES_PASSWORD", ""),
+            'HOST': os.environ.get("POSTGRES_HOST", "127.0.0.1"),
+            'PORT': os.environ.get("POSTGRES_PORT", "5432"),
+            # Conexiones persistentes por worker (segundos); se comprueban antes de reutilizarlas
+            'CONN_MAX_AGE': int(os.environ.get("POSTGRES_CONN_MAX_AGE", 60)),
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {
+                'connect_timeout': int(os.environ.get("POSTGRES_CONNECT_TIMEOUT", 5)),
+                'application_name': os.environ.get("POSTGRES_APPLICATION_NAME", "api_odoo"),
+            },
+        }
+    }
+    # Con PgBouncer en modo transaction (POSTGRES_HOST/PORT apuntando a PgBouncer) los
+    # cursores del lado del servidor no sobreviven entre transacciones
+    if os.environ.get("POSTGRES_PGBOUNCER") == "1":
+        DATABASES['default']['DISABLE_SERVER_SIDE_CURSORS'] = True
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -140,44 +167,101 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# 🔹 Logging no bloqueante: los requests solo encolan; un hilo escribe en archivo/consola
+LOG_FILE = os.path.join(BASE_DIR, "api_logs.log")
+LOG_ROTATION = os.environ.get("LOG_ROTATION", "size")  # "size" o "time"
+LOG_JSON = os.environ.get("LOG_JSON", "0") == "1"
+# Fracción de los INFO que se conservan por logger (WARNING+ siempre se escriben)
+LOG_SAMPLING = {
+    "api.views": float(os.environ.get("LOG_SAMPLE_API_VIEWS", 1.0)),
+}
+
+if LOG_ROTATION == "time":
+    _log_file_handler = {
+        "class": "logging.handlers.TimedRotatingFileHandler",
+        "when": os.environ.get("LOG_ROTATE_WHEN", "midnight"),
+        "backupCount": int(os.environ.get("LOG_BACKUP_COUNT", 7)),
+    }
+else:
+    _log_file_handler = {
+        "class": "logging.handlers.RotatingFileHandler",
+        "maxBytes": int(os.environ.get("LOG_MAX_BYTES", 10 * 1024 * 1024)),
+        "backupCount": int(os.environ.get("LOG_BACKUP_COUNT", 5)),
+    }
+
+# Con varios workers solo un proceso debe escribir y rotar el archivo: si LOG_SOCKET (ruta de un
+# socket Unix) está definido, los workers envían ahí los registros y el máster de gunicorn los
+# escribe (ver gunicorn.conf.py). Sin LOG_SOCKET cada proceso escribe el archivo directamente,
+# válido solo con un proceso (runserver, un único worker)
+LOG_SOCKET = os.environ.get("LOG_SOCKET")
+
+LOG_FORMATTERS = {
+    "verbose": {
+        "format": "{levelname} {asctime} {module} {message}",
+        "style": "{",
+    },
+    "simple": {
+        "format": "{levelname} {message}",
+        "style": "{",
+    },
+    "json": {
+        "()": "api.log_handlers.JsonFormatter",
+    },
+}
+
+LOG_FILE_HANDLER = {
+    "level": "INFO",
+    "filename": LOG_FILE,
+    "formatter": "json" if LOG_JSON else "verbose",
+    "encoding": "utf-8",
+    **_log_file_handler,
+}
+
 LOGGING = {
     "version": 1,
     "disable_existing_loggers": False,
-    "formatters": {
-        "verbose": {
-            "format": "{levelname} {asctime} {module} {message}",
-            "style": "{",
-        },
-        "simple": {
-            "format": "{levelname} {message}",
-            "style": "{",
+    "formatters": LOG_FORMATTERS,
+    "filters": {
+        "sampling": {
+            "()": "api.log_handlers.SamplingFilter",
+            "rates": LOG_SAMPLING,
         },
     },
     "handlers": {
         "file": {
             "level": "INFO",
-            "class": "logging.FileHandler",
-            "filename": os.path.join(BASE_DIR, "api_logs.log"),
-            "formatter": "verbose",
-        },
+            "()": "api.log_handlers.LogSocketHandler",
+            "path": LOG_SOCKET,
+        } if LOG_SOCKET else LOG_FILE_HANDLER,
         "console": {
             "level": "INFO",
             "class": "logging.StreamHandler",
             "formatter": "simple",
         },
+        # Debe ordenarse después de "console" y "file": dictConfig configura por nombre
+        "queue": {
+            "()": "api.log_handlers.QueueListenerHandler",
+            "handlers": ["cfg://handlers.file", "cfg://handlers.console"],
+            "filters": ["sampling"],
+        },
     },
     "loggers": {
         "django": {
-            "handlers": ["file", "console"],
+            "handlers": ["queue"],
             "level": "INFO",
             "propagate": True,
         },
+        "api": {
+            "handlers": ["queue"],
+            "level": "INFO",
+            "propagate": False,
+        },
     },
 }
 
 CORS_ALLOW_ALL_ORIGINS = False  # Solo si quieres restringir accesos
 CORS_ALLOWED_ORIGINS = [
-    "https://automatizaciones-checador.tz5nlk.easypanel.host/",  # Frontend en desarrollo
+    "https://automatizaciones-checador.tz5nlk.easypanel.host",  # Frontend en desarrollo
     
 ]
 CORS_ALLOW_CREDENTIALS = True  # Si necesitas autenticación
@@ -201,3 +285,139 @@ CORS_ALLOW_HEADERS = [
     "x-csrftoken",
     "x-requested-with",
 ]
+
+# 🔹 Caché de sesiones de Odoo (UID por url/db/login), en segundos
+ODOO_SESSION_TTL = int(os.environ.get("ODOO_SESSION_TTL", 300))
+
+# 🔹 Pool de conexiones keep-alive hacia Odoo (por host), tiempos en segundos
+ODOO_HTTP_POOL = {
+    "POOL_SIZE": int(os.environ.get("ODOO_POOL_SIZE", 10)),
+    "IDLE_TIMEOUT": int(os.environ.get("ODOO_POOL_IDLE_TIMEOUT", 60)),
+    "CONNECT_TIMEOUT": float(os.environ.get("ODOO_CONNECT_TIMEOUT", 5)),
+    "READ_TIMEOUT": float(os.environ.get("ODOO_READ_TIMEOUT", 60)),
+}
+
+# 🔹 Aislamiento por instancia de Odoo: bulkhead, plazo total por llamada y circuit breaker
+ODOO_RESILIENCE = {
+    "ENABLED": os.environ.get("ODOO_RESILIENCE", "1") == "1",
+    "MAX_CONCURRENT": int(os.environ.get("ODOO_MAX_CONCURRENT", 8)),  # Llamadas en vuelo por instancia y worker
+    "ACQUIRE_TIMEOUT": float(os.environ.get("ODOO_ACQUIRE_TIMEOUT", 5)),
+    "CALL_TIMEOUT": float(os.environ.get("ODOO_CALL_TIMEOUT", 30)),
+    # Circuit breaker: se abre si en WINDOW segundos (con al menos MIN_CALLS llamadas)
+    # fallan ERROR_RATE o tardan más de SLOW_CALL_SECONDS una fracción SLOW_RATE
+    "WINDOW": 30,
+    "MIN_CALLS": 10,
+    "ERROR_RATE": 0.5,
+    "SLOW_CALL_SECONDS": 10,
+    "SLOW_RATE": 0.8,
+    "OPEN_SECONDS": int(os.environ.get("ODOO_CIRCUIT_OPEN_SECONDS", 30)),
+    # Ajustes por instancia ("host/base de datos"), p. ej. para un Odoo lento conocido
+    "OVERRIDES": {
+        # "odoo.ejemplo.com/produccion": {"CALL_TIMEOUT": 60, "MAX_CONCURRENT": 4},
+    },
+}
+
+# 🔹 Lotes de operaciones (/api/batch/)
+ODOO_BATCH_MAX_OPERATIONS = int(os.environ.get("ODOO_BATCH_MAX_OPERATIONS", 50))
+ODOO_BATCH_MAX_WORKERS = int(os.environ.get("ODOO_BATCH_MAX_WORKERS", 8))
+
+# 🔹 Tamaño máximo de página de get_records en streaming (chunk_size)
+ODOO_STREAM_MAX_CHUNK_SIZE = int(os.environ.get("ODOO_STREAM_MAX_CHUNK_SIZE", 2000))
+
+# 🔹 Compresión de respuestas (brotli si está instalado, si no gzip); por nombre de ruta en ENDPOINTS
+ODOO_COMPRESSION = {
+    "ENABLED": os.environ.get("ODOO_COMPRESSION", "1") == "1",
+    "MIN_SIZE": int(os.environ.get("ODOO_COMPRESSION_MIN_SIZE", 1024)),  # bytes
+    "GZIP_LEVEL": 6,
+    "BROTLI_QUALITY": 4,
+    "ENDPOINTS": {
+        # Respuestas grandes: menos CPU por byte
+        "get_records": {"GZIP_LEVEL": 4, "BROTLI_QUALITY": 3},
+        "async_get_records": {"GZIP_LEVEL": 4, "BROTLI_QUALITY": 3},
+        "metrics_view": {"ENABLED": False},
+    },
+}
+
+REST_FRAMEWORK = {
+    "DEFAULT_RENDERER_CLASSES": [
+        "api.fast_json.FastJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
+}
+
+# 🔹 Metadatos de fields_get y proyección de campos por defecto de get_records
+ODOO_FIELD_METADATA = {
+    "ENABLED": os.environ.get("ODOO_FIELD_METADATA", "1") == "1",
+    "TTL": int(os.environ.get("ODOO_FIELD_METADATA_TTL", 3600)),
+    # Sin "fields", excluir binarios y calculados no almacenados. Opcional: cambia las columnas
+    # que reciben los clientes que hoy no envían "fields"
+    "EXCLUDE_HEAVY": os.environ.get("ODOO_EXCLUDE_HEAVY_FIELDS", "0") == "1",
+    "DEFAULT_FIELDS": {
+        # "res.partner": ["id", "name", "email", "phone"],
+    },
+}
+
+# 🔹 Coalescencia de lecturas idénticas concurrentes a Odoo; REDIS la extiende a todos los workers
+ODOO_SINGLE_FLIGHT = {
+    "ENABLED": os.environ.get("ODOO_SINGLE_FLIGHT", "1") == "1",
+    "REDIS": os.environ.get("ODOO_SINGLE_FLIGHT_REDIS", "0") == "1",
+    "LOCK_TIMEOUT": 10,  # Segundos que un worker espera al líder antes de llamar él mismo
+    "RESULT_TTL": 2,  # Segundos que el resultado del líder queda disponible para los demás
+    "POLL_INTERVAL": 0.02,
+}
+
+# 🔹 Caché de resultados de get_records (opt-in); TTL en segundos por modelo
+ODOO_RESULT_CACHE = {
+    "ENABLED": os.environ.get("ODOO_RESULT_CACHE", "0") == "1",
+    "DEFAULT_TTL": int(os.environ.get("ODOO_RESULT_CACHE_TTL", 30)),
+    "MODEL_TTLS": {
+        # "res.partner": 120,
+        # "account.move.line": 0,  # 0 = nunca cachear
+    },
+}
+
+# 🔹 Asistencias del día para los kioscos (get_asistencia_records); tiempos en segundos
+ODOO_ATTENDANCE_CACHE = {
+    "ENABLED": os.environ.get("ODOO_ATTENDANCE_CACHE", "1") == "1",
+    "SYNC_INTERVAL": float(os.environ.get("ODOO_ATTENDANCE_SYNC_INTERVAL", 2)),
+    "FULL_SYNC_INTERVAL": int(os.environ.get("ODOO_ATTENDANCE_FULL_SYNC_INTERVAL", 300)),
+    "TTL": 86400,
+}
+
+# 🔹 Verificación de credenciales de empleados (kioscos), compartida entre workers
+ODOO_CREDENTIAL_CACHE = {
+    "ENABLED": os.environ.get("ODOO_CREDENTIAL_CACHE", "1") == "1",
+    "TTL": int(os.environ.get("ODOO_CREDENTIAL_CACHE_TTL", 120)),
+    "ITERATIONS": 20000,  # PBKDF2 sobre la contraseña; nunca se guarda en claro
+}
+
+# 🔹 Ingesta en lote de marcajes (/api/bulk_asistencia_records/)
+ODOO_ATTENDANCE_BULK = {
+    "MAX_PUNCHES": int(os.environ.get("ODOO_ATTENDANCE_BULK_MAX", 1000)),
+    "CREATE_CHUNK_SIZE": 200,
+    "DEDUP_TTL": 7 * 86400,  # Tiempo durante el que se reconoce un punch_id ya ingerido
+}
+
+# 🔹 Catálogo de res.groups por instancia (get_odoo_groups / create_user_core), en segundos
+ODOO_GROUP_CATALOG_TTL = int(os.environ.get("ODOO_GROUP_CATALOG_TTL", 600))
+
+# 🔹 Alta de usuarios en lote (/api/create_users_core/)
+ODOO_USER_BULK = {
+    "MAX_USERS": int(os.environ.get("ODOO_USER_BULK_MAX", 500)),
+    "CHUNK_SIZE": 25,  # Usuarios por llamada create
+    "MAX_WORKERS": 4,  # Llamadas create en paralelo
+}
+
+# 🔹 LRU por proceso delante de Redis para resolver tokens (TTL en segundos)
+ODOO_INSTANCE_LRU = {
+    "MAX_SIZE": int(os.environ.get("ODOO_INSTANCE_LRU_SIZE", 1024)),
+    "TTL": int(os.environ.get("ODOO_INSTANCE_LRU_TTL", 30)),
+}
+
+# 🔹 Tokens de instancia firmados (HMAC): se validan sin Redis ni BD; la revocación usa un filtro de Bloom
+ODOO_SIGNED_TOKENS = {
+    "ENABLED": os.environ.get("ODOO_SIGNED_TOKENS", "0") == "1",
+    "SYNC_INTERVAL": 2,  # Segundos entre comprobaciones de la versión de la lista de denegación
+    "BLOOM_CAPACITY": 10000,
+    "BLOOM_ERROR_RATE": 0.001,
+}
@@ -0,0 +1,182 @@
+"""Ingesta en lote de marcajes de relojes checadores que estuvieron sin conexión.
+
+Cada marcaje es ``{"punch_id", "values"}`` para un alta, o además ``"id"``
+(registro de Odoo) o ``"ref_punch_id"`` (marcaje de un alta anterior, en este
+lote o en uno previo) para una modificación. Las altas se envían con
+``create`` sobre listas; las modificaciones con los mismos valores se agrupan
+en un solo ``write`` sin alterar el orden de las que tocan un mismo registro.
+
+``punch_id`` deduplica por usuario y ``device_id`` opcional: el resultado de
+cada marcaje ingerido se guarda en la caché compartida, así que reenviar el
+lote completo tras un corte no duplica registros.
+"""
+import hashlib
+import json
+import xmlrpc.client
+from django.conf import settings
+from django.core.cache import cache
+from .attendance_cache import MODEL
+
+PENDING = "pending"
+
+
+def _config():
+    return getattr(settings, "ODOO_ATTENDANCE_BULK", {})
+
+
+def _punch_key(instance_name, scope, punch_id):
+    """Clave de deduplicación: ``punch_id`` solo es único por usuario y dispositivo (p. ej. contadores por reloj)."""
+    digest = hashlib.sha1(f"{instance_name}|{scope}|{punch_id}".encode("utf-8")).hexdigest()[:24]
+    return f"odoo_punch:{digest}"
+
+
+def _scope(client, punch):
+    return f"{client.username}|{punch.get('device_id') or ''}"
+
+
+def _chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _write_groups(client, groups, punches):
+    """Un ``write`` por grupo ``[(índice, id), ...]``, enviados juntos con ``OdooClient.batch``."""
+    if not groups:
+        return []
+    return client.batch([
+        {"model": MODEL, "method": "write", "args": [[target for _, target in members], punches[members[0][0]]["values"]]}
+        for members in groups
+    ])
+
+
+def validate(punches):
+    """Devuelve un mensaje de error o ``None`` si el lote es válido."""
+    max_items = _config().get("MAX_PUNCHES", 1000)
+    if not isinstance(punches, list) or not punches:
+        return 'El parámetro "punches" debe ser una lista no vacía'
+    if len(punches) > max_items:
+        return f"Máximo {max_items} marcajes por lote"
+    for punch in punches:
+        if not isinstance(punch, dict) or not punch.get("punch_id") or not isinstance(punch.get("values"), dict):
+            return 'Cada marcaje debe tener "punch_id" y "values"'
+    return None
+
+
+def ingest(client, instance_name, punches):
+    """Ingiere los marcajes con un cliente ya autenticado.
+
+    Devuelve un resultado por marcaje, en el mismo orden:
+    ``{"punch_id", "success": True, "record_id", "duplicate"}`` o
+    ``{"punch_id", "success": False, "error"}``.
+    """
+    config = _config()
+    results = [None] * len(punches)
+    keys = [_punch_key(instance_name, _scope(client, punch), punch["punch_id"]) for punch in punches]
+    ref_keys = {i: _punch_key(instance_name, _scope(client, punch), punch["ref_punch_id"])
+                for i, punch in enumerate(punches) if "id" not in punch and "ref_punch_id" in punch}
+    # Las referencias pueden apuntar a marcajes de lotes anteriores: se leen junto con los del lote
+    ingested = cache.get_many(list(set(keys) | set(ref_keys.values())))
+    claimed = set()
+    seen = {}
+
+    # 🔹 Deduplicación: marcajes ya ingeridos, en curso en otro request o repetidos en este lote
+    for i, (punch, key) in enumerate(zip(punches, keys)):
+        previous = ingested.get(key)
+        if key in seen:
+            results[i] = {"punch_id": punch["punch_id"], "duplicate_of": seen[key]}
+        elif previous == PENDING or (previous is None and not cache.add(key, PENDING, timeout=60)):
+            results[i] = {"punch_id": punch["punch_id"], "success": False,
+                          "error": "Marcaje en proceso en otra solicitud, reintente más tarde"}
+        elif previous is not None:
+            results[i] = {"punch_id": punch["punch_id"], "success": True, "record_id": previous, "duplicate": True}
+        else:
+            claimed.add(key)
+        seen.setdefault(key, i)
+
+    record_ids = {}  # punch_id → id de Odoo, para resolver "ref_punch_id"
+    for key, record_id in ingested.items():
+        if record_id != PENDING:
+            record_ids[key] = record_id
+
+    def done(i, record_id):
+        results[i] = {"punch_id": punches[i]["punch_id"], "success": True, "record_id": record_id,
+                      "duplicate": False}
+        record_ids[keys[i]] = record_id
+
+    try:
+        # 🔹 Altas: un create por bloque; si Odoo rechaza el bloque se repite uno a uno para aislar
+        # el error. Un error de red se propaga: Odoo pudo haber creado el bloque
+        creates = [i for i in range(len(punches))
+                   if results[i] is None and "id" not in punches[i] and "ref_punch_id" not in punches[i]]
+        for chunk in _chunks(creates, config.get("CREATE_CHUNK_SIZE", 200)):
+            try:
+                ids = client.create(MODEL, [punches[i]["values"] for i in chunk])
+                for i, record_id in zip(chunk, ids):
+                    done(i, record_id)
+            except xmlrpc.client.Fault:
+                for i in chunk:
+                    try:
+                        done(i, client.create(MODEL, punches[i]["values"]))
+                    except xmlrpc.client.Fault as e:
+                        results[i] = {"punch_id": punches[i]["punch_id"], "success": False, "error": str(e)}
+
+        # 🔹 Modificaciones en oleadas: la n-ésima modificación de cada registro va en la oleada n,
+        # así se respeta el orden por registro. Dentro de una oleada cada registro aparece una sola
+        # vez y las modificaciones con los mismos valores se agrupan en un solo write.
+        waves = []
+        writes_per_target = {}
+        for i, punch in enumerate(punches):
+            if results[i] is not None:
+                continue
+            if "id" in punch:
+                target = punch["id"]
+            else:
+                target = record_ids.get(ref_keys[i])
+                if target is None:
+                    results[i] = {"punch_id": punch["punch_id"], "success": False,
+                                  "error": f"No se encontró el marcaje de referencia {punch['ref_punch_id']}"}
+                    continue
+            wave = writes_per_target.get(target, 0)
+            writes_per_target[target] = wave + 1
+            if wave == len(waves):
+                waves.append({})
+            signature = json.dumps(punch["values"], sort_keys=True, default=str)
+            waves[wave].setdefault(signature, []).append((i, target))
+
+        for groups in waves:
+            retry = []
+            for members, outcome in zip(groups.values(), _write_groups(client, list(groups.values()), punches)):
+                if outcome["success"]:
+                    for i, target in members:
+                        done(i, target)
+                elif len(members) > 1:
+                    # Un id inválido hace fallar todo el grupo: se repite marcaje por marcaje
+                    retry.extend([member] for member in members)
+                else:
+                    i = members[0][0]
+                    results[i] = {"punch_id": punches[i]["punch_id"], "success": False, "error": outcome["error"]}
+            for members, outcome in zip(retry, _write_groups(client, retry, punches)):
+                i, target = members[0]
+                if outcome["success"]:
+                    done(i, target)
+                else:
+                    results[i] = {"punch_id": punches[i]["punch_id"], "success": False, "error": outcome["error"]}
+    finally:
+        # 🔹 Aunque una llamada a Odoo lance (circuito abierto, red) se recuerdan los ya ingeridos:
+        # reenviar el lote no debe duplicarlos. Los fallidos o sin procesar se liberan
+        ttl = config.get("DEDUP_TTL", 7 * 86400)
+        cache.set_many({keys[i]: results[i]["record_id"] for i in range(len(punches))
+                        if keys[i] in claimed and results[i] and results[i].get("success")}, timeout=ttl)
+        released = [keys[i] for i in range(len(punches))
+                    if keys[i] in claimed and not (results[i] and results[i].get("success"))]
+        if released:
+            cache.delete_many(released)
+
+    # Repetidos dentro del lote: mismo resultado que su primera aparición
+    for i, result in enumerate(results):
+        if "duplicate_of" in result:
+            first = results[result["duplicate_of"]]
+            results[i] = {**first, "punch_id": punches[i]["punch_id"]}
+            if first.get("success"):
+                results[i]["duplicate"] = True
+    return results
@@ -0,0 +1,151 @@
+"""Caché de las asistencias del día que consultan los kioscos.
+
+Una entrada por (instancia, usuario, zona horaria, día) guarda las filas de
+``asi.asistencia`` del día indexadas por id y ``last_sync``, el mayor
+``write_date`` visto. Tras la carga inicial cada consulta solo pide a Odoo las
+filas con ``write_date`` posterior; las consultas dentro de ``SYNC_INTERVAL``
+se sirven sin ninguna RPC. Las altas y cambios hechos por la API parchean la
+entrada con los valores enviados, sin leer de Odoo; si el parche falla se
+descarta la entrada del día en lugar de fallar la petición.
+
+El usuario forma parte de la clave porque las reglas de registro de Odoo
+pueden mostrar filas distintas a cada empleado. Odoo no informa de borrados:
+cada ``FULL_SYNC_INTERVAL`` segundos se recarga el día completo.
+"""
+import hashlib
+import logging
+import time
+from datetime import datetime
+import pytz
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+MODEL = "asi.asistencia"
+FIELDS = ['name', 'empleadoId', 'horaIngreso', 'horaSalidaComida', 'horaSalida', 'horaRegresoComida', 'id']
+RELATIONAL_FIELDS = {'empleadoId'}
+# write_date solo se usa para sincronizar; no se devuelve al cliente
+SYNC_FIELDS = FIELDS + ['write_date']
+
+
+def _config():
+    return getattr(settings, "ODOO_ATTENDANCE_CACHE", {})
+
+
+def day_bounds(timezone):
+    """``(día, inicio, fin)`` del día actual en la zona horaria, en el formato de Odoo."""
+    now = datetime.now(pytz.timezone(timezone))
+    start = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    end = now.replace(hour=23, minute=59, second=59, microsecond=999999)
+    return now.strftime('%Y-%m-%d'), start.strftime('%Y-%m-%d %H:%M:%S'), end.strftime('%Y-%m-%d %H:%M:%S')
+
+
+def day_domain(start, end):
+    return [['horaIngreso', '>=', start], ['horaIngreso', '<', end]]
+
+
+def _key(client, timezone, day):
+    raw = f"{client.odoo_url}|{client.db}|{client.username}"
+    return f"odoo_att:{hashlib.sha1(raw.encode('utf-8')).hexdigest()[:16]}:{timezone}:{day}"
+
+
+def _public(row):
+    return {field: value for field, value in row.items() if field != 'write_date'}
+
+
+def _newest(rows, current=None):
+    dates = [row['write_date'] for row in rows if row.get('write_date')]
+    if current:
+        dates.append(current)
+    return max(dates) if dates else None
+
+
+def _store(key, entry):
+    cache.set(key, entry, timeout=_config().get("TTL", 86400))
+
+
+def get_today(client, timezone):
+    """Filas de asistencia del día (mismo formato que ``search_read`` con ``FIELDS``)."""
+    day, start, end = day_bounds(timezone)
+    config = _config()
+    if not config.get("ENABLED"):
+        return client.search_read(MODEL, day_domain(start, end), FIELDS)
+
+    key = _key(client, timezone, day)
+    entry = cache.get(key)
+    now = time.time()
+
+    if entry is None or now - entry["loaded_at"] >= config.get("FULL_SYNC_INTERVAL", 300):
+        rows = client.search_read(MODEL, day_domain(start, end), SYNC_FIELDS)
+        entry = {"rows": {row['id']: row for row in rows}, "last_sync": _newest(rows),
+                 "loaded_at": now, "synced_at": now}
+        _store(key, entry)
+
+    elif now - entry["synced_at"] >= config.get("SYNC_INTERVAL", 2):
+        # 🔹 Solo lo modificado desde la última sincronización; ">=" porque write_date tiene resolución de segundos
+        domain = [['write_date', '>=', entry["last_sync"]]] if entry["last_sync"] else day_domain(start, end)
+        changed = client.search_read(MODEL, domain, SYNC_FIELDS)
+        for row in changed:
+            # Un cambio de horaIngreso puede sacar la fila del día
+            if start <= (row.get('horaIngreso') or '') < end:
+                entry["rows"][row['id']] = row
+            else:
+                entry["rows"].pop(row['id'], None)
+        entry["last_sync"] = _newest(changed, entry["last_sync"])
+        entry["synced_at"] = now
+        _store(key, entry)
+
+    return [_public(row) for row in entry["rows"].values()]
+
+
+def _apply(entry, row, start, end):
+    """Guarda ``row`` en la entrada (o la quita si ya no es del día)."""
+    for field in RELATIONAL_FIELDS & set(row):
+        value = row[field]
+        if isinstance(value, int) and not isinstance(value, bool):
+            # Un many2one escrito como id: se busca su nombre en otra fila de la entrada
+            known = next((r[field] for r in entry["rows"].values()
+                          if isinstance(r.get(field), list) and r[field][0] == value), None)
+            if known is None:
+                # Sin nombre conocido: la próxima consulta sincroniza y trae la fila con el formato de Odoo
+                entry["synced_at"] = 0
+                known = [value, False]
+            row[field] = known
+    if start <= (row.get('horaIngreso') or '') < end:
+        entry["rows"][row['id']] = row
+    else:
+        entry["rows"].pop(row['id'], None)
+
+
+def _patch(client, timezone, record_id, values, created):
+    if not _config().get("ENABLED"):
+        return
+    day, start, end = day_bounds(timezone)
+    key = _key(client, timezone, day)
+    try:
+        entry = cache.get(key)
+        record_id = int(record_id)
+        if entry is None or (not created and record_id not in entry["rows"]):
+            return
+        base = {field: False for field in FIELDS} if created else entry["rows"][record_id]
+        row = {**base, **{field: value for field, value in values.items() if field in FIELDS}, 'id': record_id}
+        _apply(entry, row, start, end)
+        _store(key, entry)
+    except Exception as e:
+        # El registro ya existe en Odoo: un fallo aquí no debe convertirse en un 500 (y en un reintento duplicado)
+        logger.warning(f"⚠ No se pudo parchear la caché de asistencias ({key}): {e}")
+        try:
+            cache.delete(key)
+        except Exception as e:
+            logger.error(f"❌ No se pudo invalidar la caché de asistencias ({key}): {e}")
+
+
+def patch_created(client, timezone, record_id, values):
+    """Añade a la entrada del día la fila recién creada por la API, con los valores enviados."""
+    _patch(client, timezone, record_id, values, created=True)
+
+
+def patch_updated(client, timezone, record_id, values):
+    """Aplica a la fila cacheada los valores escritos por la API."""
+    _patch(client, timezone, record_id, values, created=False)
@@ -0,0 +1,70 @@
+"""Caché compartida de verificación de credenciales de empleados (kioscos).
+
+Guarda en Redis, por (instancia, login), el UID y el nombre del usuario junto
+a un hash lento (PBKDF2) de la contraseña con sal derivada de ``SECRET_KEY``.
+Una llamada con la misma contraseña dentro del TTL no hace login en Odoo en
+ningún worker; con otra contraseña se verifica contra Odoo como siempre. Los
+logins fallidos no se cachean. Un cambio de contraseña en Odoo se nota al
+vencer el TTL.
+"""
+import hashlib
+import hmac
+from django.conf import settings
+from django.core.cache import cache
+from .odoo_client import session_cache
+
+
+def _config():
+    return getattr(settings, "ODOO_CREDENTIAL_CACHE", {})
+
+
+def _identity(client):
+    return f"{client.odoo_url}|{client.db}|{client.username}"
+
+
+def _key(client):
+    return f"odoo_cred:{hashlib.sha256(_identity(client).encode('utf-8')).hexdigest()[:24]}"
+
+
+def _digest(client):
+    salt = hmac.new(settings.SECRET_KEY.encode("utf-8"), _identity(client).encode("utf-8"), hashlib.sha256).digest()
+    iterations = _config().get("ITERATIONS", 20000)
+    return hashlib.pbkdf2_hmac("sha256", client.password.encode("utf-8"), salt, iterations).hex()
+
+
+def _read_name(client, uid):
+    user_data = client.read('res.users', [uid], ['name'])
+    return user_data[0]['name'] if user_data else "Desconocido"
+
+
+def verify(client, with_name=False):
+    """``{"uid", "name"}`` si Odoo acepta las credenciales del cliente, o ``None``.
+
+    ``name`` solo se consulta (y se cachea) si ``with_name`` es verdadero.
+    """
+    config = _config()
+    if not config.get("ENABLED"):
+        uid = client.login()
+        if not uid:
+            return None
+        return {"uid": uid, "name": _read_name(client, uid) if with_name else None}
+
+    key = _key(client)
+    digest = _digest(client)
+    entry = cache.get(key)
+    if entry and hmac.compare_digest(entry["digest"], digest):
+        # 🔹 Se siembra la caché de sesiones del proceso: las RPC siguientes tampoco hacen login
+        session_cache.set(client.session_key, entry["uid"])
+        if entry["name"] or not with_name:
+            return {"uid": entry["uid"], "name": entry["name"]}
+    else:
+        # Fallo de la caché compartida: se verifica contra Odoo, no contra la sesión local del proceso
+        uid = client.login(use_cache=False)
+        if not uid:
+            return None
+        entry = {"digest": digest, "uid": uid, "name": None}
+
+    if with_name:
+        entry["name"] = _read_name(client, entry["uid"])
+    cache.set(key, entry, timeout=config.get("TTL", 120))
+    return {"uid": entry["uid"], "name": entry["name"]}
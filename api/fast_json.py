@@ -0,0 +1,53 @@
+"""Serialización JSON rápida con ``orjson`` y respaldo en la biblioteca estándar.
+
+``dumps`` devuelve ``bytes`` en ambos casos. ``JsonResponse`` reemplaza al de
+Django con la misma firma y ``FastJSONRenderer`` hace lo mismo para las vistas
+de DRF. Los tipos que ``orjson`` no conoce (``Decimal``, cadenas perezosas...)
+pasan por ``DjangoJSONEncoder``.
+"""
+import json
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depende del entorno
+    orjson = None
+
+_django_default = DjangoJSONEncoder().default
+
+BACKEND = "orjson" if orjson else "json"
+
+
+def dumps(data):
+    if orjson is not None:
+        return orjson.dumps(data, default=_django_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(data, cls=DjangoJSONEncoder, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def loads(data):
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+class JsonResponse(HttpResponse):
+    """``django.http.JsonResponse`` serializado con ``dumps``."""
+
+    def __init__(self, data, safe=True, **kwargs):
+        if safe and not isinstance(data, dict):
+            raise TypeError("In order to allow non-dict objects to be serialized set the safe parameter to False.")
+        kwargs.setdefault("content_type", "application/json")
+        super().__init__(content=dumps(data), **kwargs)
+
+
+class FastJSONRenderer(JSONRenderer):
+    """Renderer de DRF sobre ``dumps``; la indentación pedida por el cliente usa el renderer original."""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        if self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        return dumps(data)
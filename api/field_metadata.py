@@ -0,0 +1,114 @@
+"""Metadatos de ``fields_get`` por instancia y modelo, y proyección de campos de ``get_records``.
+
+Sin ``fields`` Odoo devuelve todas las columnas, incluidas imágenes binarias y
+campos calculados. Con un ``fields`` vacío se usa, en este orden:
+
+1. La proyección configurada para el modelo (``DEFAULT_FIELDS``).
+2. Si ``EXCLUDE_HEAVY`` está activo (desactivado por defecto), todos los campos
+   salvo los binarios y los calculados no almacenados.
+3. Todas las columnas (comportamiento original).
+
+Los campos pedidos explícitamente se validan contra los metadatos cacheados
+antes de llamar a Odoo.
+"""
+import hashlib
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+
+ATTRIBUTES = ['type', 'store']
+
+
+class InvalidFields(ValueError):
+    """``fields`` no es una lista de nombres de campo válida."""
+
+
+class UnknownFields(InvalidFields):
+    """Se pidieron campos que el modelo no tiene."""
+
+    def __init__(self, model, fields):
+        self.model = model
+        self.fields = fields
+        super().__init__(f"Campos inexistentes en {model}: {', '.join(fields)}")
+
+
+def _config():
+    return getattr(settings, "ODOO_FIELD_METADATA", {})
+
+
+def _key(instance, model):
+    raw = f"{instance.url}|{instance.database}|{model}"
+    return f"odoo_fields:{hashlib.sha1(raw.encode('utf-8')).hexdigest()[:20]}"
+
+
+def get_metadata(client, instance, model):
+    """``{campo: {"type", "store"}}`` del modelo, cacheado ``TTL`` segundos."""
+    key = _key(instance, model)
+    metadata = cache.get(key)
+    if metadata is None:
+        metadata = client.execute_kw(model, 'fields_get', [], {'attributes': ATTRIBUTES})
+        cache.set(key, metadata, timeout=_config().get("TTL", 3600))
+    return metadata
+
+
+async def aget_metadata(client, instance, model):
+    """Igual que ``get_metadata`` con un ``AsyncOdooClient``."""
+    key = _key(instance, model)
+    metadata = await sync_to_async(cache.get)(key)
+    if metadata is None:
+        metadata = await client.execute_kw(model, 'fields_get', [], {'attributes': ATTRIBUTES})
+        await sync_to_async(cache.set)(key, metadata, timeout=_config().get("TTL", 3600))
+    return metadata
+
+
+def _is_heavy(spec):
+    return spec.get('type') == 'binary' or spec.get('store') is False
+
+
+def _check_type(fields):
+    # ``fields="name"`` se recorrería letra por letra
+    if not isinstance(fields, list) or not all(isinstance(field, str) for field in fields):
+        raise InvalidFields('El parámetro "fields" debe ser una lista de nombres de campo')
+
+
+def project(metadata, model, fields):
+    """Lista de campos a pedir a Odoo; lanza ``InvalidFields`` (o ``UnknownFields`` si alguno no existe)."""
+    _check_type(fields)
+    if fields:
+        unknown = [field for field in fields if field != 'id' and field not in metadata]
+        if unknown:
+            raise UnknownFields(model, unknown)
+        return fields
+
+    config = _config()
+    defaults = config.get("DEFAULT_FIELDS", {}).get(model)
+    if defaults:
+        return list(defaults)
+    if config.get("EXCLUDE_HEAVY"):
+        return [field for field, spec in metadata.items() if not _is_heavy(spec)]
+    return []
+
+
+def needs_metadata(model, fields):
+    """Si hace falta consultar los metadatos (evita la llamada cuando la respuesta no depende de ellos)."""
+    config = _config()
+    if not config.get("ENABLED"):
+        return False
+    return bool(fields) or (not config.get("DEFAULT_FIELDS", {}).get(model) and config.get("EXCLUDE_HEAVY"))
+
+
+def resolve(client, instance, model, fields):
+    """Campos a pedir en ``get_records`` (ver docstring del módulo)."""
+    _check_type(fields)
+    if not _config().get("ENABLED"):
+        return fields
+    metadata = get_metadata(client, instance, model) if needs_metadata(model, fields) else {}
+    return project(metadata, model, fields)
+
+
+async def aresolve(client, instance, model, fields):
+    _check_type(fields)
+    if not _config().get("ENABLED"):
+        return fields
+    metadata = await aget_metadata(client, instance, model) if needs_metadata(model, fields) else {}
+    return project(metadata, model, fields)
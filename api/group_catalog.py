@@ -0,0 +1,53 @@
+"""Catálogo de ``res.groups`` por instancia, cacheado con TTL.
+
+Se carga con un solo ``search_read`` y guarda, además de los grupos, un índice
+del sufijo de categoría en minúsculas (lo que sigue a la última ``"/ "`` del
+``display_name``, p. ej. ``"nivel 1"``) → ids de grupo. Así ``create_user_core``
+resuelve el ``tipo`` sin RPC y crear un usuario cuesta solo el ``create``.
+"""
+import hashlib
+import time
+from django.conf import settings
+from django.core.cache import cache
+
+FIELDS = ['id', 'name', 'display_name']
+
+
+def _key(instance):
+    raw = f"{instance.url}|{instance.database}"
+    return f"odoo_groups:{hashlib.sha1(raw.encode('utf-8')).hexdigest()[:16]}"
+
+
+def _suffix(display_name):
+    return display_name.rsplit("/ ", 1)[-1].strip().lower()
+
+
+def load(client, instance):
+    """Recarga el catálogo desde Odoo y lo deja en caché."""
+    groups = client.search_read('res.groups', [], FIELDS)
+    index = {}
+    for group in groups:
+        if "/ " in (group.get('display_name') or ''):
+            index.setdefault(_suffix(group['display_name']), []).append(group['id'])
+    catalog = {"groups": groups, "suffix_index": index, "loaded_at": time.time()}
+    cache.set(_key(instance), catalog, timeout=getattr(settings, "ODOO_GROUP_CATALOG_TTL", 600))
+    return catalog
+
+
+def get(client, instance):
+    """Catálogo vigente; solo consulta Odoo si no está en caché o venció."""
+    return cache.get(_key(instance)) or load(client, instance)
+
+
+def find_ids(catalog, tipo):
+    """Ids de los grupos cuyo ``display_name`` termina en ``/ <tipo>`` (sin distinguir mayúsculas)."""
+    ids = catalog["suffix_index"].get(tipo.strip().lower())
+    if ids is not None:
+        return list(ids)
+    # Compatibilidad: coincidencia parcial como antes (p. ej. "/ Niv"), sobre el catálogo ya cacheado
+    needle = f"/ {tipo}".lower()
+    return [group['id'] for group in catalog["groups"] if needle in (group.get('display_name') or '').lower()]
+
+
+def invalidate(instance):
+    cache.delete(_key(instance))
@@ -0,0 +1,312 @@
+"""Resolución única de tokens → instancia de Odoo.
+
+El middleware resuelve el token una sola vez por request y deja un
+``ResolvedInstance`` en ``request.odoo_instance``. Orden de búsqueda:
+
+1. LRU en memoria del proceso (TTL corto, sin I/O ni ``json.loads``).
+2. Redis (``odoo_instance_<token>``, 10 minutos).
+3. Base de datos.
+
+Al revocar un token se publica en Redis (pub/sub) para que todos los procesos
+lo saquen de su LRU de inmediato.
+
+Los tokens firmados (``signed_tokens``) se validan sin I/O: firma, expiración
+y lista de denegación (``token_denylist``) en memoria. Los datos de la
+instancia se buscan por id con el mismo orden LRU → Redis → BD, así que todos
+los tokens de una instancia comparten una entrada.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from typing import Optional
+from django.conf import settings
+from django.core.cache import cache
+from . import metrics, signed_tokens, token_denylist
+from .models import OdooInstance
+
+logger = logging.getLogger(__name__)
+
+REDIS_TTL = 600
+REVOCATION_CHANNEL = "odoo_instance_revoked"
+
+
+class InvalidToken(Exception):
+    """Token ausente, inexistente o expirado."""
+
+
+@dataclass(frozen=True)
+class ResolvedInstance:
+    id: Optional[int]
+    name: Optional[str]
+    url: str
+    database: str
+    username: str
+    password: str
+    protocol: str = "xmlrpc"
+    token_lifetime: Optional[str] = None
+    expires_at: Optional[float] = None  # timestamp UNIX
+
+    @classmethod
+    def from_model(cls, instance):
+        return cls(
+            id=instance.id,
+            name=instance.name,
+            url=instance.url,
+            database=instance.database,
+            username=instance.username,
+            password=instance.password,
+            protocol=instance.protocol,
+            token_lifetime=instance.token_lifetime,
+            expires_at=instance.expires_at.timestamp() if instance.expires_at else None,
+        )
+
+    @classmethod
+    def from_json(cls, raw):
+        data = json.loads(raw)
+        return cls(
+            id=data.get("id"),
+            name=data.get("name"),
+            url=data["url"],
+            database=data["database"],
+            username=data["username"],
+            password=data["password"],
+            protocol=data.get("protocol") or "xmlrpc",
+            token_lifetime=data.get("token_lifetime"),
+            expires_at=data.get("expires_at"),
+        )
+
+    def to_json(self):
+        return json.dumps(asdict(self))
+
+    def is_expired(self):
+        return self.expires_at is not None and time.time() > self.expires_at
+
+    def seconds_left(self):
+        return None if self.expires_at is None else self.expires_at - time.time()
+
+
+class LocalLRU:
+    """LRU por proceso con TTL corto, protegido con lock."""
+
+    def __init__(self, max_size=1024, ttl=30):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires = entry
+            if expires < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+_lru_settings = getattr(settings, "ODOO_INSTANCE_LRU", {})
+local_cache = LocalLRU(
+    max_size=_lru_settings.get("MAX_SIZE", 1024),
+    ttl=_lru_settings.get("TTL", 30),
+)
+
+
+def redis_key(token):
+    return f"odoo_instance_{token}"
+
+
+def redis_id_key(instance_id):
+    return f"odoo_instance_id_{instance_id}"
+
+
+def resolve(token):
+    """Devuelve el ``ResolvedInstance`` del token o lanza ``InvalidToken``."""
+    if not token:
+        raise InvalidToken("Falta el token en la cabecera Authorization")
+
+    _ensure_subscriber()
+
+    if signed_tokens.is_signed(token):
+        return _resolve_signed(token)
+
+    instance = local_cache.get(token)
+    metrics.record_instance_lookup("local", instance is not None)
+    if instance is None:
+        raw = cache.get(redis_key(token))
+        metrics.record_instance_lookup("redis", bool(raw))
+        if raw:
+            instance = ResolvedInstance.from_json(raw)
+            local_cache.set(token, instance)
+
+    if instance is not None:
+        if instance.is_expired():
+            forget(token)
+            raise InvalidToken("El token ha expirado")
+        return instance
+
+    return _load_from_db(token)
+
+
+def _load_from_db(token):
+    try:
+        model = OdooInstance.objects.get(token=token)
+    except OdooInstance.DoesNotExist:
+        raise InvalidToken("Token inválido")
+
+    instance = ResolvedInstance.from_model(model)
+    if instance.is_expired():
+        raise InvalidToken("El token ha expirado")
+
+    if model.token_lifetime == "once":
+        # 🔹 Un token de un solo uso se consume aquí y nunca se cachea
+        if not model.use_once_token():
+            raise InvalidToken("Token inválido")
+        logger.info(f"🔄 Token de un solo uso consumido para la instancia {model.name}")
+        return instance
+
+    timeout = REDIS_TTL
+    seconds_left = instance.seconds_left()
+    if seconds_left is not None:
+        timeout = max(1, min(REDIS_TTL, int(seconds_left)))
+    cache.set(redis_key(token), instance.to_json(), timeout=timeout)
+    local_cache.set(token, instance)
+    return instance
+
+
+def _resolve_signed(token):
+    try:
+        claims = signed_tokens.parse(token, time.time())
+    except signed_tokens.BadToken as e:
+        raise InvalidToken(str(e))
+    if token_denylist.is_revoked(claims.jti):
+        raise InvalidToken("Token revocado")
+
+    # 🔹 La LRU se indexa por "#<id>" para no chocar con los tokens opacos
+    local_key = f"#{claims.instance_id}"
+    instance = local_cache.get(local_key)
+    metrics.record_instance_lookup("local", instance is not None)
+    if instance is not None:
+        return instance
+
+    raw = cache.get(redis_id_key(claims.instance_id))
+    metrics.record_instance_lookup("redis", bool(raw))
+    if raw:
+        instance = ResolvedInstance.from_json(raw)
+    else:
+        try:
+            model = OdooInstance.objects.get(pk=claims.instance_id)
+        except OdooInstance.DoesNotExist:
+            raise InvalidToken("Token inválido")
+        instance = ResolvedInstance.from_model(model)
+        cache.set(redis_id_key(claims.instance_id), instance.to_json(), timeout=REDIS_TTL)
+    local_cache.set(local_key, instance)
+    return instance
+
+
+def forget(token):
+    """Elimina el token de Redis y de la LRU local."""
+    cache.delete(redis_key(token))
+    local_cache.delete(token)
+
+
+def forget_many(tokens, chunk_size=500):
+    """Olvida muchos tokens a la vez, por bloques: un ``DEL`` múltiple y un pipeline de avisos por bloque."""
+    connection = _redis_connection()
+    for start in range(0, len(tokens), chunk_size):
+        chunk = tokens[start:start + chunk_size]
+        cache.delete_many([redis_key(token) for token in chunk])
+        for token in chunk:
+            local_cache.delete(token)
+        if connection is None:
+            continue
+        try:
+            pipeline = connection.pipeline(transaction=False)
+            for token in chunk:
+                pipeline.publish(REVOCATION_CHANNEL, token)
+            pipeline.execute()
+        except Exception as e:
+            logger.warning(f"⚠ No se pudieron publicar las revocaciones de tokens expirados: {e}")
+
+
+def revoke(token):
+    """Olvida el token y avisa al resto de procesos para que lo quiten de su LRU.
+
+    Un token firmado se añade además a la lista de denegación.
+    """
+    forget(token)
+    token_denylist.revoke(token)
+    connection = _redis_connection()
+    if connection is not None:
+        try:
+            connection.publish(REVOCATION_CHANNEL, token)
+        except Exception as e:
+            logger.warning(f"⚠ No se pudo publicar la revocación del token: {e}")
+
+
+def _redis_connection():
+    try:
+        from django_redis import get_redis_connection
+        return get_redis_connection("default")
+    except Exception:
+        # Backend de caché sin Redis (p. ej. LocMemCache en benchmarks)
+        return None
+
+
+_subscriber_pid = None
+_subscriber_lock = threading.Lock()
+
+
+def _ensure_subscriber():
+    """Arranca (una vez por proceso, también tras un fork) el hilo que escucha revocaciones."""
+    global _subscriber_pid
+    if _subscriber_pid == os.getpid():
+        return
+    with _subscriber_lock:
+        if _subscriber_pid == os.getpid():
+            return
+        _subscriber_pid = os.getpid()
+        if _redis_connection() is None:
+            return
+        threading.Thread(target=_listen_revocations, name="odoo-token-revocations", daemon=True).start()
+
+
+def _listen_revocations():
+    while True:
+        try:
+            pubsub = _redis_connection().pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(REVOCATION_CHANNEL)
+            for message in pubsub.listen():
+                token = message.get("data")
+                if isinstance(token, bytes):
+                    token = token.decode("utf-8")
+                local_cache.delete(token)
+                claims = signed_tokens.claims_for_revocation(token)
+                if claims is not None:
+                    token_denylist.add_local(claims.jti)
+        except Exception as e:
+            logger.warning(f"⚠ Suscripción a revocaciones interrumpida, reintentando: {e}")
+            # Mientras no hay suscripción, la LRU sigue acotada por su TTL
+            local_cache.clear()
+            time.sleep(5)
@@ -0,0 +1,144 @@
+"""Piezas de logging no bloqueante usadas desde ``settings.LOGGING``.
+
+Los requests solo encolan el registro (``QueueListenerHandler``); un hilo de
+fondo lo formatea y lo escribe en los handlers reales (archivo rotado, consola).
+
+Con varios workers, cada ``RotatingFileHandler`` rotaría el mismo archivo por
+su cuenta y se perderían líneas. Con ``LOG_SOCKET`` los workers envían los
+registros por un socket Unix (``LogSocketHandler``) y un solo proceso, el
+máster de gunicorn, los escribe y rota con ``LogSocketServer``. Este módulo no
+importa Django para poder cargarse desde ``gunicorn.conf.py``.
+"""
+import atexit
+import json
+import logging
+import os
+import queue
+import random
+import socketserver
+import struct
+import threading
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, SocketHandler
+
+
+class QueueListenerHandler(QueueHandler):
+    """``QueueHandler`` que arranca su propio ``QueueListener``.
+
+    ``handlers`` se declara en ``LOGGING`` con referencias ``cfg://handlers.<nombre>``
+    para recibir los handlers ya configurados. Si la cola se llena se descarta
+    el registro en lugar de bloquear el request.
+    """
+
+    def __init__(self, handlers, queue_size=10000):
+        super().__init__(queue.Queue(maxsize=queue_size))
+        # ConvertingList solo resuelve "cfg://" al acceder por índice
+        targets = [handlers[i] for i in range(len(handlers))]
+        self.listener = QueueListener(self.queue, *targets, respect_handler_level=True)
+        self.listener.start()
+        atexit.register(self.listener.stop)
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            pass
+
+
+class SamplingFilter(logging.Filter):
+    """Deja pasar solo una fracción de los INFO de los loggers indicados.
+
+    ``rates`` mapea prefijo de logger → fracción (``{"api.views": 0.1}``).
+    WARNING y superiores siempre pasan.
+    """
+
+    def __init__(self, rates=None):
+        super().__init__()
+        self.rates = sorted((rates or {}).items(), key=lambda item: len(item[0]), reverse=True)
+
+    def filter(self, record):
+        if record.levelno != logging.INFO:
+            return True
+        for prefix, rate in self.rates:
+            if record.name == prefix or record.name.startswith(prefix + "."):
+                return random.random() < rate
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """Una línea JSON por registro, con las mismas claves que el formato ``verbose``."""
+
+    def format(self, record):
+        data = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "module": record.module,
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            data["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(data, ensure_ascii=False)
+
+
+class LogSocketHandler(SocketHandler):
+    """``SocketHandler`` que envía el registro como JSON en lugar de pickle.
+
+    Los registros de Django llevan el ``request`` en sus atributos, que no se
+    puede serializar con pickle; los valores no JSON se envían como texto.
+    """
+
+    def __init__(self, path):
+        super().__init__(path, None)
+
+    def makePickle(self, record):
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        data = dict(record.__dict__, msg=record.getMessage(), args=None, exc_info=None)
+        data.pop("message", None)
+        payload = json.dumps(data, default=str).encode("utf-8")
+        return struct.pack(">L", len(payload)) + payload
+
+
+class _LogRecordStreamHandler(socketserver.StreamRequestHandler):
+    """Lee los registros de una conexión de ``LogSocketHandler`` (longitud de 4 bytes + JSON)."""
+
+    def handle(self):
+        while True:
+            header = self.rfile.read(4)
+            if len(header) < 4:
+                return
+            length = struct.unpack(">L", header)[0]
+            data = self.rfile.read(length)
+            if len(data) < length:
+                return
+            self.server.handler.handle(logging.makeLogRecord(json.loads(data)))
+
+
+class LogSocketServer(socketserver.ThreadingUnixStreamServer):
+    """Recibe los registros de todos los workers y los escribe con un único ``handler``."""
+
+    daemon_threads = True
+
+    def __init__(self, path, handler):
+        if os.path.exists(path):
+            os.remove(path)
+        self.path = path
+        self.handler = handler
+        # Solo procesos del mismo usuario pueden escribir en el log
+        old_umask = os.umask(0o177)
+        try:
+            super().__init__(path, _LogRecordStreamHandler)
+        finally:
+            os.umask(old_umask)
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, name="log-socket-server", daemon=True).start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+        self.handler.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
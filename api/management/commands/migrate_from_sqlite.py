@@ -0,0 +1,71 @@
+import os
+import shutil
+import tempfile
+from django.apps import apps
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+SOURCE_ALIAS = "sqlite_source"
+# En orden de dependencias; los usuarios del admin se vuelven a crear con createsuperuser
+MODELS = ["api.OdooInstance", "api.RevokedToken"]
+
+
+class Command(BaseCommand):
+    help = "Copia las instancias y revocaciones de la base SQLite a la base configurada (p. ej. PostgreSQL)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--source", default=str(settings.BASE_DIR / "db.sqlite3"), help="Ruta del db.sqlite3 de origen")
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument("--replace", action="store_true", help="Vaciar antes las tablas de destino")
+
+    def handle(self, *args, **options):
+        target = connections[DEFAULT_DB_ALIAS]
+        if target.vendor == "sqlite" and str(target.settings_dict["NAME"]) == options["source"]:
+            raise CommandError("El origen y el destino son la misma base SQLite (¿falta POSTGRES_DB?)")
+
+        if not os.path.exists(options["source"]):
+            raise CommandError(f"No existe {options['source']}")
+
+        # 🔹 El origen puede estar en una migración anterior (sin columnas o tablas nuevas):
+        # se migra una copia temporal para leerla con los modelos actuales sin tocar el original
+        fd, copy_path = tempfile.mkstemp(suffix=".sqlite3")
+        os.close(fd)
+        shutil.copyfile(options["source"], copy_path)
+        try:
+            self._copy(target, copy_path, options)
+        finally:
+            if SOURCE_ALIAS in connections:
+                connections[SOURCE_ALIAS].close()
+            os.remove(copy_path)
+        self.stdout.write(self.style.SUCCESS("Migración desde SQLite completada"))
+
+    def _copy(self, target, source_path, options):
+        # Alias temporal para leer el origen con el ORM (tipos y zonas horarias correctos)
+        connections.settings[SOURCE_ALIAS] = connections.configure_settings({
+            **connections.settings,
+            SOURCE_ALIAS: {"ENGINE": "django.db.backends.sqlite3", "NAME": source_path},
+        })[SOURCE_ALIAS]
+
+        call_command("migrate", database=SOURCE_ALIAS, verbosity=0)
+        call_command("migrate", database=DEFAULT_DB_ALIAS, verbosity=0)
+        models = [apps.get_model(label) for label in MODELS]
+
+        with transaction.atomic(using=DEFAULT_DB_ALIAS):
+            for model in models:
+                if model.objects.using(DEFAULT_DB_ALIAS).exists():
+                    if not options["replace"]:
+                        raise CommandError(f"{model._meta.label} ya tiene datos en el destino (usa --replace)")
+                    model.objects.using(DEFAULT_DB_ALIAS).all().delete()
+
+            for model in models:
+                rows = list(model.objects.using(SOURCE_ALIAS).order_by("pk"))
+                model.objects.using(DEFAULT_DB_ALIAS).bulk_create(rows, batch_size=options["batch_size"])
+                self.stdout.write(f"{model._meta.label}: {len(rows)} filas copiadas")
+
+            # Las filas llegan con su id: las secuencias de PostgreSQL deben continuar después del mayor
+            with target.cursor() as cursor:
+                for sql in target.ops.sequence_reset_sql(no_style(), models):
+                    cursor.execute(sql)
@@ -0,0 +1,25 @@
+import time
+from django.core.management.base import BaseCommand
+from api import token_sweep
+
+
+class Command(BaseCommand):
+    help = "Expira los tokens vencidos de OdooInstance y purga sus claves de Redis"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--interval", type=float, default=0,
+                            help="Repetir cada N segundos (0 = una sola pasada)")
+        parser.add_argument("--chunk-size", type=int, default=500, help="Claves de Redis por pipeline")
+        parser.add_argument("--dry-run", action="store_true", help="Solo contar, sin modificar nada")
+
+    def handle(self, *args, **options):
+        while True:
+            summary = token_sweep.sweep(chunk_size=options["chunk_size"], dry_run=options["dry_run"])
+            prefix = "[dry-run] " if options["dry_run"] else ""
+            self.stdout.write(
+                f"{prefix}Tokens expirados: {summary['expired']}, "
+                f"revocaciones vencidas: {summary['revocations_purged']}"
+            )
+            if not options["interval"]:
+                return
+            time.sleep(options["interval"])
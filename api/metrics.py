@@ -0,0 +1,95 @@
+"""Métricas Prometheus de la API (expuestas en ``/api/metrics/``).
+
+Con varios workers (gunicorn/uvicorn) cada proceso tiene sus propios
+contadores: hay que definir ``PROMETHEUS_MULTIPROC_DIR`` con un directorio
+vacío antes de arrancar para que ``prometheus_client`` los escriba en disco y
+la vista los agregue. ``gunicorn.conf.py`` limpia el directorio al arrancar y
+marca los workers muertos para que no cuenten en el gauge de requests en curso.
+"""
+import os
+import time
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+# 🔹 Los gauges abren su archivo en el directorio al importarse: debe existir en
+# cualquier proceso (manage.py, uvicorn...), no solo bajo gunicorn
+if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+    os.makedirs(os.environ["PROMETHEUS_MULTIPROC_DIR"], exist_ok=True)
+
+from prometheus_client import Counter, Gauge, Histogram  # noqa: E402
+
+# Odoo suele tardar más que una vista típica: los buckets llegan a 30 s
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+REQUEST_LATENCY = Histogram(
+    "odoo_api_request_duration_seconds", "Latencia de las vistas de la API",
+    ["view", "method", "status"], buckets=LATENCY_BUCKETS,
+)
+REQUESTS_IN_FLIGHT = Gauge(
+    "odoo_api_requests_in_flight", "Requests en curso", multiprocess_mode="livesum",
+)
+REQUEST_EXCEPTIONS = Counter(
+    "odoo_api_exceptions_total", "Excepciones no capturadas por las vistas", ["view", "exception"],
+)
+RPC_LATENCY = Histogram(
+    "odoo_rpc_duration_seconds", "Latencia de las llamadas RPC a Odoo",
+    ["instance", "model", "method"], buckets=LATENCY_BUCKETS,
+)
+RPC_ERRORS = Counter(
+    "odoo_rpc_errors_total", "Errores de las llamadas RPC a Odoo",
+    ["instance", "model", "method", "exception"],
+)
+INSTANCE_CACHE_LOOKUPS = Counter(
+    "odoo_instance_cache_lookups_total", "Búsquedas de tokens odoo_instance_* por capa de caché",
+    ["layer", "result"],
+)
+RPC_REJECTED = Counter(
+    "odoo_rpc_rejected_total", "Llamadas a Odoo rechazadas sin enviarse (circuito abierto o bulkhead lleno)",
+    ["instance", "reason"],
+)
+# 0 = cerrado, 1 = semiabierto, 2 = abierto; con varios workers se publica el peor de los vivos
+# ("livemax": mark_process_dead borra el valor de un worker muerto)
+CIRCUIT_STATE = Gauge(
+    "odoo_circuit_state", "Estado del circuit breaker por instancia de Odoo", ["instance"],
+    multiprocess_mode="livemax",
+)
+CIRCUIT_STATE_VALUES = {"closed": 0, "half_open": 1, "open": 2}
+RPC_COALESCED = Counter(
+    "odoo_rpc_coalesced_total", "Lecturas a Odoo servidas por una llamada idéntica en vuelo",
+    ["method", "scope"],
+)
+
+
+def instance_label(odoo_url, db):
+    """``host/base de datos``: acota la cardinalidad y no expone credenciales."""
+    return f"{urlsplit(odoo_url).netloc or odoo_url}/{db}"
+
+
+@contextmanager
+def observe_rpc(odoo_url, db, model, method):
+    """Mide una llamada a Odoo; también sirve alrededor de un ``await``."""
+    labels = (instance_label(odoo_url, db), model, method)
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception as e:
+        RPC_ERRORS.labels(*labels, type(e).__name__).inc()
+        raise
+    finally:
+        RPC_LATENCY.labels(*labels).observe(time.perf_counter() - start)
+
+
+def record_instance_lookup(layer, hit):
+    INSTANCE_CACHE_LOOKUPS.labels(layer, "hit" if hit else "miss").inc()
+
+
+def record_coalesced(method, scope):
+    RPC_COALESCED.labels(method, scope).inc()
+
+
+def record_rejected(instance, reason):
+    RPC_REJECTED.labels(instance, reason).inc()
+
+
+def set_circuit_state(instance, state):
+    CIRCUIT_STATE.labels(instance).set(CIRCUIT_STATE_VALUES[state])
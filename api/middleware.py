@@ -1,46 +1,183 @@
-from django.core.cache import cache
-from django.http import JsonResponse
+import gzip
+import re
+import time
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
 from django.utils.deprecation import MiddlewareMixin
-from .models import OdooInstance
-import json
+from django.utils.text import compress_sequence
+from . import instance_resolver, metrics
+from .fast_json import JsonResponse
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - brotli es opcional
+    brotli = None
 
 class OdooInstanceMiddleware:
-    """ Middleware para autenticar instancias de Odoo con tokens y caché en Redis """
+    """ Middleware para autenticar instancias de Odoo con tokens (ver ``instance_resolver``) """
     EXCLUDED_PATHS = ["/api/register_odoo_instance/", "/api/revoke_token/", "/api/verify_odoo_user/", "/api/get_asistencia_records/",
-                      "/api/create_asistencia_record/","/api/update_asistencia_record/","/api/logs/"]
+                      "/api/create_asistencia_record/","/api/update_asistencia_record/","/api/bulk_asistencia_records/","/api/logs/", "/api/logs/stream/",
+                      "/api/async/get_asistencia_records/", "/api/async/create_asistencia_record/",
+                      "/api/async/update_asistencia_record/", "/api/metrics/", "/api/odoo_circuits/"]
+
+    sync_capable = True
+    async_capable = True
 
     def __init__(self, get_response):
         self.get_response = get_response
+        # 🔹 Bajo ASGI el middleware no debe retener un hilo mientras la vista espera a Odoo
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
 
     def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        error = self.authenticate(request)
+        if error:
+            return error
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        error = await sync_to_async(self.authenticate)(request)
+        if error:
+            return error
+        return await self.get_response(request)
+
+    def authenticate(self, request):
+        """ Asigna ``request.odoo_instance`` o devuelve la respuesta de error """
 
         if request.path in self.EXCLUDED_PATHS:
-            return self.get_response(request)
+            return None
 
-        token = request.headers.get("Authorization")
+        try:
+            # 🔹 LRU local → Redis → BD, una sola vez por request
+            instance = instance_resolver.resolve(request.headers.get("Authorization"))
+        except instance_resolver.InvalidToken as e:
+            return JsonResponse({"error": str(e)}, status=401)
 
-        if not token:
-            return JsonResponse({"error": "Falta el token en la cabecera Authorization"}, status=401)
+        request.odoo_instance = instance  # Asignamos la instancia al request
+        return None
 
-        # 🔹 Intentamos obtener la instancia desde la caché de Redis
-        instance = cache.get(f"odoo_instance_{token}")
 
-        if not instance:
-            try:
-                instance = OdooInstance.objects.get(token=token)
-                # 🔹 Guardamos la instancia en Redis para acelerar futuras solicitudes
+class MetricsMiddleware:
+    """ Mide latencia, requests en curso y excepciones por vista (ver ``metrics``) """
 
-                instance_data = {
-                    "url": instance.url,
-                    "database": instance.database,
-                    "username": instance.username,
-                    "password": instance.password,
-                }
+    sync_capable = True
+    async_capable = True
 
-                cache.set(f"odoo_instance_{instance.token}", json.dumps(instance_data),
-                          timeout=600)  # Cache por 10 minutos
-            except OdooInstance.DoesNotExist:
-                return JsonResponse({"error": "Token inválido"}, status=401)
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
 
-        request.odoo_instance = instance  # Asignamos la instancia al request
-        return self.get_response(request)
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        start = time.perf_counter()
+        metrics.REQUESTS_IN_FLIGHT.inc()
+        try:
+            response = self.get_response(request)
+        finally:
+            metrics.REQUESTS_IN_FLIGHT.dec()
+        self.observe(request, response, start)
+        return response
+
+    async def __acall__(self, request):
+        start = time.perf_counter()
+        metrics.REQUESTS_IN_FLIGHT.inc()
+        try:
+            response = await self.get_response(request)
+        finally:
+            metrics.REQUESTS_IN_FLIGHT.dec()
+        self.observe(request, response, start)
+        return response
+
+    def process_exception(self, request, exception):
+        # Django convierte la excepción en un 500 después; aquí solo se cuenta
+        metrics.REQUEST_EXCEPTIONS.labels(self.view_name(request), type(exception).__name__).inc()
+        return None
+
+    @staticmethod
+    def view_name(request):
+        match = getattr(request, "resolver_match", None)
+        # 🔹 Se usa el nombre de la ruta, no el path: los 404 no crean series nuevas
+        return (match.url_name or match.view_name) if match else "unmatched"
+
+    def observe(self, request, response, start):
+        metrics.REQUEST_LATENCY.labels(self.view_name(request), request.method, response.status_code).observe(
+            time.perf_counter() - start
+        )
+
+
+_accept_encoding_re = re.compile(r"\s*([a-z*]+)\s*(?:;\s*q=([0-9.]+))?")
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """ Comprime respuestas con brotli o gzip según ``Accept-Encoding`` (ver ``ODOO_COMPRESSION``)
+
+    El umbral y el nivel se ajustan por nombre de ruta en ``ENDPOINTS``; los
+    streams se comprimen con gzip por partes y los SSE nunca se comprimen.
+    """
+
+    def process_response(self, request, response):
+        if response.has_header("Content-Encoding") or response.status_code == 206:
+            return response
+        if response.get("Content-Type", "").startswith("text/event-stream"):
+            return response
+
+        options = self.options(request)
+        if not options.get("ENABLED", True):
+            return response
+
+        patch_vary_headers(response, ("Accept-Encoding",))
+        encoding = self.negotiate(request.headers.get("Accept-Encoding", ""), streaming=response.streaming)
+        if encoding is None:
+            return response
+
+        if response.streaming:
+            if response.is_async:
+                # Los streams async se dejan sin comprimir
+                return response
+            response.streaming_content = compress_sequence(response.streaming_content)
+            del response.headers["Content-Length"]
+        else:
+            if len(response.content) < options.get("MIN_SIZE", 1024):
+                return response
+            if encoding == "br":
+                compressed = brotli.compress(response.content, quality=options.get("BROTLI_QUALITY", 4))
+            else:
+                compressed = gzip.compress(response.content, compresslevel=options.get("GZIP_LEVEL", 6), mtime=0)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response.headers["Content-Length"] = str(len(compressed))
+
+        # Como GZipMiddleware: un ETag fuerte deja de ser válido para el cuerpo comprimido
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response.headers["ETag"] = "W/" + etag
+        response.headers["Content-Encoding"] = encoding
+        return response
+
+    @staticmethod
+    def options(request):
+        config = getattr(settings, "ODOO_COMPRESSION", {})
+        match = getattr(request, "resolver_match", None)
+        endpoint = config.get("ENDPOINTS", {}).get(match.url_name, {}) if match else {}
+        return {**config, **endpoint}
+
+    @staticmethod
+    def negotiate(header, streaming=False):
+        """ ``"br"``, ``"gzip"`` o ``None`` según las preferencias (q) del cliente """
+        accepted = {}
+        for part in header.lower().split(","):
+            match = _accept_encoding_re.match(part)
+            if match:
+                accepted[match[1]] = float(match[2] or 1)
+        wildcard = accepted.get("*", 0)
+        candidates = ["gzip"] if streaming or brotli is None else ["br", "gzip"]
+        best = max(candidates, key=lambda name: accepted.get(name, wildcard))
+        return best if accepted.get(best, wildcard) > 0 else None
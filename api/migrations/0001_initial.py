@@ -0,0 +1,24 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OdooInstance',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True)),
+                ('url', models.URLField()),
+                ('database', models.CharField(max_length=100)),
+                ('username', models.CharField(max_length=100)),
+                ('password', models.CharField(max_length=255)),
+                ('token', models.CharField(blank=True, max_length=255, null=True, unique=True)),
+            ],
+        ),
+    ]
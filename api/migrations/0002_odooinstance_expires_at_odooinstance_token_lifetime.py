@@ -0,0 +1,21 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='odooinstance',
+            name='expires_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='odooinstance',
+            name='token_lifetime',
+            field=models.CharField(choices=[('once', 'Una vez'), ('30d', '30 días'), ('60d', '60 días'), ('forever', 'Para siempre')], default='30d', max_length=10),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.4 on 2026-10-18 18:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0002_odooinstance_expires_at_odooinstance_token_lifetime'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='odooinstance',
+            name='protocol',
+            field=models.CharField(choices=[('xmlrpc', 'XML-RPC'), ('jsonrpc', 'JSON-RPC')], default='xmlrpc', max_length=10),
+        ),
+    ]
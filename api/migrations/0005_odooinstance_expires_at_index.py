@@ -0,0 +1,18 @@
+# Generated by Django 5.0.4 on 2026-10-18 18:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_revokedtoken'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='odooinstance',
+            name='expires_at',
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+    ]
@@ -1,8 +1,16 @@
 from django.db import models
+from django.db.models import Q
 import uuid
 from django.contrib.auth.hashers import make_password, check_password
-from datetime import timedelta, datetime, timezone
+from datetime import timedelta
 from django.utils.timezone import now
+from . import signed_tokens
+
+
+class OdooInstanceQuerySet(models.QuerySet):
+    def expired(self, at=None):
+        """ Instancias con un token cuya expiración ya pasó (usa el índice de ``expires_at``) """
+        return self.filter(expires_at__lte=at or now(), token__isnull=False)
 
 
 class OdooInstance(models.Model):
@@ -12,27 +20,48 @@ class OdooInstance(models.Model):
     username = models.CharField(max_length=100)
     password = models.CharField(max_length=255)  # 🔒 Guardado encriptado
     token = models.CharField(max_length=255, null=True, blank=True, unique=True)
-    expires_at = models.DateTimeField(null=True, blank=True)
+    expires_at = models.DateTimeField(null=True, blank=True, db_index=True)
     token_lifetime = models.CharField(
         max_length=10,
         choices=[("once", "Una vez"), ("30d", "30 días"), ("60d", "60 días"), ("forever", "Para siempre")],
         default="30d"
     )
+    protocol = models.CharField(
+        max_length=10,
+        choices=[("xmlrpc", "XML-RPC"), ("jsonrpc", "JSON-RPC")],
+        default="xmlrpc"
+    )
+
+    objects = OdooInstanceQuerySet.as_manager()
+
+    def generate_token(self, lifetime="forever"):
+        """ Genera un token único para la instancia y calcula su expiración.
 
-    def generate_token(self, lifetime=None):
-        """ Genera un nuevo token con la expiración correcta """
-        self.token = str(uuid.uuid4())
+        ``lifetime`` es ``"once"`` (un solo uso, 10 minutos), ``"<n>d"`` o
+        ``"forever"``. Con ``ODOO_SIGNED_TOKENS`` activo el token es firmado
+        (salvo ``once``) y el token firmado anterior queda revocado.
+        """
+        from api import instance_resolver  # instance_resolver importa este módulo
 
-        if lifetime is None:
-            lifetime = self.token_lifetime
+        previous = self.token
+        self.token_lifetime = lifetime
 
         if lifetime == "forever":
             self.expires_at = None
+        elif lifetime == "once":
+            self.expires_at = now() + timedelta(minutes=10)
+        else:
+            self.expires_at = now() + timedelta(days=int(lifetime.replace("d", "")))
+
+        if self.pk and lifetime != "once" and signed_tokens.enabled():
+            self.token = signed_tokens.issue(self.pk, lifetime, self.expires_at)
         else:
-            days = int(lifetime.replace("d", ""))
-            self.expires_at = now() + timedelta(days=days)
+            self.token = str(uuid.uuid4())
 
         self.save()
+        if previous:
+            # 🔹 El token anterior deja de valer también en las cachés (y en la lista de denegación si era firmado)
+            instance_resolver.revoke(previous)
 
     def save(self, *args, **kwargs):
         # """Sobreescribir el método save() para encriptar la contraseña antes de guardar."""
@@ -44,43 +73,41 @@ class OdooInstance(models.Model):
         """Verifica si la contraseña ingresada coincide con la almacenada encriptada."""
         return check_password(raw_password, self.password)
 
-    def generate_token(self, lifetime="30d"):
-        """Genera un token único para la instancia de Odoo"""
-        self.token = str(uuid.uuid4())
-        self.expires_at = None if lifetime == "forever" else timezone.now() + timedelta(
-            days=int(lifetime.replace("d", "")))
-        self.save()
-
-    def generate_token(self, lifetime="forever"):
-        """ Genera un token único para la instancia """
-        self.token = str(uuid.uuid4())
-        self.token_lifetime = lifetime
-
-        if lifetime =="30d":
-            self.expires_at = datetime.now() + timedelta(days=30)
-        elif lifetime =="60d":
-            self.expires_at = datetime.now() + timedelta(days=60)
-        elif lifetime =="once":
-            self.expires_at = datetime.now() + timedelta(minutes=10)
-        else:
-            self.expires_at = None
-
-        self.save()
-
-    def is_token_expierd(self):
-        """vefifica que el token no este expirado"""
+    def is_token_expired(self):
+        """ Verifica si el token ya expiró (los tokens ``forever`` nunca expiran) """
         if self.token_lifetime == "forever":
-            return False #nunca expira
-        if self.expires_at and datetime.now() > self.expires_at:
-            return True
-        return False
+            return False
+        return self.expires_at is not None and now() > self.expires_at
+
+    # Alias con el nombre original (con errata), por compatibilidad
+    is_token_expierd = is_token_expired
 
     def use_once_token(self):
-        """Verifica si el token es de uso único y lo elimina"""
-        if self.token_lifetime == "once":
+        """ Consume un token de uso único con un ``UPDATE`` condicionado al token actual.
+
+        Devuelve ``True`` solo en la petición que lo consumió: si dos peticiones
+        concurrentes presentan el mismo token, la segunda no actualiza ninguna fila.
+        """
+        if self.token_lifetime != "once" or not self.token:
+            return False
+        consumed = OdooInstance.objects.filter(
+            Q(expires_at__isnull=True) | Q(expires_at__gt=now()),
+            pk=self.pk, token=self.token, token_lifetime="once",
+        ).update(token=None, expires_at=None)
+        if consumed:
             self.token = None
             self.expires_at = None
-            self.save()
+        return bool(consumed)
 
     def __str__(self):
         return f"{self.name} - {self.token_lifetime}"
+
+
+class RevokedToken(models.Model):
+    """ Tokens firmados revocados antes de expirar; origen de ``token_denylist`` """
+    jti = models.CharField(max_length=32, unique=True)
+    expires_at = models.DateTimeField(null=True, blank=True)
+    revoked_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.jti
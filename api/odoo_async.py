@@ -0,0 +1,298 @@
+import asyncio
+import itertools
+import ssl
+import weakref
+import xmlrpc.client
+from collections import deque
+from urllib.parse import urlsplit
+from django.conf import settings
+from api import fast_json, metrics, resilience, single_flight
+from api.odoo_client import SessionCache, is_access_denied, session_cache
+
+
+class AsyncConnectionPool:
+    """Pool de conexiones HTTP/1.1 keep-alive sobre ``asyncio`` para un event loop.
+
+    Equivalente asíncrono de ``odoo_transport.ConnectionPool``: un worker ASGI
+    puede tener cientos de llamadas a Odoo en vuelo sin bloquear hilos.
+    """
+
+    def __init__(self, pool_size=10, idle_timeout=60, connect_timeout=5, read_timeout=60):
+        self.pool_size = pool_size
+        self.idle_timeout = idle_timeout
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self._idle = {}
+        self._ssl_context = ssl.create_default_context()
+
+    async def acquire(self, scheme, host):
+        loop = asyncio.get_running_loop()
+        idle = self._idle.get((scheme, host))
+        while idle:
+            reader, writer, last_used = idle.pop()
+            if loop.time() - last_used <= self.idle_timeout and not reader.at_eof() and not writer.is_closing():
+                return reader, writer, True
+            writer.close()
+
+        hostname, _, port = host.partition(":")
+        port = int(port) if port else (443 if scheme == "https" else 80)
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection(hostname, port, ssl=self._ssl_context if scheme == "https" else None),
+            self.connect_timeout,
+        )
+        return reader, writer, False
+
+    def release(self, scheme, host, reader, writer):
+        idle = self._idle.setdefault((scheme, host), deque())
+        if len(idle) < self.pool_size:
+            idle.append((reader, writer, asyncio.get_running_loop().time()))
+        else:
+            writer.close()
+
+    async def post(self, url, body, content_type):
+        """POST keep-alive; devuelve ``(status, cuerpo)``.
+
+        Reintenta una vez solo si falla el envío por un socket reutilizado que
+        Odoo cerró; un fallo al leer la respuesta no se reintenta (un create o
+        write pudo haberse aplicado ya).
+        """
+        parts = urlsplit(url)
+        host = parts.netloc
+        path = parts.path or "/"
+        request = (
+            f"POST {path} HTTP/1.1\r\n"
+            f"Host: {host}\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            "Connection: keep-alive\r\n"
+            "\r\n"
+        ).encode("latin-1") + body
+
+        for attempt in (0, 1):
+            reader, writer, reused = await self.acquire(parts.scheme, host)
+            try:
+                writer.write(request)
+                await writer.drain()
+            except ConnectionError:
+                writer.close()
+                if not reused or attempt:
+                    raise
+                continue
+            except BaseException:
+                writer.close()
+                raise
+            try:
+                status, data, keep_alive = await asyncio.wait_for(_read_response(reader), self.read_timeout)
+            except BaseException:
+                writer.close()
+                raise
+
+            if keep_alive:
+                self.release(parts.scheme, host, reader, writer)
+            else:
+                writer.close()
+            return status, data
+
+
+async def _read_response(reader):
+    status_line = await reader.readuntil(b"\r\n")
+    version, status, _ = status_line.decode("latin-1").split(" ", 2)
+    headers = {}
+    while True:
+        line = await reader.readuntil(b"\r\n")
+        if line == b"\r\n":
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+    if headers.get("transfer-encoding", "").lower() == "chunked":
+        chunks = []
+        while True:
+            size = int((await reader.readuntil(b"\r\n")).split(b";")[0], 16)
+            if not size:
+                await reader.readuntil(b"\r\n")
+                break
+            chunks.append(await reader.readexactly(size))
+            await reader.readexactly(2)
+        data = b"".join(chunks)
+    elif "content-length" in headers:
+        data = await reader.readexactly(int(headers["content-length"]))
+    else:
+        return int(status), await reader.read(), False
+
+    connection = headers.get("connection", "").lower()
+    keep_alive = connection != "close" and (version == "HTTP/1.1" or connection == "keep-alive")
+    return int(status), data, keep_alive
+
+
+# 🔹 Un pool por event loop: los sockets de asyncio no pueden cruzar loops
+_pools = weakref.WeakKeyDictionary()
+
+
+def get_pool():
+    loop = asyncio.get_running_loop()
+    pool = _pools.get(loop)
+    if pool is None:
+        pool_settings = getattr(settings, "ODOO_HTTP_POOL", {})
+        pool = _pools[loop] = AsyncConnectionPool(
+            pool_size=pool_settings.get("POOL_SIZE", 10),
+            idle_timeout=pool_settings.get("IDLE_TIMEOUT", 60),
+            connect_timeout=pool_settings.get("CONNECT_TIMEOUT", 5),
+            read_timeout=pool_settings.get("READ_TIMEOUT", 60),
+        )
+    return pool
+
+
+class AsyncXmlRpcBackend:
+    def __init__(self, odoo_url):
+        self.odoo_url = odoo_url
+
+    async def call(self, service, method, *args):
+        url = f"{self.odoo_url}/xmlrpc/2/{service}"
+        body = xmlrpc.client.dumps(args, method).encode("utf-8")
+        status, data = await get_pool().post(url, body, "text/xml")
+        if status != 200:
+            raise xmlrpc.client.ProtocolError(url, status, "", {})
+        # loads() lanza xmlrpc.client.Fault si Odoo devolvió un error
+        return xmlrpc.client.loads(data)[0][0]
+
+
+class AsyncJsonRpcBackend:
+    def __init__(self, odoo_url):
+        self.odoo_url = odoo_url
+        self._ids = itertools.count(1)
+
+    async def call(self, service, method, *args):
+        url = f"{self.odoo_url}/jsonrpc"
+        payload = {
+            "jsonrpc": "2.0",
+            "method": "call",
+            "params": {"service": service, "method": method, "args": list(args)},
+            "id": next(self._ids),
+        }
+        status, data = await get_pool().post(url, fast_json.dumps(payload), "application/json")
+        if status != 200:
+            raise xmlrpc.client.ProtocolError(url, status, "", {})
+        response = fast_json.loads(data)
+        error = response.get("error")
+        if error:
+            data = error.get("data") or {}
+            message = data.get("message") or error.get("message")
+            if data.get("name"):
+                message = f"{data['name']}: {message}"
+            raise xmlrpc.client.Fault(error.get("code", 0), message)
+        return response.get("result")
+
+
+ASYNC_BACKENDS = {
+    "xmlrpc": AsyncXmlRpcBackend,
+    "jsonrpc": AsyncJsonRpcBackend,
+}
+
+
+class AsyncOdooClient:
+    """Versión ``asyncio`` de ``OdooClient``; comparte la caché de sesiones del proceso."""
+
+    def __init__(self, odoo_url, db, username, password, protocol="xmlrpc"):
+        if protocol not in ASYNC_BACKENDS:
+            raise ValueError(f"Protocolo de Odoo no soportado: {protocol}")
+        self.odoo_url = odoo_url
+        self.db = db
+        self.username = username
+        self.password = password
+        self.protocol = protocol
+        self.backend = ASYNC_BACKENDS[protocol](odoo_url)
+
+    @classmethod
+    def from_instance(cls, instance, username=None, password=None):
+        if isinstance(instance, dict):
+            data = instance
+        else:
+            data = {
+                "url": instance.url,
+                "database": instance.database,
+                "username": instance.username,
+                "password": instance.password,
+                "protocol": instance.protocol,
+            }
+        return cls(
+            data["url"],
+            data["database"],
+            username or data["username"],
+            password or data["password"],
+            protocol=data.get("protocol") or "xmlrpc",
+        )
+
+    @property
+    def session_key(self):
+        return SessionCache.make_key(self.odoo_url, self.db, self.username, self.password)
+
+    async def login(self, use_cache=True):
+        key = self.session_key
+        if use_cache:
+            uid = session_cache.get(key)
+            if uid:
+                return uid
+
+        async with resilience.aguard(self.odoo_url, self.db):
+            with metrics.observe_rpc(self.odoo_url, self.db, "res.users", "authenticate"):
+                uid = await self.backend.call("common", "authenticate", self.db, self.username, self.password, {})
+        if not uid:
+            session_cache.invalidate(key)
+            return False
+        session_cache.set(key, uid)
+        return uid
+
+    async def authenticate(self, use_cache=True):
+        uid = await self.login(use_cache=use_cache)
+        if not uid:
+            raise Exception("Error de autenticación en Odoo")
+        return uid
+
+    async def execute_kw(self, model, method, args, kwargs=None):
+        if single_flight.enabled(method):
+            key = single_flight.make_key(self.session_key, model, method, args, kwargs)
+            return await single_flight.async_single_flight.do(
+                key, lambda: self._execute_kw(model, method, args, kwargs), method
+            )
+        return await self._execute_kw(model, method, args, kwargs)
+
+    async def _execute_kw(self, model, method, args, kwargs):
+        uid = await self.authenticate()
+        try:
+            return await self._call(uid, model, method, args, kwargs)
+        except xmlrpc.client.Fault as e:
+            if not is_access_denied(e):
+                raise
+            session_cache.invalidate(self.session_key)
+            uid = await self.authenticate(use_cache=False)
+            return await self._call(uid, model, method, args, kwargs)
+
+    async def _call(self, uid, model, method, args, kwargs):
+        async with resilience.aguard(self.odoo_url, self.db):
+            with metrics.observe_rpc(self.odoo_url, self.db, model, method):
+                return await self.backend.call(
+                    "object", "execute_kw", self.db, uid, self.password, model, method, args, kwargs or {}
+                )
+
+    async def read(self, model, ids, fields=None):
+        return await self.execute_kw(model, 'read', [ids], {'fields': fields or []})
+
+    async def search_read(self, model, domain=None, fields=None, limit=None, offset=0, order=None):
+        kwargs = {'fields': fields or []}
+        if limit:
+            kwargs['limit'] = limit
+        if offset:
+            kwargs['offset'] = offset
+        if order:
+            kwargs['order'] = order
+        return await self.execute_kw(model, 'search_read', [domain or []], kwargs)
+
+    async def create(self, model, values):
+        return await self.execute_kw(model, 'create', [values])
+
+    async def write(self, model, ids, values):
+        return await self.execute_kw(model, 'write', [ids, values])
+
+    async def unlink(self, model, ids):
+        return await self.execute_kw(model, 'unlink', [ids])
@@ -1,53 +1,412 @@
+import hashlib
+import itertools
+import threading
+import time
 import xmlrpc.client
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from api import fast_json, metrics, resilience, single_flight
 from api.models import OdooInstance
+from api.odoo_transport import post_json, server_proxy
 
-def authenticate(odoo_url, db, username, password):
-    """Autenticarse en Odoo y obtener el UID dinámico."""
-    common = xmlrpc.client.ServerProxy(f'{odoo_url}/xmlrpc/2/common')
-    uid = common.authenticate(db, username, password, {})
-    if not uid:
-        raise Exception("Error de autenticación en Odoo")
-    return uid
 
+class SessionCache:
+    """Caché de UIDs autenticados compartida por todo el proceso.
 
-def search_read(odoo_url, db, username, password, model, domain=[], fields=[]):
-    """Consulta registros en Odoo con conexión dinámica."""
-    uid = authenticate(odoo_url, db, username, password)
-    models = xmlrpc.client.ServerProxy(f'{odoo_url}/xmlrpc/2/object')
+    La clave es (url, db, login, hash de la contraseña); la contraseña nunca se
+    guarda en claro. Cada entrada vive ``ttl`` segundos.
+    """
+
+    def __init__(self, ttl=300):
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(odoo_url, db, username, password):
+        password_hash = hashlib.sha256(password.encode("utf-8")).hexdigest()
+        return (odoo_url, db, username, password_hash)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[1] > time.monotonic():
+                self.hits += 1
+                return entry[0]
+            if entry:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def set(self, key, uid):
+        with self._lock:
+            self._entries[key] = (uid, time.monotonic() + self.ttl)
+
+    def invalidate(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self._entries)}
+
+
+session_cache = SessionCache(ttl=getattr(settings, "ODOO_SESSION_TTL", 300))
+
+
+def is_access_denied(error):
+    """Indica si un Fault de Odoo corresponde a credenciales rechazadas."""
+    if not isinstance(error, xmlrpc.client.Fault):
+        return False
+    fault = str(error.faultString)
+    return "AccessDenied" in fault or "Access Denied" in fault or "Access denied" in fault
+
+
+# URLs de Odoo que ya rechazaron system.multicall
+_multicall_unsupported = set()
+
+BATCH_METHODS = {'search_read', 'read', 'create', 'write', 'unlink'}
+READ_METHODS = {'search_read', 'read'}
+
+
+class XmlRpcBackend:
+    """Backend clásico: ``/xmlrpc/2/<servicio>`` sobre el pool keep-alive."""
+
+    def __init__(self, odoo_url):
+        self.odoo_url = odoo_url
+
+    def call(self, service, method, *args):
+        proxy = server_proxy(self.odoo_url, service)
+        return getattr(proxy, method)(*args)
+
+    def multicall(self, service, calls):
+        """Envía ``[(método, args), ...]`` en un solo ``system.multicall``.
+
+        Devuelve ``[(ok, resultado_o_fault), ...]`` o ``None`` si el servidor
+        no soporta multicall (lo normal en Odoo); el resultado se recuerda por URL.
+        """
+        if self.odoo_url in _multicall_unsupported:
+            return None
+        multicall = xmlrpc.client.MultiCall(server_proxy(self.odoo_url, service))
+        for method, args in calls:
+            getattr(multicall, method)(*args)
+        try:
+            results = multicall()
+        except xmlrpc.client.Fault:
+            results = None
+        if results is None or not isinstance(results.results, list):
+            _multicall_unsupported.add(self.odoo_url)
+            return None
+
+        outcome = []
+        for i in range(len(calls)):
+            try:
+                outcome.append((True, results[i]))
+            except xmlrpc.client.Fault as e:
+                outcome.append((False, e))
+        return outcome
+
+
+class JsonRpcBackend:
+    """Backend ``/jsonrpc``: decodificar JSON cuesta mucho menos CPU que XML.
+
+    Los errores de Odoo se convierten en ``xmlrpc.client.Fault`` para que el
+    resto del código los trate igual sin importar el backend.
+    """
+
+    def __init__(self, odoo_url):
+        self.odoo_url = odoo_url
+        self._ids = itertools.count(1)
+
+    def call(self, service, method, *args):
+        payload = {
+            "jsonrpc": "2.0",
+            "method": "call",
+            "params": {"service": service, "method": method, "args": list(args)},
+            "id": next(self._ids),
+        }
+        body = post_json(f"{self.odoo_url}/jsonrpc", fast_json.dumps(payload))
+        response = fast_json.loads(body)
+        error = response.get("error")
+        if error:
+            data = error.get("data") or {}
+            message = data.get("message") or error.get("message")
+            if data.get("name"):
+                message = f"{data['name']}: {message}"
+            raise xmlrpc.client.Fault(error.get("code", 0), message)
+        return response.get("result")
+
+
+BACKENDS = {
+    "xmlrpc": XmlRpcBackend,
+    "jsonrpc": JsonRpcBackend,
+}
+
+
+class OdooClient:
+    """Cliente único para una instancia de Odoo con backend intercambiable.
+
+    Reutiliza la caché de sesiones del proceso, así que crear un cliente por
+    request no implica un login nuevo.
+    """
+
+    def __init__(self, odoo_url, db, username, password, protocol="xmlrpc"):
+        if protocol not in BACKENDS:
+            raise ValueError(f"Protocolo de Odoo no soportado: {protocol}")
+        self.odoo_url = odoo_url
+        self.db = db
+        self.username = username
+        self.password = password
+        self.protocol = protocol
+        self.backend = BACKENDS[protocol](odoo_url)
+
+    @classmethod
+    def from_instance(cls, instance, username=None, password=None):
+        """Crea el cliente desde un ``OdooInstance``, un ``ResolvedInstance`` o un dict.
+
+        ``username``/``password`` permiten usar las credenciales de un empleado
+        en lugar de las de la instancia.
+        """
+        if isinstance(instance, dict):
+            data = instance
+        else:
+            data = {
+                "url": instance.url,
+                "database": instance.database,
+                "username": instance.username,
+                "password": instance.password,
+                "protocol": instance.protocol,
+            }
+        return cls(
+            data["url"],
+            data["database"],
+            username or data["username"],
+            password or data["password"],
+            protocol=data.get("protocol") or "xmlrpc",
+        )
+
+    @property
+    def session_key(self):
+        return SessionCache.make_key(self.odoo_url, self.db, self.username, self.password)
+
+    def login(self, use_cache=True):
+        """Devuelve el UID o ``False`` si Odoo rechaza las credenciales."""
+        key = self.session_key
+        if use_cache:
+            uid = session_cache.get(key)
+            if uid:
+                return uid
 
-    return models.execute_kw(
-        db, uid, password, model, 'search_read',
-        [domain], {'fields': fields}
+        with resilience.guard(self.odoo_url, self.db):
+            with metrics.observe_rpc(self.odoo_url, self.db, "res.users", "authenticate"):
+                uid = self.backend.call("common", "authenticate", self.db, self.username, self.password, {})
+        if not uid:
+            session_cache.invalidate(key)
+            return False
+        session_cache.set(key, uid)
+        return uid
+
+    def authenticate(self, use_cache=True):
+        """Igual que ``login`` pero lanza una excepción si falla la autenticación."""
+        uid = self.login(use_cache=use_cache)
+        if not uid:
+            raise Exception("Error de autenticación en Odoo")
+        return uid
+
+    def execute_kw(self, model, method, args, kwargs=None):
+        """Ejecuta un método de Odoo reutilizando la sesión cacheada.
+
+        Si Odoo rechaza el UID cacheado (AccessDenied) se invalida la sesión y
+        se reintenta una sola vez con un login nuevo. Las lecturas idénticas
+        concurrentes comparten una sola llamada (ver ``single_flight``).
+        """
+        if single_flight.enabled(method):
+            key = single_flight.make_key(self.session_key, model, method, args, kwargs)
+            return single_flight.single_flight.do(
+                key, lambda: self._execute_kw(model, method, args, kwargs), method
+            )
+        return self._execute_kw(model, method, args, kwargs)
+
+    def _execute_kw(self, model, method, args, kwargs):
+        uid = self.authenticate()
+        try:
+            return self._call(uid, model, method, args, kwargs)
+        except xmlrpc.client.Fault as e:
+            if not is_access_denied(e):
+                raise
+            session_cache.invalidate(self.session_key)
+            uid = self.authenticate(use_cache=False)
+            return self._call(uid, model, method, args, kwargs)
+
+    def _call(self, uid, model, method, args, kwargs):
+        with resilience.guard(self.odoo_url, self.db):
+            with metrics.observe_rpc(self.odoo_url, self.db, model, method):
+                return self.backend.call(
+                    "object", "execute_kw", self.db, uid, self.password, model, method, args, kwargs or {}
+                )
+
+    def search(self, model, domain):
+        return self.execute_kw(model, 'search', [domain])
+
+    def read(self, model, ids, fields=None):
+        return self.execute_kw(model, 'read', [ids], {'fields': fields or []})
+
+    def search_read(self, model, domain=None, fields=None, limit=None, offset=0, order=None):
+        kwargs = {'fields': fields or []}
+        if limit:
+            kwargs['limit'] = limit
+        if offset:
+            kwargs['offset'] = offset
+        if order:
+            kwargs['order'] = order
+        return self.execute_kw(model, 'search_read', [domain or []], kwargs)
+
+    def iter_search_read(self, model, domain=None, fields=None, order=None, chunk_size=500, limit=None, offset=0):
+        """Recorre un ``search_read`` en páginas de ``chunk_size`` registros.
+
+        Solo se mantiene una página en memoria. Sin ``order`` explícito se
+        pagina por ``id`` para que el orden sea estable entre páginas.
+        """
+        remaining = limit
+        while remaining is None or remaining > 0:
+            page_size = chunk_size if remaining is None else min(chunk_size, remaining)
+            page = self.search_read(model, domain, fields, limit=page_size, offset=offset, order=order or 'id')
+            yield from page
+            if len(page) < page_size:
+                return
+            offset += len(page)
+            if remaining is not None:
+                remaining -= len(page)
+
+    def create(self, model, values):
+        return self.execute_kw(model, 'create', [values])
+
+    def write(self, model, ids, values):
+        return self.execute_kw(model, 'write', [ids, values])
+
+    def unlink(self, model, ids):
+        return self.execute_kw(model, 'unlink', [ids])
+
+    def batch(self, operations):
+        """Ejecuta una lista ordenada de operaciones ``execute_kw``.
+
+        Cada operación es ``{"model", "method", "args", "kwargs"}``. Con XML-RPC
+        se intenta un único ``system.multicall``; si Odoo no lo soporta, las
+        lecturas consecutivas se lanzan en paralelo sobre el pool keep-alive y
+        las escrituras se ejecutan en orden, actuando como barrera.
+        Devuelve ``[{"success": True, "result": ...} | {"success": False, "error": ...}]``.
+        """
+        results = [None] * len(operations)
+        for i, op in enumerate(operations):
+            if op.get("method") not in BATCH_METHODS:
+                results[i] = {"success": False, "error": f"Método no permitido: {op.get('method')}"}
+            elif not op.get("model"):
+                results[i] = {"success": False, "error": 'Falta el parámetro "model"'}
+        pending = [i for i, r in enumerate(results) if r is None]
+        if not pending:
+            return results
+
+        if hasattr(self.backend, "multicall"):
+            uid = self.authenticate()
+            calls = [
+                ("execute_kw", (self.db, uid, self.password, operations[i]["model"], operations[i]["method"],
+                                operations[i].get("args", []), operations[i].get("kwargs", {})))
+                for i in pending
+            ]
+            with resilience.guard(self.odoo_url, self.db):
+                with metrics.observe_rpc(self.odoo_url, self.db, "*", "multicall"):
+                    outcome = self.backend.multicall("object", calls)
+            if outcome is not None:
+                retry = []
+                for i, (ok, value) in zip(pending, outcome):
+                    if ok:
+                        results[i] = {"success": True, "result": value}
+                    elif is_access_denied(value):
+                        retry.append(i)
+                    else:
+                        results[i] = {"success": False, "error": str(value)}
+                # 🔹 Sesión caducada: solo se repiten las operaciones rechazadas
+                if retry:
+                    session_cache.invalidate(self.session_key)
+                pending = retry
+
+        self._run_concurrently(operations, pending, results)
+        return results
+
+    def _run_one(self, op):
+        try:
+            return {"success": True, "result": self.execute_kw(op["model"], op["method"], op.get("args", []), op.get("kwargs"))}
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+
+    def _run_concurrently(self, operations, indexes, results):
+        max_workers = getattr(settings, "ODOO_BATCH_MAX_WORKERS", 8)
+        wave = []
+
+        def flush():
+            if len(wave) == 1:
+                results[wave[0]] = self._run_one(operations[wave[0]])
+            elif wave:
+                with ThreadPoolExecutor(max_workers=min(max_workers, len(wave))) as executor:
+                    for i, result in zip(wave, executor.map(lambda j: self._run_one(operations[j]), wave)):
+                        results[i] = result
+            wave.clear()
+
+        for i in indexes:
+            if operations[i]["method"] in READ_METHODS:
+                wave.append(i)
+                continue
+            flush()
+            results[i] = self._run_one(operations[i])
+        flush()
+
+
+def authenticate(odoo_url, db, username, password, use_cache=True):
+    """Autenticarse en Odoo y obtener el UID dinámico (cacheado por proceso)."""
+    return OdooClient(odoo_url, db, username, password).authenticate(use_cache=use_cache)
+
+
+def execute_kw(odoo_url, db, username, password, model, method, args, kwargs=None):
+    """Ejecuta un método de Odoo reutilizando la sesión cacheada."""
+    return OdooClient(odoo_url, db, username, password).execute_kw(model, method, args, kwargs)
+
+
+def execute_batch(odoo_url, db, username, password, operations):
+    """Ejecuta varias operaciones en el menor número de viajes a Odoo."""
+    return OdooClient(odoo_url, db, username, password).batch(operations)
+
+
+def search_read(odoo_url, db, username, password, model, domain=[], fields=[], limit=None, offset=0, order=None):
+    """Consulta registros en Odoo con conexión dinámica."""
+    return OdooClient(odoo_url, db, username, password).search_read(
+        model, domain, fields, limit=limit, offset=offset, order=order
     )
 
 
 def create_record(odoo_url, db, username, password, model, values):
     """Crea un registro en Odoo con conexión dinámica."""
-    uid = authenticate(odoo_url, db, username, password)
-    models = xmlrpc.client.ServerProxy(f'{odoo_url}/xmlrpc/2/object')
-
-    return models.execute_kw(
-        db, uid, password, model, 'create', [values]
+    return execute_kw(
+        odoo_url, db, username, password, model, 'create', [values]
     )
 
 
 def update_record(odoo_url, db, username, password, model, record_id, values):
     """Actualiza un registro en Odoo con conexión dinámica."""
-    uid = authenticate(odoo_url, db, username, password)
-    models = xmlrpc.client.ServerProxy(f'{odoo_url}/xmlrpc/2/object')
-
-    return models.execute_kw(
-        db, uid, password, model, 'write', [[record_id], values]
+    return execute_kw(
+        odoo_url, db, username, password, model, 'write', [[record_id], values]
     )
 
 
 def delete_record(odoo_url, db, username, password, model, record_id):
     """Elimina un registro en Odoo con conexión dinámica."""
-    uid = authenticate(odoo_url, db, username, password)
-    models = xmlrpc.client.ServerProxy(f'{odoo_url}/xmlrpc/2/object')
-
-    return models.execute_kw(
-        db, uid, password, model, 'unlink', [[record_id]]
+    return execute_kw(
+        odoo_url, db, username, password, model, 'unlink', [[record_id]]
     )
 
 def connect_to_odoo(instance_name):
@@ -55,11 +414,7 @@ def connect_to_odoo(instance_name):
     try:
         instance = OdooInstance.objects.get(name=instance_name)
 
-        # 🔹 Recuperar la contraseña desencriptada para autenticación
-        password = instance.password
-
-        common = xmlrpc.client.ServerProxy(f"{instance.url}/xmlrpc/2/common")
-        uid = common.authenticate(instance.database, instance.username, password, {})
+        uid = OdooClient.from_instance(instance).login()
 
         if not uid:
             return {"error": "Error de autenticación en Odoo"}
@@ -67,4 +422,4 @@ def connect_to_odoo(instance_name):
         return {"uid": uid, "instance": instance}
 
     except OdooInstance.DoesNotExist:
-        return {"error": "Instancia no encontrada"}
\ No newline at end of file
+        return {"error": "Instancia no encontrada"}
@@ -0,0 +1,256 @@
+import contextvars
+import http.client
+import select
+import ssl
+import threading
+import time
+import xmlrpc.client
+from collections import deque
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+from django.conf import settings
+
+
+class DeadlineExceeded(TimeoutError):
+    """Se agotó el plazo total de una llamada a Odoo."""
+
+
+# Momento (time.monotonic) en que vence la llamada en curso de este hilo/tarea
+_deadline = contextvars.ContextVar("odoo_deadline", default=None)
+
+
+@contextmanager
+def deadline(seconds):
+    """Plazo total para las llamadas a Odoo hechas dentro del bloque (``None`` = sin plazo).
+
+    Un plazo anidado nunca amplía el exterior.
+    """
+    if not seconds:
+        yield
+        return
+    end = time.monotonic() + seconds
+    current = _deadline.get()
+    token = _deadline.set(end if current is None else min(current, end))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def bounded_timeout(timeout):
+    """``timeout`` recortado a lo que le queda al plazo en curso.
+
+    Se aplica a cada operación del socket, así que una respuesta que llega a
+    trozos puede pasarse algo del plazo, pero nunca quedarse colgada.
+    """
+    end = _deadline.get()
+    if end is None:
+        return timeout
+    remaining = end - time.monotonic()
+    if remaining <= 0:
+        raise DeadlineExceeded("Plazo agotado antes de terminar la llamada a Odoo")
+    return min(timeout, remaining) if timeout else remaining
+
+
+def _is_dropped(sock):
+    """Un socket keep-alive inactivo que ya es legible fue cerrado por Odoo (EOF)."""
+    try:
+        if hasattr(select, "poll"):
+            poller = select.poll()
+            poller.register(sock, select.POLLIN)
+            return bool(poller.poll(0))
+        return bool(select.select([sock], [], [], 0)[0])
+    except (OSError, ValueError):
+        return True
+
+
+class ConnectionPool:
+    """Pool de conexiones HTTP keep-alive hacia Odoo, compartido entre hilos.
+
+    Las conexiones se agrupan por (esquema, host). Se guardan como máximo
+    ``pool_size`` conexiones libres por host y se descartan las que llevan más
+    de ``idle_timeout`` segundos sin usarse.
+    """
+
+    def __init__(self, pool_size=10, idle_timeout=60, connect_timeout=5, read_timeout=60):
+        self.pool_size = pool_size
+        self.idle_timeout = idle_timeout
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self._idle = {}
+        self._lock = threading.Lock()
+        self._ssl_context = ssl.create_default_context()
+
+    def _new_connection(self, scheme, host):
+        connect_timeout = bounded_timeout(self.connect_timeout)
+        if scheme == "https":
+            conn = http.client.HTTPSConnection(host, timeout=connect_timeout, context=self._ssl_context)
+        else:
+            conn = http.client.HTTPConnection(host, timeout=connect_timeout)
+        conn.connect()
+        return conn
+
+    def acquire(self, scheme, host):
+        """Devuelve ``(conexión, reutilizada)`` para el host indicado."""
+        now = time.monotonic()
+        conn = None
+        with self._lock:
+            idle = self._idle.get((scheme, host))
+            while idle:
+                candidate, last_used = idle.pop()
+                # 🔹 Se descartan antes de escribir: tras enviar un create no se puede reintentar
+                if now - last_used <= self.idle_timeout and candidate.sock is not None and not _is_dropped(candidate.sock):
+                    conn = candidate
+                    break
+                candidate.close()
+        reused = conn is not None
+        if not reused:
+            conn = self._new_connection(scheme, host)
+        # 🔹 Una vez conectados, el socket usa el timeout de lectura (recortado al plazo de la llamada)
+        try:
+            conn.sock.settimeout(bounded_timeout(self.read_timeout))
+        except DeadlineExceeded:
+            self.release(scheme, host, conn)
+            raise
+        return conn, reused
+
+    def release(self, scheme, host, conn):
+        """Regresa una conexión sana al pool (o la cierra si el pool está lleno)."""
+        with self._lock:
+            idle = self._idle.setdefault((scheme, host), deque())
+            if len(idle) < self.pool_size:
+                idle.append((conn, time.monotonic()))
+                return
+        conn.close()
+
+    def clear(self):
+        with self._lock:
+            pools, self._idle = self._idle, {}
+        for idle in pools.values():
+            for conn, _ in idle:
+                conn.close()
+
+    def stats(self):
+        with self._lock:
+            return {f"{scheme}://{host}": len(idle) for (scheme, host), idle in self._idle.items()}
+
+
+_pool_settings = getattr(settings, "ODOO_HTTP_POOL", {})
+connection_pool = ConnectionPool(
+    pool_size=_pool_settings.get("POOL_SIZE", 10),
+    idle_timeout=_pool_settings.get("IDLE_TIMEOUT", 60),
+    connect_timeout=_pool_settings.get("CONNECT_TIMEOUT", 5),
+    read_timeout=_pool_settings.get("READ_TIMEOUT", 60),
+)
+
+
+class PooledTransport(xmlrpc.client.Transport):
+    """Transport XML-RPC que toma y devuelve conexiones del pool compartido.
+
+    Cada ``ServerProxy`` recibe su propia instancia (son baratas); lo que se
+    comparte entre hilos es el pool de sockets.
+    """
+
+    def __init__(self, scheme="http", pool=None, use_datetime=False, use_builtin_types=False):
+        super().__init__(use_datetime=use_datetime, use_builtin_types=use_builtin_types)
+        self.scheme = scheme
+        self.pool = pool or connection_pool
+
+    def request(self, host, handler, request_body, verbose=False):
+        # 🔹 Si falla el envío por una conexión reutilizada que Odoo cerró, la petición no llegó
+        # completa y se reintenta una vez. Un fallo al leer la respuesta no se reintenta: un
+        # create o write pudo haberse aplicado ya
+        for attempt in (0, 1):
+            conn, reused = self.pool.acquire(self.scheme, host)
+            try:
+                self._send(conn, handler, request_body, verbose)
+            except (ConnectionResetError, BrokenPipeError):
+                conn.close()
+                if not reused or attempt:
+                    raise
+                continue
+            except Exception:
+                conn.close()
+                raise
+            return self._read_response(conn, host, handler, verbose)
+
+    def _send(self, conn, handler, request_body, verbose):
+        if verbose:
+            conn.set_debuglevel(1)
+        conn.putrequest("POST", handler, skip_accept_encoding=True)
+        headers = self._headers + self._extra_headers + [
+            ("Content-Type", "text/xml"),
+            ("User-Agent", self.user_agent),
+        ]
+        self.send_headers(conn, headers)
+        self.send_content(conn, request_body)
+
+    def _read_response(self, conn, host, handler, verbose):
+        try:
+            resp = conn.getresponse()
+            if resp.status != 200:
+                resp.read()
+                raise xmlrpc.client.ProtocolError(
+                    host + handler, resp.status, resp.reason, dict(resp.getheaders())
+                )
+            self.verbose = verbose
+            result = self.parse_response(resp)
+        except xmlrpc.client.Fault:
+            # 🔹 Un Fault es una respuesta HTTP completa: la conexión sigue sana
+            self._finish(conn, host, resp)
+            raise
+        except Exception:
+            conn.close()
+            raise
+
+        self._finish(conn, host, resp)
+        return result
+
+    def _finish(self, conn, host, resp):
+        if resp.will_close:
+            conn.close()
+        else:
+            self.pool.release(self.scheme, host, conn)
+
+    def close(self):
+        # Las conexiones viven en el pool, no en el transport
+        pass
+
+
+def post_json(url, body):
+    """POST de un cuerpo JSON usando el pool keep-alive; devuelve los bytes de respuesta."""
+    parts = urlsplit(url)
+    handler = parts.path or "/"
+    for attempt in (0, 1):
+        conn, reused = connection_pool.acquire(parts.scheme, parts.netloc)
+        # Mismo criterio que ``PooledTransport.request``: solo se reintenta un envío fallido
+        try:
+            conn.request("POST", handler, body=body, headers={"Content-Type": "application/json"})
+        except (ConnectionResetError, BrokenPipeError):
+            conn.close()
+            if not reused or attempt:
+                raise
+            continue
+        except Exception:
+            conn.close()
+            raise
+        try:
+            resp = conn.getresponse()
+            data = resp.read()
+        except Exception:
+            conn.close()
+            raise
+
+        if resp.will_close:
+            conn.close()
+        else:
+            connection_pool.release(parts.scheme, parts.netloc, conn)
+        if resp.status != 200:
+            raise xmlrpc.client.ProtocolError(url, resp.status, resp.reason, dict(resp.getheaders()))
+        return data
+
+
+def server_proxy(odoo_url, endpoint):
+    """``ServerProxy`` de ``/xmlrpc/2/<endpoint>`` que usa el pool keep-alive."""
+    url = f"{odoo_url}/xmlrpc/2/{endpoint}"
+    return xmlrpc.client.ServerProxy(url, transport=PooledTransport(urlsplit(url).scheme))
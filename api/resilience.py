@@ -0,0 +1,448 @@
+"""Aislamiento por instancia de Odoo: bulkhead, plazo por llamada y circuit breaker.
+
+Cada llamada RPC pasa por ``guard`` (o ``aguard`` en el cliente asíncrono):
+
+1. **Circuit breaker**: si en la ventana reciente la tasa de errores de red o
+   de llamadas lentas de la instancia supera el umbral, el circuito se abre y
+   las llamadas fallan al instante con ``CircuitOpen`` durante
+   ``OPEN_SECONDS``. Después se deja pasar una sola llamada de prueba
+   (semiabierto): si responde bien se cierra, si no vuelve a abrirse.
+2. **Bulkhead**: como máximo ``MAX_CONCURRENT`` llamadas en vuelo por instancia
+   y proceso; si no hay hueco en ``ACQUIRE_TIMEOUT`` segundos se lanza
+   ``InstanceBusy``. Un tenant colgado ya no acapara todos los hilos del worker.
+3. **Plazo**: ``CALL_TIMEOUT`` segundos en total para la llamada (conexión,
+   envío y lectura), además de los timeouts de conexión/lectura de
+   ``ODOO_HTTP_POOL``.
+
+Los ``Fault`` de Odoo son respuestas válidas y no cuentan como errores. El
+estado vive en cada proceso; ``odoo_circuit_state`` lo agrega en Prometheus.
+``cluster_snapshot`` consulta (y reinicia) todos los workers por pub/sub de
+Redis: cada proceso escucha ``CONTROL_CHANNEL`` y deja su estado en una clave
+de respuesta.
+"""
+import asyncio
+import http.client
+import json
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+import weakref
+import xmlrpc.client
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from django.conf import settings
+from api import metrics
+from api.odoo_transport import DeadlineExceeded, deadline
+
+# Fallos que indican que la instancia no responde (no errores de negocio)
+FAILURE_EXCEPTIONS = (OSError, EOFError, http.client.HTTPException, xmlrpc.client.ProtocolError, asyncio.TimeoutError)
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+CONTROL_CHANNEL = "odoo_circuit_control"
+REPLY_TIMEOUT = 1.0  # Segundos que se esperan las respuestas de los demás workers
+
+logger = logging.getLogger(__name__)
+
+
+class InstanceUnavailable(Exception):
+    """La llamada se rechazó sin contactar a Odoo."""
+
+
+class CircuitOpen(InstanceUnavailable):
+    def __init__(self, instance, retry_after):
+        self.instance = instance
+        self.retry_after = retry_after
+        super().__init__(f"Odoo {instance} no disponible (circuito abierto), reintentar en {retry_after:.0f} s")
+
+
+class InstanceBusy(InstanceUnavailable):
+    def __init__(self, instance):
+        self.instance = instance
+        super().__init__(f"Odoo {instance} saturado: demasiadas llamadas en curso")
+
+
+def _config(instance=None):
+    config = dict(getattr(settings, "ODOO_RESILIENCE", {}))
+    overrides = config.pop("OVERRIDES", {})
+    if instance in overrides:
+        config.update(overrides[instance])
+    return config
+
+
+class CircuitBreaker:
+    """Breaker por tasa de errores y de llamadas lentas en una ventana deslizante."""
+
+    def __init__(self, instance, window=30, min_calls=10, error_rate=0.5, slow_call_seconds=10,
+                 slow_rate=0.8, open_seconds=30):
+        self.instance = instance
+        self.window = window
+        self.min_calls = min_calls
+        self.error_rate = error_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_rate = slow_rate
+        self.open_seconds = open_seconds
+        self.state = CLOSED
+        self.opened_at = None
+        self.last_error = None
+        self._outcomes = deque()  # (momento, falló, fue lenta)
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls, instance):
+        config = _config(instance)
+        return cls(
+            instance,
+            window=config.get("WINDOW", 30),
+            min_calls=config.get("MIN_CALLS", 10),
+            error_rate=config.get("ERROR_RATE", 0.5),
+            slow_call_seconds=config.get("SLOW_CALL_SECONDS", 10),
+            slow_rate=config.get("SLOW_RATE", 0.8),
+            open_seconds=config.get("OPEN_SECONDS", 30),
+        )
+
+    def before_call(self):
+        """Lanza ``CircuitOpen`` o devuelve si la llamada es la prueba del estado semiabierto."""
+        with self._lock:
+            if self.state == OPEN:
+                retry_after = self.opened_at + self.open_seconds - time.monotonic()
+                if retry_after > 0:
+                    raise CircuitOpen(self.instance, retry_after)
+                self._set_state(HALF_OPEN)
+            if self.state == HALF_OPEN:
+                if self._probing:
+                    raise CircuitOpen(self.instance, 1)
+                self._probing = True
+                return True
+            return False
+
+    def after_call(self, probe, failed, elapsed, error=None):
+        """Registra el resultado; ``failed=None`` significa que no hubo resultado (cancelación)."""
+        now = time.monotonic()
+        slow = elapsed >= self.slow_call_seconds
+        with self._lock:
+            if failed and error is not None:
+                self.last_error = f"{type(error).__name__}: {error}"
+            if probe:
+                self._probing = False
+                if failed is None:
+                    return
+                if failed or slow:
+                    self._open(now)
+                else:
+                    self._outcomes.clear()
+                    self._set_state(CLOSED)
+                return
+            if failed is None or self.state != CLOSED:
+                return
+
+            self._outcomes.append((now, failed, slow))
+            self._prune(now)
+            total = len(self._outcomes)
+            if total < self.min_calls:
+                return
+            failures = sum(1 for _, f, _ in self._outcomes if f)
+            slow_calls = sum(1 for _, _, s in self._outcomes if s)
+            if failures / total >= self.error_rate or slow_calls / total >= self.slow_rate:
+                self._open(now)
+
+    def reset(self):
+        with self._lock:
+            self._outcomes.clear()
+            self._probing = False
+            self._set_state(CLOSED)
+
+    def _prune(self, now):
+        while self._outcomes and now - self._outcomes[0][0] > self.window:
+            self._outcomes.popleft()
+
+    def _open(self, now):
+        self.opened_at = now
+        self._set_state(OPEN)
+
+    def _set_state(self, state):
+        self.state = state
+        metrics.set_circuit_state(self.instance, state)
+
+    def snapshot(self):
+        with self._lock:
+            now = time.monotonic()
+            self._prune(now)
+            total = len(self._outcomes)
+            return {
+                "state": self.state,
+                "calls": total,
+                "error_rate": round(sum(1 for _, f, _ in self._outcomes if f) / total, 3) if total else 0.0,
+                "slow_rate": round(sum(1 for _, _, s in self._outcomes if s) / total, 3) if total else 0.0,
+                "retry_after": round(max(0.0, self.opened_at + self.open_seconds - now), 1) if self.state == OPEN else None,
+                "last_error": self.last_error,
+            }
+
+
+class Bulkhead:
+    """Límite de llamadas concurrentes por instancia (hilos del proceso)."""
+
+    def __init__(self, max_concurrent):
+        self.max_concurrent = max_concurrent
+        self.in_flight = 0
+        self._semaphore = threading.BoundedSemaphore(max_concurrent)
+        self._lock = threading.Lock()
+
+    def acquire(self, timeout):
+        if not self._semaphore.acquire(timeout=timeout):
+            return False
+        with self._lock:
+            self.in_flight += 1
+        return True
+
+    def release(self):
+        with self._lock:
+            self.in_flight -= 1
+        self._semaphore.release()
+
+
+class _Registry:
+    def __init__(self):
+        self.breakers = {}
+        self.bulkheads = {}
+        # 🔹 Los semáforos de asyncio no pueden cruzar event loops
+        self.async_semaphores = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    def breaker(self, instance):
+        breaker = self.breakers.get(instance)
+        if breaker is None:
+            with self._lock:
+                breaker = self.breakers.setdefault(instance, CircuitBreaker.from_settings(instance))
+        return breaker
+
+    def bulkhead(self, instance):
+        bulkhead = self.bulkheads.get(instance)
+        if bulkhead is None:
+            with self._lock:
+                bulkhead = self.bulkheads.setdefault(
+                    instance, Bulkhead(_config(instance).get("MAX_CONCURRENT", 8))
+                )
+        return bulkhead
+
+    def async_semaphore(self, instance):
+        semaphores = self.async_semaphores.setdefault(asyncio.get_running_loop(), {})
+        semaphore = semaphores.get(instance)
+        if semaphore is None:
+            semaphore = semaphores[instance] = asyncio.Semaphore(_config(instance).get("MAX_CONCURRENT", 8))
+        return semaphore
+
+
+registry = _Registry()
+
+
+def _is_failure(error):
+    return isinstance(error, FAILURE_EXCEPTIONS)
+
+
+@contextmanager
+def guard(odoo_url, db):
+    """Envuelve una llamada síncrona a Odoo (ver docstring del módulo)."""
+    config = _config()
+    if not config.get("ENABLED"):
+        yield
+        return
+
+    _ensure_subscriber()
+    instance = metrics.instance_label(odoo_url, db)
+    config = _config(instance)
+    breaker = registry.breaker(instance)
+    try:
+        probe = breaker.before_call()
+    except CircuitOpen:
+        metrics.record_rejected(instance, "circuit_open")
+        raise
+
+    bulkhead = registry.bulkhead(instance)
+    if not bulkhead.acquire(config.get("ACQUIRE_TIMEOUT", 5)):
+        breaker.after_call(probe, None, 0)
+        metrics.record_rejected(instance, "bulkhead_full")
+        raise InstanceBusy(instance)
+
+    start = time.monotonic()
+    failed, error = None, None
+    try:
+        with deadline(config.get("CALL_TIMEOUT")):
+            yield
+        failed = False
+    except Exception as e:
+        failed, error = _is_failure(e), e
+        raise
+    finally:
+        bulkhead.release()
+        breaker.after_call(probe, failed, time.monotonic() - start, error)
+
+
+@asynccontextmanager
+async def aguard(odoo_url, db):
+    """Equivalente de ``guard`` para ``AsyncOdooClient``; el plazo usa ``asyncio.timeout``."""
+    config = _config()
+    if not config.get("ENABLED"):
+        yield
+        return
+
+    _ensure_subscriber()
+    instance = metrics.instance_label(odoo_url, db)
+    config = _config(instance)
+    breaker = registry.breaker(instance)
+    try:
+        probe = breaker.before_call()
+    except CircuitOpen:
+        metrics.record_rejected(instance, "circuit_open")
+        raise
+
+    semaphore = registry.async_semaphore(instance)
+    try:
+        await asyncio.wait_for(semaphore.acquire(), config.get("ACQUIRE_TIMEOUT", 5))
+    except asyncio.TimeoutError:
+        breaker.after_call(probe, None, 0)
+        metrics.record_rejected(instance, "bulkhead_full")
+        raise InstanceBusy(instance) from None
+    except BaseException:
+        breaker.after_call(probe, None, 0)
+        raise
+
+    start = time.monotonic()
+    failed, error = None, None
+    try:
+        timeout = asyncio.timeout(config.get("CALL_TIMEOUT"))
+        try:
+            async with timeout:
+                yield
+        except TimeoutError as e:
+            if not timeout.expired():
+                raise
+            raise DeadlineExceeded(f"Plazo de {config.get('CALL_TIMEOUT')} s agotado llamando a Odoo {instance}") from e
+        failed = False
+    except Exception as e:
+        failed, error = _is_failure(e), e
+        raise
+    finally:
+        semaphore.release()
+        breaker.after_call(probe, failed, time.monotonic() - start, error)
+
+
+def snapshot():
+    """Estado de breakers y bulkheads de este proceso, por instancia."""
+    instances = {}
+    for instance, breaker in list(registry.breakers.items()):
+        instances[instance] = breaker.snapshot()
+    for instance, bulkhead in list(registry.bulkheads.items()):
+        entry = instances.setdefault(instance, {})
+        entry.update({"in_flight": bulkhead.in_flight, "max_concurrent": bulkhead.max_concurrent})
+    return {"pid": os.getpid(), "enabled": bool(_config().get("ENABLED")), "instances": instances}
+
+
+def reset(instance=None):
+    """Cierra los breakers de este proceso (todos o el de ``instance``) y olvida su historial."""
+    for name, breaker in list(registry.breakers.items()):
+        if instance in (None, name):
+            breaker.reset()
+
+
+def _worker_id():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _redis_connection():
+    try:
+        from django_redis import get_redis_connection
+        return get_redis_connection("default")
+    except Exception:
+        # Backend de caché sin Redis (p. ej. LocMemCache): solo existe este proceso
+        return None
+
+
+_subscriber_pid = None
+_subscriber_lock = threading.Lock()
+
+
+def _ensure_subscriber():
+    """Arranca (una vez por proceso, también tras un fork) el hilo que atiende ``CONTROL_CHANNEL``."""
+    global _subscriber_pid
+    if _subscriber_pid == os.getpid():
+        return
+    with _subscriber_lock:
+        if _subscriber_pid == os.getpid():
+            return
+        _subscriber_pid = os.getpid()
+        if _redis_connection() is None:
+            return
+        threading.Thread(target=_listen_control, name="odoo-circuit-control", daemon=True).start()
+
+
+def _answer(connection, message):
+    if message.get("action") == "reset":
+        reset(message.get("instance"))
+    connection.hset(message["reply"], _worker_id(), json.dumps(snapshot()))
+    connection.expire(message["reply"], 30)
+
+
+def _listen_control():
+    while True:
+        try:
+            connection = _redis_connection()
+            pubsub = connection.pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(CONTROL_CHANNEL)
+            for message in pubsub.listen():
+                _answer(connection, json.loads(message["data"]))
+        except Exception as e:
+            logger.warning(f"⚠ Canal de control de circuitos interrumpido, reintentando: {e}")
+            time.sleep(5)
+
+
+def cluster_snapshot(reset_circuits=False, instance=None):
+    """Estado de todos los workers, opcionalmente tras cerrar sus circuitos (todos o los de ``instance``).
+
+    Devuelve ``{"enabled", "workers": {"host:pid": snapshot}, "missing"}``; ``missing``
+    cuenta los workers suscritos que no respondieron en ``REPLY_TIMEOUT`` (``None``
+    si Redis no está disponible y solo se ve este proceso).
+    """
+    _ensure_subscriber()
+    action = "reset" if reset_circuits else "snapshot"
+    if reset_circuits:
+        reset(instance)
+    workers = {}
+    missing = 0
+
+    connection = _redis_connection()
+    if connection is not None:
+        reply = f"odoo_circuit_reply:{uuid.uuid4().hex}"
+        message = {"action": action, "instance": instance, "reply": reply}
+        try:
+            # PUBLISH devuelve cuántos procesos recibieron el mensaje (este incluido): se espera a todos
+            receivers = connection.publish(CONTROL_CHANNEL, json.dumps(message))
+            deadline = time.monotonic() + REPLY_TIMEOUT
+            while connection.hlen(reply) < receivers and time.monotonic() < deadline:
+                time.sleep(0.02)
+            replies = connection.hgetall(reply)
+            connection.delete(reply)
+        except Exception as e:
+            logger.warning(f"⚠ No se pudo consultar el estado de los circuitos de los demás workers: {e}")
+            replies, missing = {}, None
+        else:
+            missing = max(0, receivers - len(replies))
+        for worker, data in replies.items():
+            workers[worker.decode() if isinstance(worker, bytes) else worker] = json.loads(data)
+
+    # Este proceso puede no estar suscrito todavía (primer uso): su estado se toma directamente
+    workers.setdefault(_worker_id(), snapshot())
+    return {"enabled": bool(_config().get("ENABLED")), "workers": workers, "missing": missing}
+
+
+def error_status(error):
+    """Código HTTP para una excepción de vista: 503 si se rechazó la llamada, 504 si Odoo no respondió a tiempo."""
+    if isinstance(error, InstanceUnavailable):
+        return 503
+    if isinstance(error, TimeoutError):
+        return 504
+    return 500
@@ -0,0 +1,94 @@
+"""Caché de resultados de ``search_read`` en Redis con invalidación por modelo.
+
+Cada (instancia, modelo) tiene un contador de generación. La clave de un
+resultado incluye la generación vigente, así que una escritura solo incrementa
+el contador y las entradas viejas dejan de ser alcanzables (expiran por TTL);
+nunca se recorren claves.
+"""
+import hashlib
+import json
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+
+
+def _config():
+    return getattr(settings, "ODOO_RESULT_CACHE", {})
+
+
+def ttl_for(model):
+    """TTL en segundos para el modelo, o 0 si la caché no aplica."""
+    config = _config()
+    if not config.get("ENABLED"):
+        return 0
+    return config.get("MODEL_TTLS", {}).get(model, config.get("DEFAULT_TTL", 30))
+
+
+def instance_key(instance):
+    """Identifica la instancia y el usuario: usuarios distintos pueden ver registros distintos."""
+    raw = f"{instance.url}|{instance.database}|{instance.username}"
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:16]
+
+
+def _generation_key(instance, model):
+    return f"odoo_rc_gen:{instance_key(instance)}:{model}"
+
+
+def _generation(instance, model):
+    return cache.get(_generation_key(instance, model)) or 0
+
+
+def make_key(instance, model, domain, fields, limit=None, offset=0, order=None):
+    """Clave canónica: el orden de ``fields`` no importa, el del dominio sí."""
+    canonical = json.dumps(
+        [domain, sorted(set(fields or [])), limit or None, offset or 0, order or None],
+        sort_keys=True, separators=(",", ":"), default=str,
+    )
+    digest = hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+    generation = _generation(instance, model)
+    return f"odoo_rc:{instance_key(instance)}:{model}:{generation}:{digest}"
+
+
+def get_or_fetch(instance, model, domain, fields, fetch, limit=None, offset=0, order=None):
+    """Devuelve ``(data, from_cache)``; ``fetch()`` se llama solo si no hay entrada vigente."""
+    ttl = ttl_for(model)
+    if not ttl:
+        return fetch(), False
+
+    key = make_key(instance, model, domain, fields, limit, offset, order)
+    data = cache.get(key)
+    if data is not None:
+        return data, True
+
+    data = fetch()
+    cache.set(key, data, timeout=ttl)
+    return data, False
+
+
+async def aget_or_fetch(instance, model, domain, fields, fetch, limit=None, offset=0, order=None):
+    """Igual que ``get_or_fetch`` con un ``fetch`` asíncrono (``AsyncOdooClient``)."""
+    ttl = ttl_for(model)
+    if not ttl:
+        return await fetch(), False
+
+    key = await sync_to_async(make_key)(instance, model, domain, fields, limit, offset, order)
+    data = await sync_to_async(cache.get)(key)
+    if data is not None:
+        return data, True
+
+    data = await fetch()
+    await sync_to_async(cache.set)(key, data, timeout=ttl)
+    return data, False
+
+
+def invalidate_model(instance, model):
+    """Invalida todos los resultados cacheados del modelo incrementando su generación."""
+    if not _config().get("ENABLED"):
+        return
+    key = _generation_key(instance, model)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # La generación aún no existe: cualquier valor distinto de 0 invalida
+        if not cache.add(key, 1, timeout=None):
+            cache.incr(key)
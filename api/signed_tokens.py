@@ -0,0 +1,74 @@
+"""Tokens de instancia firmados que se validan solo con CPU.
+
+Formato: ``st1.<id de instancia>.<lifetime>.<expira (epoch, 0 = nunca)>.<jti>.<firma>``.
+La firma es el HMAC-SHA256 de ``django.core.signing`` con ``SECRET_KEY`` (y
+``SECRET_KEY_FALLBACKS`` al rotar la clave). Validarlo no consulta Redis ni la
+base de datos; la revocación pasa por ``token_denylist`` usando el ``jti``.
+
+Los tokens de un solo uso siguen siendo UUID opacos: consumirlos exige la base
+de datos de todos modos.
+"""
+import secrets
+from dataclasses import dataclass
+from typing import Optional
+from django.conf import settings
+from django.core import signing
+
+PREFIX = "st1"
+_signer = signing.Signer(salt="api.odoo_instance_token", sep=".")
+
+
+class BadToken(ValueError):
+    """Token firmado mal formado, con firma inválida o expirado."""
+
+
+@dataclass(frozen=True)
+class TokenClaims:
+    instance_id: int
+    lifetime: str
+    expires_at: Optional[float]  # timestamp UNIX
+    jti: str
+
+
+def enabled():
+    return getattr(settings, "ODOO_SIGNED_TOKENS", {}).get("ENABLED", False)
+
+
+def is_signed(token):
+    return bool(token) and token.startswith(PREFIX + ".")
+
+
+def issue(instance_id, lifetime, expires_at=None):
+    """Token firmado para la instancia; ``expires_at`` es un ``datetime`` aware o ``None``."""
+    expires = int(expires_at.timestamp()) if expires_at else 0
+    jti = secrets.token_urlsafe(12)
+    return _signer.sign(f"{PREFIX}.{instance_id}.{lifetime}.{expires}.{jti}")
+
+
+def _claims(token):
+    try:
+        payload = _signer.unsign(token)
+        prefix, instance_id, lifetime, expires, jti = payload.split(".")
+        if prefix != PREFIX:
+            raise ValueError(prefix)
+        return TokenClaims(int(instance_id), lifetime, float(expires) or None, jti)
+    except (signing.BadSignature, ValueError):
+        raise BadToken("Token inválido")
+
+
+def parse(token, now):
+    """``TokenClaims`` del token o ``BadToken``; ``now`` es un timestamp UNIX."""
+    claims = _claims(token)
+    if claims.expires_at is not None and now > claims.expires_at:
+        raise BadToken("El token ha expirado")
+    return claims
+
+
+def claims_for_revocation(token):
+    """Claims de un token firmado aunque ya haya expirado, o ``None`` si no es un token firmado válido."""
+    if not is_signed(token):
+        return None
+    try:
+        return _claims(token)
+    except BadToken:
+        return None
@@ -0,0 +1,170 @@
+"""Coalescencia de lecturas idénticas a Odoo ("single flight").
+
+Cuando varias peticiones piden lo mismo a la vez (p. ej. los kioscos al
+empezar un turno), solo la primera llama a Odoo; las demás esperan su
+resultado y lo reciben tal cual. La clave incluye instancia, usuario (con el
+hash de la contraseña), modelo, método y argumentos, así que nunca se comparte
+un resultado entre usuarios con permisos distintos.
+
+* En el proceso: ``SingleFlight`` (hilos) y ``AsyncSingleFlight`` (un diccionario
+  de futures por event loop).
+* Entre procesos (opcional, ``REDIS``): el líder toma un lock con ``cache.add``
+  guardando en él un token propio y publica el resultado en una clave de vida
+  corta ligada a ese token; los demás workers leen el token del lock y sondean
+  esa clave hasta ``LOCK_TIMEOUT``. Así nunca reciben el resultado de un líder
+  anterior. Si el líder falla o tarda, llaman a Odoo ellos mismos.
+
+Los resultados compartidos deben tratarse como de solo lectura.
+"""
+import asyncio
+import hashlib
+import threading
+import time
+import uuid
+import weakref
+from django.conf import settings
+from django.core.cache import cache
+from api import fast_json, metrics
+
+# Solo métodos de lectura: coalescer escrituras cambiaría su semántica
+READ_METHODS = frozenset({'search', 'search_read', 'search_count', 'read', 'read_group', 'fields_get', 'name_search'})
+
+_MISSING = object()
+
+
+def _config():
+    return getattr(settings, "ODOO_SINGLE_FLIGHT", {})
+
+
+def enabled(method):
+    return method in READ_METHODS and _config().get("ENABLED", False)
+
+
+def make_key(session_key, model, method, args, kwargs):
+    raw = fast_json.dumps([list(session_key), model, method, args, kwargs or {}])
+    return hashlib.sha256(raw).hexdigest()[:32]
+
+
+class _Flight:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Una llamada en vuelo por clave dentro del proceso."""
+
+    def __init__(self):
+        self._flights = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn, method=""):
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+
+        if not leader:
+            metrics.record_coalesced(method, "local")
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = _shared_call(key, fn, method)
+            return flight.result
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+            flight.done.set()
+
+
+class AsyncSingleFlight:
+    """Equivalente para ``AsyncOdooClient``: los futures no se comparten entre loops."""
+
+    def __init__(self):
+        self._flights = weakref.WeakKeyDictionary()
+
+    async def do(self, key, fn, method=""):
+        loop = asyncio.get_running_loop()
+        flights = self._flights.setdefault(loop, {})
+        future = flights.get(key)
+        if future is not None:
+            metrics.record_coalesced(method, "local")
+            try:
+                # shield: si se cancela este request no se cancela la llamada del líder
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                # Se canceló el request del líder (cliente desconectado), no este: se vuelve a intentar
+                if future.cancelled() and not asyncio.current_task().cancelling():
+                    return await self.do(key, fn, method)
+                raise
+
+        future = flights[key] = loop.create_future()
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # Evita el aviso "exception was never retrieved" si nadie esperaba
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            flights.pop(key, None)
+
+
+def _shared_call(key, fn, method):
+    """Llamada del líder local; con ``REDIS`` se coordina además con los otros workers."""
+    config = _config()
+    if not config.get("REDIS"):
+        return fn()
+
+    lock_key = f"odoo_sf_lock:{key}"
+    lock_timeout = config.get("LOCK_TIMEOUT", 10)
+    token = uuid.uuid4().hex
+    if cache.add(lock_key, token, timeout=lock_timeout):
+        try:
+            result = fn()
+            cache.set(f"odoo_sf_result:{key}:{token}", result, timeout=config.get("RESULT_TTL", 2))
+            return result
+        finally:
+            cache.delete(lock_key)
+
+    # 🔹 Otro worker ya está llamando a Odoo: se espera el resultado de ese líder concreto
+    leader = cache.get(lock_key)
+    if leader is None:
+        # El líder terminó entre add y get: sin su token no se puede saber cuál es su resultado
+        return fn()
+    result_key = f"odoo_sf_result:{key}:{leader}"
+    deadline = time.monotonic() + lock_timeout
+    interval = config.get("POLL_INTERVAL", 0.02)
+    while time.monotonic() < deadline:
+        result = cache.get(result_key, _MISSING)
+        if result is not _MISSING:
+            metrics.record_coalesced(method, "redis")
+            return result
+        if cache.get(lock_key) != leader:
+            # El líder terminó sin publicar (falló): se vuelve a mirar una vez por si acaba de publicar
+            result = cache.get(result_key, _MISSING)
+            if result is not _MISSING:
+                metrics.record_coalesced(method, "redis")
+                return result
+            break
+        time.sleep(interval)
+    return fn()
+
+
+single_flight = SingleFlight()
+async_single_flight = AsyncSingleFlight()
@@ -0,0 +1,421 @@
+import asyncio
+import http.client
+import socketserver
+import threading
+import time
+import xmlrpc.client
+from datetime import datetime, timedelta, timezone
+from unittest import mock
+from django.core.cache import cache
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from bench.fake_odoo import start_server
+from api import attendance_bulk, field_metadata, signed_tokens, single_flight, token_denylist, user_bulk
+from api.odoo_transport import ConnectionPool, PooledTransport
+from api.models import OdooInstance, RevokedToken
+from api.odoo_client import BACKENDS, OdooClient, is_access_denied, session_cache
+
+PASSWORD = "secreto"
+LOCMEM_CACHE = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+
+
+class BackendContractMixin:
+    """Mismos casos para cada backend: el resto del código no debe notar cuál se usa."""
+
+    protocol = None
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server, cls.url = start_server(rows=5, password=PASSWORD)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        session_cache.clear()
+        self.server.odoo.calls.clear()
+
+    def odoo(self, password=PASSWORD):
+        return OdooClient(self.url, "db", "admin", password, protocol=self.protocol)
+
+    def test_backend_class(self):
+        self.assertIsInstance(self.odoo().backend, BACKENDS[self.protocol])
+
+    def test_login(self):
+        self.assertEqual(self.odoo().login(), 2)
+
+    def test_login_rejected(self):
+        self.assertFalse(self.odoo(password="otra").login())
+
+    def test_login_uses_session_cache(self):
+        self.odoo().login()
+        self.odoo().login()
+        self.assertEqual(self.server.odoo.calls["authenticate"], 1)
+
+    def test_search_read(self):
+        rows = self.odoo().search_read("res.partner", [], ["name"], limit=2, offset=1)
+        self.assertEqual([row["id"] for row in rows], [2, 3])
+        self.assertEqual(rows[0]["name"], "res.partner 2")
+
+    def test_create(self):
+        client = self.odoo()
+        self.assertIsInstance(client.create("res.partner", {"name": "A"}), int)
+        self.assertEqual(len(client.create("res.partner", [{"name": "A"}, {"name": "B"}])), 2)
+
+    def test_write(self):
+        self.assertIs(self.odoo().write("res.partner", [1], {"name": "B"}), True)
+
+    def test_access_denied(self):
+        # UID cacheado de una contraseña que Odoo ya no acepta: se invalida, se reintenta y falla el login
+        client = self.odoo(password="otra")
+        session_cache.set(client.session_key, 2)
+        with self.assertRaisesMessage(Exception, "Error de autenticación en Odoo"):
+            client.search_read("res.partner", [], ["name"])
+        self.assertIsNone(session_cache.get(client.session_key))
+
+    def test_access_denied_fault(self):
+        with self.assertRaises(xmlrpc.client.Fault) as raised:
+            self.odoo().backend.call("object", "execute_kw", "db", 2, "otra", "res.partner", "read", [[1]], {})
+        self.assertTrue(is_access_denied(raised.exception))
+
+    def test_fault_mapping(self):
+        with self.assertRaises(xmlrpc.client.Fault) as raised:
+            self.odoo().execute_kw("res.partner", "no_existe", [])
+        self.assertIn("Method not available no_existe", raised.exception.faultString)
+        self.assertFalse(is_access_denied(raised.exception))
+
+
+@override_settings(ODOO_SINGLE_FLIGHT={"ENABLED": False}, ODOO_RESILIENCE={"ENABLED": False})
+class XmlRpcBackendTests(BackendContractMixin, SimpleTestCase):
+    protocol = "xmlrpc"
+
+
+@override_settings(ODOO_SINGLE_FLIGHT={"ENABLED": False}, ODOO_RESILIENCE={"ENABLED": False})
+class JsonRpcBackendTests(BackendContractMixin, SimpleTestCase):
+    protocol = "jsonrpc"
+
+
+class FakeOdooMixin:
+    """Servidor de ``bench.fake_odoo`` compartido por los casos de la clase."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server, cls.url = start_server(rows=5, password=PASSWORD)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        session_cache.clear()
+        cache.clear()
+        self.server.odoo.calls.clear()
+
+    def odoo(self, login="kiosco"):
+        return OdooClient(self.url, "db", login, PASSWORD)
+
+
+@override_settings(CACHES=LOCMEM_CACHE, ODOO_SINGLE_FLIGHT={"ENABLED": False}, ODOO_RESILIENCE={"ENABLED": False})
+class AttendanceBulkTests(FakeOdooMixin, SimpleTestCase):
+
+    def test_resend_is_deduplicated(self):
+        client = self.odoo()
+        punches = [{"punch_id": "a", "values": {"name": "A"}}, {"punch_id": "b", "values": {"name": "B"}}]
+        first = attendance_bulk.ingest(client, "t", punches)
+        second = attendance_bulk.ingest(client, "t", punches)
+        self.assertEqual(self.server.odoo.calls["create"], 1)
+        self.assertEqual([r["record_id"] for r in second], [r["record_id"] for r in first])
+        self.assertTrue(all(r["duplicate"] for r in second))
+
+    def test_repeated_within_batch(self):
+        results = attendance_bulk.ingest(self.odoo(), "t", [{"punch_id": "a", "values": {"name": "A"}},
+                                                           {"punch_id": "a", "values": {"name": "A"}}])
+        self.assertEqual(results[1]["record_id"], results[0]["record_id"])
+        self.assertFalse(results[0]["duplicate"])
+        self.assertTrue(results[1]["duplicate"])
+
+    def test_punch_id_is_scoped_to_login_and_device(self):
+        punch = {"punch_id": "1", "values": {"name": "A"}}
+        attendance_bulk.ingest(self.odoo(), "t", [punch])
+        attendance_bulk.ingest(self.odoo(login="otro"), "t", [punch])
+        attendance_bulk.ingest(self.odoo(), "t", [{**punch, "device_id": "reloj-2"}])
+        self.assertEqual(self.server.odoo.calls["create"], 3)
+
+    def test_ref_from_previous_batch(self):
+        client = self.odoo()
+        created = attendance_bulk.ingest(client, "t", [{"punch_id": "entrada", "values": {"name": "A"}}])
+        results = attendance_bulk.ingest(client, "t", [
+            {"punch_id": "comida", "ref_punch_id": "entrada", "values": {"horaSalidaComida": "13:00"}},
+            {"punch_id": "salida", "ref_punch_id": "entrada", "values": {"horaSalida": "18:00"}},
+            {"punch_id": "huerfano", "ref_punch_id": "no-existe", "values": {"horaSalida": "18:00"}},
+        ])
+        record_id = created[0]["record_id"]
+        self.assertEqual([r.get("record_id") for r in results[:2]], [record_id, record_id])
+        # Dos modificaciones del mismo registro: dos oleadas, en el orden recibido
+        self.assertEqual(self.server.odoo.calls["write"], 2)
+        self.assertFalse(results[2]["success"])
+        self.assertIn("no-existe", results[2]["error"])
+
+    def test_write_failure_keeps_created_punches(self):
+        # La alta llega a Odoo y luego falla la red en las modificaciones: reenviar no debe duplicar
+        client = self.odoo()
+        punches = [{"punch_id": "a", "values": {"name": "A"}},
+                   {"punch_id": "b", "id": 7, "values": {"name": "B"}}]
+        with mock.patch.object(client, "batch", side_effect=ConnectionResetError("reset")):
+            with self.assertRaises(ConnectionResetError):
+                attendance_bulk.ingest(client, "t", punches)
+        self.assertEqual(self.server.odoo.calls["create"], 1)
+
+        results = attendance_bulk.ingest(client, "t", punches)
+        self.assertEqual(self.server.odoo.calls["create"], 1)
+        self.assertTrue(results[0]["duplicate"])
+        # La modificación que no llegó a enviarse quedó liberada y se aplica en el reenvío
+        self.assertEqual(results[1], {"punch_id": "b", "success": True, "record_id": 7, "duplicate": False})
+
+
+class _KeepAliveHandler(socketserver.BaseRequestHandler):
+    """Responde ``True`` por XML-RPC; ``server.actions`` decide qué hacer con el socket en cada petición."""
+
+    def handle(self):
+        stream = self.request.makefile("rb")
+        while True:
+            headers = b""
+            while not headers.endswith(b"\r\n\r\n"):
+                line = stream.readline()
+                if not line:
+                    return
+                headers += line
+            length = int(headers.lower().split(b"content-length:")[1].split(b"\r\n")[0])
+            stream.read(length)
+            self.server.requests += 1
+            action = self.server.actions.pop(0) if self.server.actions else "ok"
+            if action == "drop":
+                # Odoo procesó la petición pero la conexión se cortó antes de responder
+                return
+            body = xmlrpc.client.dumps((True,), methodresponse=True).encode()
+            self.request.sendall(b"HTTP/1.1 200 OK\r\nContent-Type: text/xml\r\n"
+                                 b"Content-Length: %d\r\n\r\n%s" % (len(body), body))
+            if action == "close":
+                return
+
+
+class PooledTransportTests(SimpleTestCase):
+
+    def setUp(self):
+        self.server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), _KeepAliveHandler)
+        self.server.daemon_threads = True
+        self.server.requests = 0
+        self.server.actions = []
+        threading.Thread(target=self.server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.pool = ConnectionPool()
+        self.addCleanup(self.pool.clear)
+        url = f"http://127.0.0.1:{self.server.server_address[1]}/xmlrpc/2/object"
+        self.proxy = xmlrpc.client.ServerProxy(url, transport=PooledTransport(pool=self.pool))
+
+    def test_idle_connection_closed_by_odoo_is_discarded(self):
+        self.server.actions = ["close"]
+        self.assertIs(self.proxy.execute_kw("db", 2, PASSWORD, "res.partner", "write", [[1], {}]), True)
+        time.sleep(0.05)
+        self.assertIs(self.proxy.execute_kw("db", 2, PASSWORD, "res.partner", "write", [[1], {}]), True)
+        self.assertEqual(self.server.requests, 2)
+
+    def test_sent_request_is_not_retried(self):
+        # Un create ya enviado pudo haberse aplicado: reenviarlo duplicaría el registro
+        self.server.actions = ["ok", "drop"]
+        self.proxy.execute_kw("db", 2, PASSWORD, "res.partner", "create", [{}])
+        with self.assertRaises(http.client.RemoteDisconnected):
+            self.proxy.execute_kw("db", 2, PASSWORD, "res.partner", "create", [{}])
+        self.assertEqual(self.server.requests, 2)
+
+
+class FieldProjectionTests(SimpleTestCase):
+
+    def test_fields_must_be_list_of_strings(self):
+        for fields in ("name", {"name": 1}, ["name", 1], None):
+            with self.subTest(fields=fields), self.assertRaises(field_metadata.InvalidFields):
+                field_metadata.project({"name": {}}, "res.partner", fields)
+
+    def test_unknown_fields(self):
+        with self.assertRaisesMessage(field_metadata.UnknownFields, "Campos inexistentes en res.partner: foo"):
+            field_metadata.project({"name": {}}, "res.partner", ["id", "name", "foo"])
+
+
+class UserBulkTests(SimpleTestCase):
+
+    def setUp(self):
+        self.odoo_client = OdooClient("http://odoo.invalid", "db", "admin", PASSWORD)
+        self.chunk = [(0, {"login": "a"}), (1, {"login": "b"})]
+
+    def test_fault_retries_one_by_one(self):
+        fault = xmlrpc.client.Fault(2, "login duplicado")
+        with mock.patch.object(self.odoo_client, "create", side_effect=[fault, 5, fault]) as create:
+            outcome = user_bulk._create_chunk(self.odoo_client, self.chunk)
+        self.assertEqual(create.call_count, 3)
+        self.assertEqual(outcome[0], (0, {"success": True, "user_id": 5}))
+        self.assertFalse(outcome[1][1]["success"])
+
+    def test_transport_error_is_not_retried(self):
+        # Odoo pudo haber creado el bloque: repetirlo uno a uno duplicaría usuarios
+        with mock.patch.object(self.odoo_client, "create", side_effect=ConnectionResetError("reset")) as create:
+            with self.assertRaises(ConnectionResetError):
+                user_bulk._create_chunk(self.odoo_client, self.chunk)
+        self.assertEqual(create.call_count, 1)
+
+
+@override_settings(CACHES=LOCMEM_CACHE, ODOO_SINGLE_FLIGHT={"ENABLED": True, "REDIS": True, "RESULT_TTL": 60})
+class SingleFlightTests(SimpleTestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def test_follower_ignores_previous_leader_result(self):
+        self.assertEqual(single_flight._shared_call("k", lambda: "antes", "read"), "antes")
+        # Un nuevo líder tiene el lock: el seguidor debe esperar su resultado, no el del anterior
+        cache.set("odoo_sf_lock:k", "nuevo", timeout=10)
+        timer = threading.Timer(0.1, lambda: (cache.set("odoo_sf_result:k:nuevo", "después"),
+                                              cache.delete("odoo_sf_lock:k")))
+        timer.start()
+        self.addCleanup(timer.cancel)
+        self.assertEqual(single_flight._shared_call("k", lambda: "propio", "read"), "después")
+
+    def test_async_follower_survives_cancelled_leader(self):
+        flight = single_flight.AsyncSingleFlight()
+        calls = []
+
+        async def fetch():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return len(calls)
+
+        async def main():
+            leader = asyncio.create_task(flight.do("k", fetch))
+            await asyncio.sleep(0)
+            follower = asyncio.create_task(flight.do("k", fetch))
+            await asyncio.sleep(0.01)
+            leader.cancel()
+            return await follower
+
+        self.assertEqual(asyncio.run(main()), 2)
+
+
+class SignedTokenTests(SimpleTestCase):
+
+    def setUp(self):
+        self.expires_at = datetime(2030, 1, 1, tzinfo=timezone.utc)
+        self.token = signed_tokens.issue(7, "30d", self.expires_at)
+
+    def test_parse(self):
+        claims = signed_tokens.parse(self.token, self.expires_at.timestamp() - 1)
+        self.assertEqual((claims.instance_id, claims.lifetime), (7, "30d"))
+        self.assertEqual(claims.expires_at, self.expires_at.timestamp())
+        self.assertTrue(signed_tokens.is_signed(self.token))
+
+    def test_expired(self):
+        with self.assertRaisesMessage(signed_tokens.BadToken, "El token ha expirado"):
+            signed_tokens.parse(self.token, self.expires_at.timestamp() + 1)
+        # Revocar un token ya expirado sigue siendo posible
+        self.assertIsNotNone(signed_tokens.claims_for_revocation(self.token))
+
+    def test_forever_never_expires(self):
+        claims = signed_tokens.parse(signed_tokens.issue(7, "forever"), float("inf"))
+        self.assertIsNone(claims.expires_at)
+
+    def test_tampered(self):
+        tampered = self.token.replace("st1.7.", "st1.8.", 1)
+        with self.assertRaisesMessage(signed_tokens.BadToken, "Token inválido"):
+            signed_tokens.parse(tampered, 0)
+        self.assertIsNone(signed_tokens.claims_for_revocation(tampered))
+        self.assertIsNone(signed_tokens.claims_for_revocation("9b2f0c1e-uuid-opaco"))
+
+
+class BloomFilterTests(SimpleTestCase):
+
+    def test_no_false_negatives_and_bounded_false_positives(self):
+        bloom = token_denylist.BloomFilter(1000, 0.01)
+        for i in range(1000):
+            bloom.add(f"jti-{i}")
+        self.assertTrue(all(f"jti-{i}" in bloom for i in range(1000)))
+        false_positives = sum(f"otro-{i}" in bloom for i in range(10000))
+        self.assertLess(false_positives, 300)
+
+
+@override_settings(CACHES=LOCMEM_CACHE, ODOO_SIGNED_TOKENS={"ENABLED": True, "SYNC_INTERVAL": 0})
+class TokenDenylistTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        # Filtro vacío por caso: el estado es global del proceso
+        patcher = mock.patch.object(token_denylist, "_state", token_denylist._State())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.token = signed_tokens.issue(1, "30d", datetime.now(timezone.utc) + timedelta(days=30))
+        self.jti = signed_tokens.claims_for_revocation(self.token).jti
+
+    def test_revoke(self):
+        self.assertFalse(token_denylist.is_revoked(self.jti))
+        self.assertEqual(token_denylist.revoke(self.token), self.jti)
+        self.assertTrue(token_denylist.is_revoked(self.jti))
+        self.assertIsNone(token_denylist.revoke("9b2f0c1e-uuid-opaco"))
+
+    def test_revocation_from_other_process(self):
+        self.assertFalse(token_denylist.is_revoked(self.jti))
+        # Otro proceso registra la revocación y sube la versión: este reconstruye su filtro
+        RevokedToken.objects.create(jti=self.jti)
+        token_denylist._bump_version()
+        self.assertTrue(token_denylist.is_revoked(self.jti))
+
+    def test_bloom_positive_is_confirmed_in_db(self):
+        with mock.patch.object(token_denylist.BloomFilter, "__contains__", return_value=True):
+            self.assertFalse(token_denylist.is_revoked(self.jti))
+
+    def test_expired_revocations_are_not_loaded(self):
+        RevokedToken.objects.create(jti=self.jti, expires_at=datetime.now(timezone.utc) - timedelta(days=1))
+        self.assertFalse(token_denylist.is_revoked(self.jti))
+
+
+class UseOnceTokenTests(TransactionTestCase):
+
+    def setUp(self):
+        self.instance = OdooInstance.objects.create(name="t", url="http://odoo.invalid", database="db",
+                                                    username="admin", password=PASSWORD)
+        self.instance.generate_token("once")
+
+    def test_concurrent_requests_consume_once(self):
+        # Cada hilo carga su copia de la fila, como peticiones en workers distintos
+        workers = 8
+        barrier = threading.Barrier(workers)
+        consumed = []
+
+        def consume():
+            try:
+                copy = OdooInstance.objects.get(pk=self.instance.pk)
+                barrier.wait()
+                consumed.append(copy.use_once_token())
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=consume) for _ in range(workers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(sorted(consumed), [False] * (workers - 1) + [True])
+        self.instance.refresh_from_db()
+        self.assertIsNone(self.instance.token)
+
+    def test_expired_token_is_not_consumed(self):
+        OdooInstance.objects.filter(pk=self.instance.pk).update(expires_at=self.instance.expires_at - timedelta(hours=1))
+        self.instance.refresh_from_db()
+        self.assertFalse(self.instance.use_once_token())
+        self.instance.refresh_from_db()
+        self.assertIsNotNone(self.instance.token)
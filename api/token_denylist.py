@@ -0,0 +1,129 @@
+"""Lista de denegación de tokens firmados revocados.
+
+El origen es la tabla ``RevokedToken``. Cada proceso guarda un filtro de Bloom
+con los ``jti`` revocados y vigentes; comprobar un token es pura CPU. Solo un
+positivo del filtro (un token revocado o un falso positivo, ~``ERROR_RATE``)
+se confirma en la base de datos.
+
+Sincronización: cada revocación incrementa un contador de versión en Redis y
+se publica por el canal de revocaciones de ``instance_resolver``. Cada proceso
+mira el contador como mucho cada ``SYNC_INTERVAL`` segundos y, si cambió,
+reconstruye su filtro desde la base de datos.
+"""
+import hashlib
+import logging
+import math
+import threading
+import time
+from datetime import datetime, timezone
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+from django.utils.timezone import now
+from . import signed_tokens
+from .models import RevokedToken
+
+logger = logging.getLogger(__name__)
+
+VERSION_KEY = "odoo_token_denylist_version"
+
+
+class BloomFilter:
+    """Filtro de Bloom sobre un ``bytearray`` con doble hashing (blake2b)."""
+
+    def __init__(self, capacity, error_rate):
+        capacity = max(1, capacity)
+        self.size = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item):
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "big")
+        h2 = int.from_bytes(digest[8:], "big") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, item):
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, item):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+
+def _config():
+    return getattr(settings, "ODOO_SIGNED_TOKENS", {})
+
+
+def _active():
+    return RevokedToken.objects.filter(Q(expires_at__isnull=True) | Q(expires_at__gt=now()))
+
+
+class _State:
+    def __init__(self):
+        self.bloom = None
+        self.version = None
+        self.checked_at = 0.0
+        self.lock = threading.Lock()
+
+
+_state = _State()
+
+
+def _rebuild(version):
+    jtis = list(_active().values_list("jti", flat=True))
+    config = _config()
+    # Margen para las revocaciones que lleguen antes de la siguiente reconstrucción
+    bloom = BloomFilter(max(config.get("BLOOM_CAPACITY", 10000), 2 * len(jtis)), config.get("BLOOM_ERROR_RATE", 0.001))
+    for jti in jtis:
+        bloom.add(jti)
+    _state.bloom, _state.version = bloom, version
+    logger.info(f"🔄 Lista de denegación de tokens reconstruida: {len(jtis)} revocados (versión {version})")
+
+
+def _sync():
+    """Reconstruye el filtro si cambió la versión en Redis (como mucho cada ``SYNC_INTERVAL`` s)."""
+    if _state.bloom is not None and time.monotonic() - _state.checked_at < _config().get("SYNC_INTERVAL", 2):
+        return
+    with _state.lock:
+        if _state.bloom is not None and time.monotonic() - _state.checked_at < _config().get("SYNC_INTERVAL", 2):
+            return
+        version = cache.get(VERSION_KEY)
+        if _state.bloom is None or version != _state.version:
+            _rebuild(version)
+        _state.checked_at = time.monotonic()
+
+
+def is_revoked(jti):
+    _sync()
+    if jti not in _state.bloom:
+        return False
+    return RevokedToken.objects.filter(jti=jti).exists()
+
+
+def add_local(jti):
+    """Marca el ``jti`` en el filtro de este proceso (revocación recibida por pub/sub)."""
+    if _state.bloom is not None:
+        _state.bloom.add(jti)
+
+
+def _bump_version():
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        # La clave no existe (primera revocación o Redis vaciado): cualquier valor distinto vale
+        cache.set(VERSION_KEY, time.time_ns(), timeout=None)
+
+
+def revoke(token):
+    """Registra la revocación de un token firmado; devuelve su ``jti`` o ``None`` si no era firmado."""
+    claims = signed_tokens.claims_for_revocation(token)
+    if claims is None:
+        return None
+    expires_at = None
+    if claims.expires_at is not None:
+        expires_at = datetime.fromtimestamp(claims.expires_at, tz=timezone.utc)
+    RevokedToken.objects.get_or_create(jti=claims.jti, defaults={"expires_at": expires_at})
+    _bump_version()
+    add_local(claims.jti)
+    return claims.jti
@@ -0,0 +1,31 @@
+"""Barrido de tokens expirados.
+
+Sin barrido, un token vencido solo se detecta cuando alguien lo presenta. Aquí
+se limpian todos de una vez con un único ``UPDATE`` sobre el índice de
+``expires_at``, se purgan sus claves de Redis y las LRU de los procesos, y se
+eliminan las revocaciones de tokens firmados que ya expiraron.
+"""
+import logging
+from django.utils.timezone import now
+from . import instance_resolver
+from .models import OdooInstance, RevokedToken
+
+logger = logging.getLogger(__name__)
+
+
+def sweep(chunk_size=500, dry_run=False):
+    """Expira los tokens vencidos; devuelve un resumen con los contadores."""
+    cutoff = now()
+    expired = OdooInstance.objects.expired(cutoff)
+    tokens = list(expired.values_list("token", flat=True))
+    stale_revocations = RevokedToken.objects.filter(expires_at__lte=cutoff)
+    if dry_run:
+        return {"expired": len(tokens), "revocations_purged": stale_revocations.count()}
+
+    # 🔹 Condicionado al mismo corte: un token regenerado entre tanto no se toca
+    updated = expired.update(token=None, expires_at=None)
+    instance_resolver.forget_many(tokens, chunk_size=chunk_size)
+    purged, _ = stale_revocations.delete()
+    if updated or purged:
+        logger.info(f"🧹 Tokens expirados: {updated}; revocaciones vencidas eliminadas: {purged}")
+    return {"expired": updated, "revocations_purged": purged}
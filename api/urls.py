@@ -1,19 +1,37 @@
 from django.urls import path
-from .views import get_records, create_record_view, update_record_view, delete_record_view, register_odoo_instance, verify_odoo_user,revoke_token_view
-from .views import get_asistencia_records, create_asistencia_record, update_asistencia_record, get_odoo_groups, create_user_core
-from .views_logs import logs_view
+from .views import get_records, create_record_view, update_record_view, delete_record_view, batch_view, register_odoo_instance, verify_odoo_user,revoke_token_view
+from .views import get_asistencia_records, create_asistencia_record, update_asistencia_record, bulk_asistencia_records, get_odoo_groups, refresh_odoo_groups, create_user_core, create_users_core
+from .views_logs import logs_view, logs_stream_view
+from .views_metrics import metrics_view, odoo_circuits_view
+from . import views_async
 urlpatterns = [
     path('get_records/', get_records, name='get_records'),
     path('create_record/', create_record_view, name='create_record'),
     path('update_record/', update_record_view, name='update_record'),
     path('delete_record/', delete_record_view, name='delete_record'),
+    path('batch/', batch_view, name='batch'),
     path('register_odoo_instance/', register_odoo_instance, name='register_odoo_instance'),
     path("revoke_token/", revoke_token_view, name="revoke_token"),
     path("verify_odoo_user/", verify_odoo_user, name="verify_odoo_user"),
     path("get_asistencia_records/", get_asistencia_records, name="get_asistencia_records"),
     path("create_asistencia_record/", create_asistencia_record, name="create_asistencia_record"),
     path("update_asistencia_record/", update_asistencia_record, name="update_asistencia_record"),
+    path("bulk_asistencia_records/", bulk_asistencia_records, name="bulk_asistencia_records"),
     path("logs/", logs_view, name="logs_view"),
+    path("logs/stream/", logs_stream_view, name="logs_stream_view"),
+    path("metrics/", metrics_view, name="metrics_view"),
+    path("odoo_circuits/", odoo_circuits_view, name="odoo_circuits"),
     path("get_odoo_groups/", get_odoo_groups, name="get_odoo_groups"),
+    path("refresh_odoo_groups/", refresh_odoo_groups, name="refresh_odoo_groups"),
     path("create_user_core/", create_user_core, name="create_user_core"),
+    path("create_users_core/", create_users_core, name="create_users_core"),
+
+    # 🔹 Rutas asíncronas (ASGI / uvicorn)
+    path('async/get_records/', views_async.get_records, name='async_get_records'),
+    path('async/create_record/', views_async.create_record_view, name='async_create_record'),
+    path('async/update_record/', views_async.update_record_view, name='async_update_record'),
+    path('async/delete_record/', views_async.delete_record_view, name='async_delete_record'),
+    path("async/get_asistencia_records/", views_async.get_asistencia_records, name="async_get_asistencia_records"),
+    path("async/create_asistencia_record/", views_async.create_asistencia_record, name="async_create_asistencia_record"),
+    path("async/update_asistencia_record/", views_async.update_asistencia_record, name="async_update_asistencia_record"),
 ]
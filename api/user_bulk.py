@@ -0,0 +1,90 @@
+"""Alta de usuarios de Odoo: valores compartidos por ``create_user_core`` y su variante en lote.
+
+El lote resuelve los grupos una sola vez con el catálogo cacheado, envía los
+usuarios en ``create`` sobre listas (Odoo acepta una lista de dicts) con
+paralelismo acotado y, si Odoo rechaza un bloque (lo revierte entero), lo
+repite usuario por usuario para que solo fallen los inválidos. Un error de red
+se propaga: Odoo pudo haber creado el bloque y repetirlo duplicaría usuarios.
+"""
+import xmlrpc.client
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from . import group_catalog
+
+REQUIRED_FIELDS = ["name", "login", "email", "password_new", "tipo"]
+# Todo usuario recibe además el grupo obligatorio con ID 1
+BASE_GROUP_ID = 1
+
+
+def _config():
+    return getattr(settings, "ODOO_USER_BULK", {})
+
+
+def missing_field(data):
+    """Primer campo obligatorio ausente, o ``None``."""
+    return next((field for field in REQUIRED_FIELDS if field not in data), None)
+
+
+def group_ids_for(catalog, tipo):
+    """Grupos del ``tipo`` más el obligatorio, o ``None`` si el tipo no existe."""
+    tipo_ids = group_catalog.find_ids(catalog, tipo)
+    if not tipo_ids:
+        return None
+    return list(set(tipo_ids + [BASE_GROUP_ID]))
+
+
+def user_values(data, group_ids):
+    return {
+        'name': data['name'],
+        'login': data['login'],
+        'email': data['email'],
+        'password': data['password_new'],
+        'groups_id': [(6, 0, group_ids)]
+    }
+
+
+def _create_chunk(client, chunk):
+    """``chunk`` es ``[(índice, valores), ...]``; devuelve ``[(índice, resultado), ...]``.
+
+    Solo un ``Fault`` de Odoo (también los errores JSON-RPC, que se mapean a
+    ``Fault``) activa el reintento uno a uno; los errores de red se propagan.
+    """
+    try:
+        ids = client.create('res.users', [values for _, values in chunk])
+        return [(i, {"success": True, "user_id": user_id}) for (i, _), user_id in zip(chunk, ids)]
+    except xmlrpc.client.Fault:
+        outcome = []
+        for i, values in chunk:
+            try:
+                outcome.append((i, {"success": True, "user_id": client.create('res.users', values)}))
+            except xmlrpc.client.Fault as e:
+                outcome.append((i, {"success": False, "error": str(e)}))
+        return outcome
+
+
+def provision(client, instance, users):
+    """Crea los usuarios y devuelve un resultado por usuario, en el mismo orden."""
+    config = _config()
+    catalog = group_catalog.get(client, instance)
+    results = [None] * len(users)
+    pending = []
+    for i, data in enumerate(users):
+        field = missing_field(data) if isinstance(data, dict) else "name"
+        if field:
+            results[i] = {"success": False, "error": f"Falta el campo '{field}'"}
+            continue
+        group_ids = group_ids_for(catalog, data['tipo'])
+        if group_ids is None:
+            results[i] = {"success": False, "error": f"No se encontraron grupos con tipo '{data['tipo']}'"}
+            continue
+        results[i] = {"login": data['login'], "tipo": data['tipo'], "grupos_asignados": group_ids}
+        pending.append((i, user_values(data, group_ids)))
+
+    chunk_size = config.get("CHUNK_SIZE", 25)
+    chunks = [pending[start:start + chunk_size] for start in range(0, len(pending), chunk_size)]
+    if chunks:
+        with ThreadPoolExecutor(max_workers=min(config.get("MAX_WORKERS", 4), len(chunks))) as executor:
+            for outcome in executor.map(lambda chunk: _create_chunk(client, chunk), chunks):
+                for i, result in outcome:
+                    results[i].update(result)
+    return results
@@ -1,5 +1,5 @@
 import json
-from django.http import JsonResponse
+from .fast_json import JsonResponse
 
 def validate_json(request):
     """ Valida si el request contiene un JSON válido """
@@ -1,61 +1,51 @@
 import uuid
-from django.http import JsonResponse
+from django.http import StreamingHttpResponse
 from django.views.decorators.csrf import csrf_exempt
 import json
-from .odoo_client import search_read, create_record, update_record,delete_record
+from .odoo_client import BACKENDS, OdooClient
 from .utils import validate_json, validate_required_params
+from .fast_json import JsonResponse, dumps
+from . import attendance_bulk, attendance_cache, credential_cache, field_metadata, group_catalog, instance_resolver, resilience, result_cache, user_bulk
 from .models import OdooInstance
-from django.core.cache import cache
+from django.conf import settings
 from django.utils.timezone import now
-from datetime import datetime, timedelta
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
-import xmlrpc.client
-import pytz
 import logging
 logger = logging.getLogger(__name__)
 
 
-@csrf_exempt
-def get_records(request):
-    """ Endpoint para consultar registros en Odoo usando autenticación con logs """
-    if request.method == "GET":
-        token = request.headers.get("Authorization")
+# Tamaño de página por defecto al recorrer Odoo en modo streaming
+STREAM_CHUNK_SIZE = 500
 
-        if not token:
-            logger.warning("❌ Falta el token en la cabecera Authorization")
-            return JsonResponse({"error": "Falta el token en la cabecera Authorization"}, status=401)
 
-        logger.info(f"🔹 Token recibido: {token}")
+def _stream_ndjson(records):
+    """ Emite un registro JSON por línea; un error a mitad del stream se emite como última línea """
+    try:
+        for record in records:
+            yield dumps(record) + b"\n"
+    except Exception as e:
+        logger.error(f"❌ Error durante el streaming de get_records: {e}")
+        yield dumps({"error": str(e)}) + b"\n"
 
-        # Intentar obtener la instancia desde Redis
-        instance_data = cache.get(f"odoo_instance_{token}")
 
-        if instance_data:
-            instance_data = json.loads(instance_data)
-            logger.info("✅ Instancia obtenida desde Redis")
-        else:
-            try:
-                instance = OdooInstance.objects.get(token=token)
-                if instance.is_token_expired():
-                    logger.warning(f"⚠ Token expirado: {token}")
-                    return JsonResponse({"error": "El token ha expirado"}, status=401)
-
-                if instance.token_lifetime == "once":
-                    instance.use_once_token()
-                    logger.info(f"🔄 Token de un solo uso eliminado: {token}")
-
-                instance_data = {
-                    "url": instance.url,
-                    "database": instance.database,
-                    "username": instance.username,
-                    "password": instance.password,
-                }
-                cache.set(f"odoo_instance_{token}", json.dumps(instance_data), timeout=600)
-                logger.info(f"📦 Instancia {instance.name} cargada y guardada en Redis")
-            except OdooInstance.DoesNotExist:
-                logger.error(f"❌ Token inválido: {token}")
-                return JsonResponse({"error": "Token inválido"}, status=401)
+def _stream_json_array(records):
+    """ Emite ``{"data": [...]}`` por partes, con la misma forma que la respuesta no paginada """
+    yield b'{"data": ['
+    try:
+        for i, record in enumerate(records):
+            yield (b"," if i else b"") + dumps(record)
+        yield b"]}"
+    except Exception as e:
+        logger.error(f"❌ Error durante el streaming de get_records: {e}")
+        yield b"], " + dumps({"error": str(e)})[1:]
+
+
+@csrf_exempt
+def get_records(request):
+    """ Endpoint para consultar registros en Odoo usando autenticación con logs """
+    if request.method == "GET":
+        instance = request.odoo_instance  # Resuelto por OdooInstanceMiddleware
 
         try:
             model = request.GET.get("model")
@@ -68,23 +58,55 @@ def get_records(request):
 
             domain = json.loads(domain)
             fields = json.loads(fields)
+            order = request.GET.get("order") or None
+            stream = request.GET.get("stream")
+
+            try:
+                limit = int(request.GET["limit"]) if request.GET.get("limit") else None
+                offset = int(request.GET.get("offset") or 0)
+                chunk_size = int(request.GET.get("chunk_size") or STREAM_CHUNK_SIZE)
+            except ValueError:
+                return JsonResponse({"error": 'Los parámetros "limit", "offset" y "chunk_size" deben ser enteros'}, status=400)
 
-            data = search_read(
-                instance_data["url"],
-                instance_data["database"],
-                instance_data["username"],
-                instance_data["password"],
-                model,
-                domain,
-                fields
+            # limit=0 se rechaza: search_read lo trata como "sin límite" y el streaming como "nada"
+            if (limit is not None and limit <= 0) or offset < 0 or chunk_size <= 0:
+                return JsonResponse({"error": 'Los parámetros "limit" y "chunk_size" deben ser mayores que 0 y "offset" no puede ser negativo'}, status=400)
+            # Páginas acotadas: un chunk_size enorme anularía el consumo de memoria constante
+            chunk_size = min(chunk_size, settings.ODOO_STREAM_MAX_CHUNK_SIZE)
+
+            client = OdooClient.from_instance(instance)
+
+            # 🔹 Proyección por defecto y validación de campos con los metadatos cacheados
+            try:
+                fields = field_metadata.resolve(client, instance, model, fields)
+            except field_metadata.InvalidFields as e:
+                return JsonResponse({"error": str(e)}, status=400)
+
+            if stream:
+                if stream not in ("ndjson", "json"):
+                    return JsonResponse({"error": 'El parámetro "stream" debe ser "ndjson" o "json"'}, status=400)
+                records = client.iter_search_read(
+                    model, domain, fields, order=order, chunk_size=chunk_size, limit=limit, offset=offset
+                )
+                logger.info(f"✅ Consulta en streaming ({stream}) iniciada en Odoo para el modelo {model}")
+                if stream == "ndjson":
+                    return StreamingHttpResponse(_stream_ndjson(records), content_type="application/x-ndjson")
+                return StreamingHttpResponse(_stream_json_array(records), content_type="application/json")
+
+            data, from_cache = result_cache.get_or_fetch(
+                instance, model, domain, fields,
+                lambda: client.search_read(model, domain, fields, limit=limit, offset=offset, order=order),
+                limit=limit, offset=offset, order=order,
             )
 
-            logger.info(f"✅ Consulta realizada en Odoo para el modelo {model}")
-            return JsonResponse({"data": data}, safe=False)
+            logger.info(f"✅ Consulta realizada en Odoo para el modelo {model} (caché: {from_cache})")
+            response = JsonResponse({"data": data, "cached": from_cache}, safe=False)
+            response["X-Cache"] = "HIT" if from_cache else "MISS"
+            return response
 
         except Exception as e:
             logger.error(f"❌ Error en get_records: {e}")
-            return JsonResponse({"error": str(e)}, status=500)
+            return JsonResponse({"error": str(e)}, status=resilience.error_status(e))
 
     return JsonResponse({"error": "Método no permitido"}, status=405)
 
@@ -95,39 +117,7 @@ def get_records(request):
 def create_record_view(request):
     """ Endpoint para crear un registro en Odoo con validación de token y logs """
     if request.method == "POST":
-        token = request.headers.get("Authorization")
-
-        if not token:
-            logger.warning("❌ Falta el token en la cabecera Authorization")
-            return JsonResponse({"error": "Falta el token en la cabecera Authorization"}, status=401)
-
-        instance_data = cache.get(f"odoo_instance_{token}")
-
-        if instance_data:
-            instance_data = json.loads(instance_data)
-            logger.info("✅ Instancia obtenida desde Redis")
-        else:
-            try:
-                instance = OdooInstance.objects.get(token=token)
-                if instance.is_token_expired():
-                    logger.warning(f"⚠ Token expirado: {token}")
-                    return JsonResponse({"error": "El token ha expirado"}, status=401)
-
-                if instance.token_lifetime == "once":
-                    instance.use_once_token()
-                    logger.info(f"🔄 Token de un solo uso eliminado: {token}")
-
-                instance_data = {
-                    "url": instance.url,
-                    "database": instance.database,
-                    "username": instance.username,
-                    "password": instance.password,
-                }
-                cache.set(f"odoo_instance_{token}", json.dumps(instance_data), timeout=600)
-                logger.info(f"📦 Instancia {instance.name} cargada y guardada en Redis")
-            except OdooInstance.DoesNotExist:
-                logger.error(f"❌ Token inválido: {token}")
-                return JsonResponse({"error": "Token inválido"}, status=401)
+        instance = request.odoo_instance  # Resuelto por OdooInstanceMiddleware
 
         try:
             data = json.loads(request.body.decode("utf-8"))
@@ -138,21 +128,15 @@ def create_record_view(request):
                 logger.warning("⚠ Faltan parámetros 'model' o 'values'")
                 return JsonResponse({"error": 'Faltan parámetros "model" o "values"'}, status=400)
 
-            record_id = create_record(
-                instance_data["url"],
-                instance_data["database"],
-                instance_data["username"],
-                instance_data["password"],
-                model,
-                values
-            )
+            record_id = OdooClient.from_instance(instance).create(model, values)
+            result_cache.invalidate_model(instance, model)
 
             logger.info(f"✅ Registro creado en Odoo (ID: {record_id}) para el modelo {model}")
             return JsonResponse({"success": True, "record_id": record_id})
 
         except Exception as e:
             logger.error(f"❌ Error en create_record_view: {e}")
-            return JsonResponse({"error": str(e)}, status=500)
+            return JsonResponse({"error": str(e)}, status=resilience.error_status(e))
 
     return JsonResponse({"error": "Método no permitido"}, status=405)
 
@@ -160,33 +144,8 @@ def create_record_view(request):
 def update_record_view(request):
     """ Endpoint para actualizar un registro en Odoo con validación de token """
     if request.method == "PUT":
-        token = request.headers.get("Authorization")
-
-        if not token:
-            return JsonResponse({"error": "Falta el token en la cabecera Authorization"}, status=401)
+        instance = request.odoo_instance  # Resuelto por OdooInstanceMiddleware
 
-        instance_data = cache.get(f"odoo_instance_{token}")
-
-        if instance_data:
-            instance_data = json.loads(instance_data)
-        else:
-            try:
-                instance = OdooInstance.objects.get(token=token)
-                if instance.is_token_expired():
-                    return JsonResponse({"error": "El token ha expirado"}, status=401)
-                if instance.token_lifetime == "once":
-                    instance.use_once_token()
-
-                instance_data = {
-                    "url": instance.url,
-                    "database": instance.database,
-                    "username": instance.username,
-                    "password": instance.password,
-                }
-                cache.set(f"odoo_instance_{token}", json.dumps(instance_data), timeout=600)
-
-            except OdooInstance.DoesNotExist:
-                return JsonResponse({"error": "Token inválido"}, status=401)
         try:
             data = json.loads(request.body.decode("utf-8"))
             model = data.get("model")
@@ -196,20 +155,13 @@ def update_record_view(request):
             if not model or not record_id or not values:
                 return JsonResponse({"error": 'Faltan parámetros "model", "id" o "values"'}, status=400)
 
-            success = update_record(
-                instance_data["url"],
-                instance_data["database"],
-                instance_data["username"],
-                instance_data["password"],
-                model,
-                record_id,
-                values
-            )
+            success = OdooClient.from_instance(instance).write(model, [record_id], values)
+            result_cache.invalidate_model(instance, model)
 
             return JsonResponse({"success": success})
 
         except Exception as e:
-            return JsonResponse({"error": str(e)}, status=500)
+            return JsonResponse({"error": str(e)}, status=resilience.error_status(e))
 
     return JsonResponse({"error": "Método no permitido"}, status=405)
 
@@ -217,33 +169,7 @@ def update_record_view(request):
 def delete_record_view(request):
     """ Endpoint para eliminar un registro en Odoo con validación de token """
     if request.method == "DELETE":
-        token = request.headers.get("Authorization")
-
-        if not token:
-            return JsonResponse({"error": "Falta el token en la cabecera Authorization"}, status=401)
-
-        instance_data = cache.get(f"odoo_instance_{token}")
-
-        if instance_data:
-            instance_data = json.loads(instance_data)
-        else:
-            try:
-                instance = OdooInstance.objects.get(token=token)
-                if instance.is_token_expired():
-                    return JsonResponse({"error": "El token ha expirado"}, status=401)
-                if instance.token_lifetime == "once":
-                    instance.use_once_token()
-
-                instance_data = {
-                    "url": instance.url,
-                    "database": instance.database,
-                    "username": instance.username,
-                    "password": instance.password,
-                }
-                cache.set(f"odoo_instance_{token}", json.dumps(instance_data), timeout=600)
-
-            except OdooInstance.DoesNotExist:
-                return JsonResponse({"error": "Token inválido"}, status=401)
+        instance = request.odoo_instance  # Resuelto por OdooInstanceMiddleware
 
         try:
             data = json.loads(request.body.decode("utf-8"))
@@ -253,18 +179,45 @@ def delete_record_view(request):
             if not model or not record_id:
                 return JsonResponse({"error": 'Faltan parámetros "model" o "id"'}, status=400)
 
-            success = delete_record(
-                instance_data["url"],
-                instance_data["database"],
-                instance_data["username"],
-                instance_data["password"],
-                model,
-                record_id
-            )
+            success = OdooClient.from_instance(instance).unlink(model, [record_id])
+            result_cache.invalidate_model(instance, model)
             return JsonResponse({"success": success})
 
         except Exception as e:
-            return JsonResponse({"error": str(e)}, status=500)
+            return JsonResponse({"error": str(e)}, status=resilience.error_status(e))
+
+    return JsonResponse({"error": "Método no permitido"}, status=405)
+
+
+@csrf_exempt
+def batch_view(request):
+    """ Endpoint para ejecutar varias operaciones de Odoo en un solo request """
+    if request.method == "POST":
+        instance = request.odoo_instance  # Resuelto por OdooInstanceMiddleware
+
+        try:
+            data = json.loads(request.body.decode("utf-8"))
+            operations = data.get("operations")
+
+            if not isinstance(operations, list) or not operations:
+                return JsonResponse({"error": 'El parámetro "operations" debe ser una lista no vacía'}, status=400)
+
+            max_operations = getattr(settings, "ODOO_BATCH_MAX_OPERATIONS", 50)
+            if len(operations) > max_operations:
+                return JsonResponse({"error": f"Máximo {max_operations} operaciones por lote"}, status=400)
+
+            if not all(isinstance(op, dict) for op in operations):
+                return JsonResponse({"error": "Cada operación debe ser un objeto"}, status=400)
+
+            results = OdooClient.from_instance(instance).batch(operations)
+            for model in {op.get("model") for op in operations if op.get("method") in ("create", "write", "unlink")}:
+                result_cache.invalidate_model(instance, model)
+            logger.info(f"✅ Lote de {len(operations)} operaciones ejecutado en Odoo")
+            return JsonResponse({"results": results})
+
+        except Exception as e:
+            logger.error(f"❌ Error en batch_view: {e}")
+            return JsonResponse({"error": str(e)}, status=resilience.error_status(e))
 
     return JsonResponse({"error": "Método no permitido"}, status=405)
 
@@ -281,14 +234,19 @@ def register_odoo_instance(request):
             database = data.get("database")
             username = data.get("username")
             password = data.get("password")
+            protocol = data.get("protocol", "xmlrpc")
 
             if not all([name, url, database, username, password]):
                 return JsonResponse({"error": "Faltan parámetros"}, status=400)
 
+            if protocol not in BACKENDS:
+                return JsonResponse({"error": f"Protocolo no soportado: {protocol}"}, status=400)
+
             # Crear instancia en la BD con la contraseña encriptada
             instance, created = OdooInstance.objects.get_or_create(
                 name=name,
-                defaults={"url": url, "database": database, "username": username, "password": password}
+                defaults={"url": url, "database": database, "username": username, "password": password,
+                          "protocol": protocol}
             )
 
             if not created:
@@ -298,7 +256,7 @@ def register_odoo_instance(request):
             return JsonResponse({"success": True, "token": instance.token})
 
         except Exception as e:
-            return JsonResponse({"error": str(e)}, status=500)
+            return JsonResponse({"error": str(e)}, status=resilience.error_status(e))
 
     return JsonResponse({"error": "Método no permitido"}, status=405)
 
@@ -313,24 +271,23 @@ def revoke_token_view(request):
             data = json.loads(request.body.decode("utf-8"))
             token = data.get("token")
 
-            print(f"🔍 Token recibido en la solicitud: {token}")  # 🛠️ Depuración
-
             if not token:
                 return JsonResponse({"error": "Falta el parámetro 'token'"}, status=400)
 
             try:
                 # 🔹 Buscar la instancia en la BD
                 instance = OdooInstance.objects.get(token=token)
-                print(f"✅ Token encontrado en BD: {instance.token}")
+                # ⚠ /api/logs/ es público: nunca se registra el token completo
+                logger.info(f"✅ Token encontrado en BD para la instancia {instance.name}: {str(token)[:6]}…")
 
                 # 🔹 Eliminar el token de la BD
                 instance.token = None
                 instance.expires_at = None
-                instance.save()
+                instance.save(update_fields=["token", "expires_at"])
 
-                # 🔹 Eliminar el token de Redis
-                cache.delete(f"odoo_instance_{token}")
-                print(f"🗑️ Token eliminado de Redis: odoo_instance_{token}")
+                # 🔹 Eliminar el token de Redis y de la LRU de todos los procesos
+                instance_resolver.revoke(token)
+                logger.info(f"🗑️ Token eliminado de Redis para la instancia {instance.name}")
 
                 return JsonResponse({"success": True, "message": "Token revocado correctamente"})
 
@@ -340,7 +297,7 @@ def revoke_token_view(request):
         except json.JSONDecodeError:
             return JsonResponse({"error": "Error al procesar la solicitud, formato JSON inválido"}, status=400)
         except Exception as e:
-            return JsonResponse({"error": str(e)}, status=500)
+            return JsonResponse({"error": str(e)}, status=resilience.error_status(e))
 
     return JsonResponse({"error": "Método no permitido"}, status=405)
 
@@ -363,31 +320,22 @@ def verify_odoo_user(request):
         except OdooInstance.DoesNotExist:
             return Response({"error": "Instancia no encontrada"}, status=404)
 
-        # 🔹 Conectarse a Odoo y verificar credenciales
-        common = xmlrpc.client.ServerProxy(f"{instance.url}/xmlrpc/2/common")
-        uid = common.authenticate(instance.database, login, password, {})
+        # 🔹 Conectarse a Odoo y verificar credenciales (UID y nombre cacheados, ver credential_cache)
+        client = OdooClient.from_instance(instance, username=login, password=password)
+        user = credential_cache.verify(client, with_name=True)
 
-        if not uid:
+        if not user:
             return Response({"valid": False, "message": "Usuario o contraseña incorrectos"}, status=401)
 
-        # 🔹 Si la autenticación es exitosa, obtener el nombre del usuario
-        models = xmlrpc.client.ServerProxy(f"{instance.url}/xmlrpc/2/object")
-        user_data = models.execute_kw(
-            instance.database, uid, password,
-            'res.users', 'read', [[uid]], {'fields': ['name']}
-        )
-
-        user_name = user_data[0]['name'] if user_data else "Desconocido"
-
         return Response({
             "valid": True,
             "message": "Usuario autenticado correctamente",
-            "uid": uid,
-            "name": user_name
+            "uid": user["uid"],
+            "name": user["name"]
         })
 
     except Exception as e:
-        return Response({"error": str(e)}, status=500)
+        return Response({"error": str(e)}, status=resilience.error_status(e))
 
 @api_view(["GET"])
 def get_asistencia_records(request):
@@ -408,31 +356,20 @@ def get_asistencia_records(request):
         except OdooInstance.DoesNotExist:
             return Response({"error": "Instancia no encontrada"}, status=404)
 
-        # 🔹 Autenticación en Odoo
-        common = xmlrpc.client.ServerProxy(f"{instance.url}/xmlrpc/2/common")
-        uid = common.authenticate(instance.database, login, password, {})
+        # 🔹 Autenticación en Odoo (cacheada entre workers, ver credential_cache)
+        client = OdooClient.from_instance(instance, username=login, password=password)
+        user = credential_cache.verify(client)
 
-        if not uid:
+        if not user:
             return Response({"valid": False, "message": "Usuario o contraseña incorrectos"}, status=401)
 
-        # 🔹 Obtener la fecha actual con zona horaria
-        tz = pytz.timezone(timezone)
-        today_start = datetime.now(tz).replace(hour=0, minute=0, second=0, microsecond=0).strftime('%Y-%m-%d %H:%M:%S')
-        today_end = datetime.now(tz).replace(hour=23, minute=59, second=59, microsecond=999999).strftime('%Y-%m-%d %H:%M:%S')
-
-        # 🔹 Filtrar solo registros del día actual
-        models = xmlrpc.client.ServerProxy(f"{instance.url}/xmlrpc/2/object")
-        domain = [['horaIngreso', '>=', today_start], ['horaIngreso', '<', today_end]]
-        records = models.execute_kw(
-            instance.database, uid, password,
-            'asi.asistencia', 'search_read', [domain],
-            {'fields': ['name', 'empleadoId', 'horaIngreso','horaSalidaComida', 'horaSalida','horaRegresoComida','id']}
-        )
+        # 🔹 Registros del día actual: carga inicial y luego solo los cambios (ver attendance_cache)
+        records = attendance_cache.get_today(client, timezone)
 
         return Response({"data": records})
 
     except Exception as e:
-        return Response({"error": str(e)}, status=500)
+        return Response({"error": str(e)}, status=resilience.error_status(e))
 
 @api_view(["POST"])
 def create_asistencia_record(request):
@@ -443,6 +380,7 @@ def create_asistencia_record(request):
         login = data.get("login")
         password = data.get("password")
         values = data.get("values", {})
+        timezone = data.get("timezone", "UTC")
 
         if not all([instance_name, login, password, values]):
             return Response({"error": "Faltan parámetros: instance_name, login, password y values"}, status=400)
@@ -453,24 +391,22 @@ def create_asistencia_record(request):
         except OdooInstance.DoesNotExist:
             return Response({"error": "Instancia no encontrada"}, status=404)
 
-        # 🔹 Autenticación en Odoo
-        common = xmlrpc.client.ServerProxy(f"{instance.url}/xmlrpc/2/common")
-        uid = common.authenticate(instance.database, login, password, {})
+        # 🔹 Autenticación en Odoo (cacheada entre workers, ver credential_cache)
+        client = OdooClient.from_instance(instance, username=login, password=password)
+        user = credential_cache.verify(client)
 
-        if not uid:
+        if not user:
             return Response({"valid": False, "message": "Usuario o contraseña incorrectos"}, status=401)
 
         # 🔹 Crear registro en Odoo
-        models = xmlrpc.client.ServerProxy(f"{instance.url}/xmlrpc/2/object")
-        record_id = models.execute_kw(
-            instance.database, uid, password,
-            'asi.asistencia', 'create', [values]
-        )
+        record_id = client.create('asi.asistencia', values)
+        attendance_cache.patch_created(client, timezone, record_id, values)
+        result_cache.invalidate_model(instance, 'asi.asistencia')
 
         return Response({"success": True, "record_id": record_id})
 
     except Exception as e:
-        return Response({"error": str(e)}, status=500)
+        return Response({"error": str(e)}, status=resilience.error_status(e))
 
 
 @api_view(["PUT"])
@@ -494,145 +430,122 @@ def update_asistencia_record(request):
         except OdooInstance.DoesNotExist:
             return Response({"error": "Instancia no encontrada"}, status=404)
 
-        # 🔹 Autenticación en Odoo
-        common = xmlrpc.client.ServerProxy(f"{instance.url}/xmlrpc/2/common")
-        uid = common.authenticate(instance.database, login, password, {})
+        # 🔹 Autenticación en Odoo (cacheada entre workers, ver credential_cache)
+        client = OdooClient.from_instance(instance, username=login, password=password)
+        user = credential_cache.verify(client)
 
-        if not uid:
+        if not user:
             return Response({"valid": False, "message": "Usuario o contraseña incorrectos"}, status=401)
 
-        models = xmlrpc.client.ServerProxy(f"{instance.url}/xmlrpc/2/object")
-
         # 🔹 Actualizar el registro
-        success = models.execute_kw(
-            instance.database, uid, password,
-            'asi.asistencia', 'write', [[record_id], values]
-        )
+        success = client.write('asi.asistencia', [record_id], values)
+        attendance_cache.patch_updated(client, timezone, record_id, values)
+        result_cache.invalidate_model(instance, 'asi.asistencia')
 
         return Response({"success": success})
 
     except Exception as e:
-        return Response({"error": str(e)}, status=500)
+        return Response({"error": str(e)}, status=resilience.error_status(e))
+
+
+@api_view(["POST"])
+def bulk_asistencia_records(request):
+    """ Endpoint para ingerir en lote los marcajes acumulados por un reloj sin conexión """
+    try:
+        data = request.data
+        instance_name = data.get("instance_name")
+        login = data.get("login")
+        password = data.get("password")
+        punches = data.get("punches")
+
+        if not all([instance_name, login, password]):
+            return Response({"error": "Faltan parámetros: instance_name, login, password y punches"}, status=400)
+
+        error = attendance_bulk.validate(punches)
+        if error:
+            return Response({"error": error}, status=400)
+
+        # 🔹 Buscar la instancia en la BD
+        try:
+            instance = OdooInstance.objects.get(name=instance_name)
+        except OdooInstance.DoesNotExist:
+            return Response({"error": "Instancia no encontrada"}, status=404)
+
+        # 🔹 Autenticación en Odoo (una sola vez para todo el lote)
+        client = OdooClient.from_instance(instance, username=login, password=password)
+        user = credential_cache.verify(client)
+
+        if not user:
+            return Response({"valid": False, "message": "Usuario o contraseña incorrectos"}, status=401)
+
+        try:
+            results = attendance_bulk.ingest(client, instance_name, punches)
+        finally:
+            # Aunque el lote falle a mitad, Odoo pudo haber creado o modificado registros
+            result_cache.invalidate_model(instance, 'asi.asistencia')
+        ingested = sum(1 for r in results if r["success"] and not r.get("duplicate"))
+        logger.info(f"✅ Lote de {len(punches)} marcajes: {ingested} ingeridos")
+
+        return Response({"results": results})
+
+    except Exception as e:
+        return Response({"error": str(e)}, status=resilience.error_status(e))
 
 
 #crea servicios de usuarios
 @api_view(["GET"])
 def get_odoo_groups(request):
     try:
-        token = request.headers.get("Authorization")
-        if not token:
-            return Response({"error": "Falta token"}, status=401)
-
-        # Cargar instancia de Redis o BD
-        instance_data = cache.get(f"odoo_instance_{token}")
-        if instance_data:
-            instance_data = json.loads(instance_data)
-        else:
-            try:
-                instance = OdooInstance.objects.get(token=token)
-                if instance.is_token_expierd():
-                    return Response({"error": "Token expirado"}, status=401)
-                instance_data = {
-                    "url": instance.url,
-                    "database": instance.database,
-                    "username": instance.username,
-                    "password": instance.password
-                }
-            except OdooInstance.DoesNotExist:
-                return Response({"error": "Token inválido"}, status=401)
+        instance = request.odoo_instance  # Resuelto por OdooInstanceMiddleware
 
         # Conectarse a Odoo
-        common = xmlrpc.client.ServerProxy(f"{instance_data['url']}/xmlrpc/2/common")
-        uid = common.authenticate(instance_data["database"], instance_data["username"], instance_data["password"], {})
-        models = xmlrpc.client.ServerProxy(f"{instance_data['url']}/xmlrpc/2/object")
-
-        # Buscar todos los grupos
-        group_ids = models.execute_kw(
-            instance_data["database"], uid, instance_data["password"],
-            'res.groups', 'search', [[]]
-        )
-
-        groups = models.execute_kw(
-            instance_data["database"], uid, instance_data["password"],
-            'res.groups', 'read',
-            [group_ids], {'fields': ['id', 'name','display_name']}
-        )
+        client = OdooClient.from_instance(instance)
+
+        # Catálogo de grupos cacheado por instancia (ver group_catalog)
+        groups = group_catalog.get(client, instance)["groups"]
 
         return Response(groups)
 
     except Exception as e:
-        return Response({"error": str(e)}, status=500)
+        return Response({"error": str(e)}, status=resilience.error_status(e))
+
+@api_view(["POST"])
+def refresh_odoo_groups(request):
+    """ Recarga el catálogo de grupos de la instancia (p. ej. tras crear grupos en Odoo) """
+    try:
+        instance = request.odoo_instance  # Resuelto por OdooInstanceMiddleware
+
+        catalog = group_catalog.load(OdooClient.from_instance(instance), instance)
+        logger.info(f"🔄 Catálogo de grupos recargado: {len(catalog['groups'])} grupos")
+
+        return Response({"success": True, "groups": len(catalog["groups"]), "tipos": len(catalog["suffix_index"])})
+
+    except Exception as e:
+        return Response({"error": str(e)}, status=resilience.error_status(e))
 
 @csrf_exempt
 @api_view(["POST"])
 def create_user_core(request):
     try:
         data = request.data
-        required = ["name", "login", "email", "password_new", "tipo"]
-        for r in required:
-            if r not in data:
-                return Response({"error": f"Falta el campo '{r}'"}, status=400)
-
-        token = request.headers.get("Authorization")
-        if not token:
-            return Response({"error": "Falta token"}, status=401)
-
-        instance_data = cache.get(f"odoo_instance_{token}")
-        if instance_data:
-            instance_data = json.loads(instance_data)
-        else:
-            try:
-                instance = OdooInstance.objects.get(token=token)
-                if instance.is_token_expierd():
-                    return Response({"error": "Token expirado"}, status=401)
-                instance_data = {
-                    "url": instance.url,
-                    "database": instance.database,
-                    "username": instance.username,
-                    "password": instance.password
-                }
-            except OdooInstance.DoesNotExist:
-                return Response({"error": "Token inválido"}, status=401)
+        missing = user_bulk.missing_field(data)
+        if missing:
+            return Response({"error": f"Falta el campo '{missing}'"}, status=400)
+
+        instance = request.odoo_instance  # Resuelto por OdooInstanceMiddleware
 
         # Conexión a Odoo
-        common = xmlrpc.client.ServerProxy(f"{instance_data['url']}/xmlrpc/2/common")
-        uid = common.authenticate(instance_data["database"], instance_data["username"], instance_data["password"], {})
-        models = xmlrpc.client.ServerProxy(f"{instance_data['url']}/xmlrpc/2/object")
-
-        # Obtener todos los grupos
-        group_ids = models.execute_kw(
-            instance_data["database"], uid, instance_data["password"],
-            'res.groups', 'search', [[]]
-        )
-        groups = models.execute_kw(
-            instance_data["database"], uid, instance_data["password"],
-            'res.groups', 'read',
-            [group_ids], {'fields': ['id', 'display_name']}
-        )
-
-        # Buscar grupos que coincidan con el tipo
-        tipo_buscado = f"/ {data['tipo']}".lower()
-        tipo_ids = [
-            g['id'] for g in groups if tipo_buscado in g['display_name'].lower()
-        ]
-
-        if not tipo_ids:
-            return Response({"error": f"No se encontraron grupos con tipo '{data['tipo']}'"}, status=404)
+        client = OdooClient.from_instance(instance)
 
-        # Agregar grupo obligatorio con ID 1
-        all_group_ids = list(set(tipo_ids + [1]))
+        # Grupos del tipo (índice del catálogo cacheado) más el grupo obligatorio con ID 1
+        all_group_ids = user_bulk.group_ids_for(group_catalog.get(client, instance), data['tipo'])
+
+        if not all_group_ids:
+            return Response({"error": f"No se encontraron grupos con tipo '{data['tipo']}'"}, status=404)
 
         # Crear usuario
-        user_id = models.execute_kw(
-            instance_data["database"], uid, instance_data["password"],
-            'res.users', 'create', [{
-                'name': data['name'],
-                'login': data['login'],
-                'email': data['email'],
-                'password': data['password_new'],
-                'groups_id': [(6, 0, all_group_ids)]
-            }]
-        )
+        user_id = client.create('res.users', user_bulk.user_values(data, all_group_ids))
+        result_cache.invalidate_model(instance, 'res.users')
 
         return Response({
             "success": True,
@@ -642,5 +555,32 @@ def create_user_core(request):
         })
 
     except Exception as e:
-        return Response({"error": str(e)}, status=500)
+        return Response({"error": str(e)}, status=resilience.error_status(e))
+
+
+@api_view(["POST"])
+def create_users_core(request):
+    """ Alta en lote de usuarios: grupos resueltos una vez y creates agrupados en paralelo """
+    try:
+        users = request.data.get("users")
+        max_users = getattr(settings, "ODOO_USER_BULK", {}).get("MAX_USERS", 500)
+
+        if not isinstance(users, list) or not users:
+            return Response({"error": 'El parámetro "users" debe ser una lista no vacía'}, status=400)
+        if len(users) > max_users:
+            return Response({"error": f"Máximo {max_users} usuarios por lote"}, status=400)
 
+        instance = request.odoo_instance  # Resuelto por OdooInstanceMiddleware
+
+        try:
+            results = user_bulk.provision(OdooClient.from_instance(instance), instance, users)
+        finally:
+            # Aunque un bloque falle por red, los anteriores ya quedaron creados
+            result_cache.invalidate_model(instance, 'res.users')
+        created = sum(1 for r in results if r["success"])
+        logger.info(f"✅ Alta en lote: {created} de {len(users)} usuarios creados")
+
+        return Response({"results": results, "created": created, "failed": len(users) - created})
+
+    except Exception as e:
+        return Response({"error": str(e)}, status=resilience.error_status(e))
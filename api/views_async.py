@@ -0,0 +1,231 @@
+"""Versiones asíncronas (ASGI) de los endpoints CRUD y de asistencia.
+
+Mismos parámetros y respuestas que ``views.py``, pero la espera a Odoo no
+bloquea el worker: bajo uvicorn un proceso atiende cientos de llamadas en vuelo.
+"""
+import json
+import logging
+from asgiref.sync import sync_to_async
+from django.views.decorators.csrf import csrf_exempt
+from .models import OdooInstance
+from .fast_json import JsonResponse
+from .odoo_async import AsyncOdooClient
+from .odoo_client import OdooClient
+from . import attendance_cache, credential_cache, field_metadata, resilience, result_cache
+
+logger = logging.getLogger(__name__)
+
+
+async def _aget_employee_client(data):
+    """ Devuelve ``(instance, client, sync_client, error_response)`` para las credenciales de un empleado
+
+    Las credenciales se verifican con ``credential_cache`` como en ``views.py``; el
+    cliente síncrono es para ``attendance_cache``, que se ejecuta en un hilo. Ambos
+    comparten la caché de sesiones, así que ninguno vuelve a hacer login.
+    """
+    try:
+        instance = await OdooInstance.objects.aget(name=data.get("instance_name"))
+    except OdooInstance.DoesNotExist:
+        return None, None, None, JsonResponse({"error": "Instancia no encontrada"}, status=404)
+
+    credentials = {"username": data.get("login"), "password": data.get("password")}
+    sync_client = OdooClient.from_instance(instance, **credentials)
+    # thread_sensitive=False: en caso de fallo de la caché hay un login bloqueante a Odoo
+    if not await sync_to_async(credential_cache.verify, thread_sensitive=False)(sync_client):
+        return None, None, None, JsonResponse({"valid": False, "message": "Usuario o contraseña incorrectos"}, status=401)
+    return instance, AsyncOdooClient.from_instance(instance, **credentials), sync_client, None
+
+
+@csrf_exempt
+async def get_records(request):
+    """ Endpoint asíncrono para consultar registros en Odoo """
+    if request.method != "GET":
+        return JsonResponse({"error": "Método no permitido"}, status=405)
+
+    instance = request.odoo_instance  # Resuelto por OdooInstanceMiddleware
+
+    try:
+        model = request.GET.get("model")
+        if not model:
+            return JsonResponse({"error": 'El parámetro "model" es obligatorio'}, status=400)
+
+        domain = json.loads(request.GET.get("domain", "[]"))
+        fields = json.loads(request.GET.get("fields", "[]"))
+        try:
+            limit = int(request.GET["limit"]) if request.GET.get("limit") else None
+            offset = int(request.GET.get("offset") or 0)
+        except ValueError:
+            return JsonResponse({"error": 'Los parámetros "limit" y "offset" deben ser enteros'}, status=400)
+        if (limit is not None and limit <= 0) or offset < 0:
+            return JsonResponse({"error": 'El parámetro "limit" debe ser mayor que 0 y "offset" no puede ser negativo'}, status=400)
+
+        client = AsyncOdooClient.from_instance(instance)
+        try:
+            fields = await field_metadata.aresolve(client, instance, model, fields)
+        except field_metadata.InvalidFields as e:
+            return JsonResponse({"error": str(e)}, status=400)
+
+        order = request.GET.get("order") or None
+        data, from_cache = await result_cache.aget_or_fetch(
+            instance, model, domain, fields,
+            lambda: client.search_read(model, domain, fields, limit=limit, offset=offset, order=order),
+            limit=limit, offset=offset, order=order,
+        )
+        response = JsonResponse({"data": data, "cached": from_cache}, safe=False)
+        response["X-Cache"] = "HIT" if from_cache else "MISS"
+        return response
+
+    except Exception as e:
+        logger.error(f"❌ Error en get_records (async): {e}")
+        return JsonResponse({"error": str(e)}, status=resilience.error_status(e))
+
+
+@csrf_exempt
+async def create_record_view(request):
+    """ Endpoint asíncrono para crear un registro en Odoo """
+    if request.method != "POST":
+        return JsonResponse({"error": "Método no permitido"}, status=405)
+
+    instance = request.odoo_instance  # Resuelto por OdooInstanceMiddleware
+
+    try:
+        data = json.loads(request.body.decode("utf-8"))
+        model = data.get("model")
+        values = data.get("values", {})
+
+        if not model or not values:
+            return JsonResponse({"error": 'Faltan parámetros "model" o "values"'}, status=400)
+
+        record_id = await AsyncOdooClient.from_instance(instance).create(model, values)
+        await sync_to_async(result_cache.invalidate_model)(instance, model)
+        return JsonResponse({"success": True, "record_id": record_id})
+
+    except Exception as e:
+        logger.error(f"❌ Error en create_record_view (async): {e}")
+        return JsonResponse({"error": str(e)}, status=resilience.error_status(e))
+
+
+@csrf_exempt
+async def update_record_view(request):
+    """ Endpoint asíncrono para actualizar un registro en Odoo """
+    if request.method != "PUT":
+        return JsonResponse({"error": "Método no permitido"}, status=405)
+
+    instance = request.odoo_instance  # Resuelto por OdooInstanceMiddleware
+
+    try:
+        data = json.loads(request.body.decode("utf-8"))
+        model = data.get("model")
+        record_id = data.get("id")
+        values = data.get("values", {})
+
+        if not model or not record_id or not values:
+            return JsonResponse({"error": 'Faltan parámetros "model", "id" o "values"'}, status=400)
+
+        success = await AsyncOdooClient.from_instance(instance).write(model, [record_id], values)
+        await sync_to_async(result_cache.invalidate_model)(instance, model)
+        return JsonResponse({"success": success})
+
+    except Exception as e:
+        return JsonResponse({"error": str(e)}, status=resilience.error_status(e))
+
+
+@csrf_exempt
+async def delete_record_view(request):
+    """ Endpoint asíncrono para eliminar un registro en Odoo """
+    if request.method != "DELETE":
+        return JsonResponse({"error": "Método no permitido"}, status=405)
+
+    instance = request.odoo_instance  # Resuelto por OdooInstanceMiddleware
+
+    try:
+        data = json.loads(request.body.decode("utf-8"))
+        model = data.get("model")
+        record_id = data.get("id")
+
+        if not model or not record_id:
+            return JsonResponse({"error": 'Faltan parámetros "model" o "id"'}, status=400)
+
+        success = await AsyncOdooClient.from_instance(instance).unlink(model, [record_id])
+        await sync_to_async(result_cache.invalidate_model)(instance, model)
+        return JsonResponse({"success": success})
+
+    except Exception as e:
+        return JsonResponse({"error": str(e)}, status=resilience.error_status(e))
+
+
+async def get_asistencia_records(request):
+    """ Endpoint asíncrono para obtener registros de asistencia del día actual """
+    if request.method != "GET":
+        return JsonResponse({"error": "Método no permitido"}, status=405)
+
+    try:
+        data = request.GET
+        timezone = data.get("timezone", "UTC")
+
+        if not all([data.get("instance_name"), data.get("login"), data.get("password")]):
+            return JsonResponse({"error": "Faltan parámetros: instance_name, login y password"}, status=400)
+
+        _, _, sync_client, error = await _aget_employee_client(data)
+        if error:
+            return error
+
+        # 🔹 Mismo caché del día que la vista síncrona (ver attendance_cache)
+        records = await sync_to_async(attendance_cache.get_today, thread_sensitive=False)(sync_client, timezone)
+        return JsonResponse({"data": records})
+
+    except Exception as e:
+        return JsonResponse({"error": str(e)}, status=resilience.error_status(e))
+
+
+@csrf_exempt
+async def create_asistencia_record(request):
+    """ Endpoint asíncrono para crear un registro de asistencia """
+    if request.method != "POST":
+        return JsonResponse({"error": "Método no permitido"}, status=405)
+
+    try:
+        data = json.loads(request.body.decode("utf-8"))
+        values = data.get("values", {})
+
+        if not all([data.get("instance_name"), data.get("login"), data.get("password"), values]):
+            return JsonResponse({"error": "Faltan parámetros: instance_name, login, password y values"}, status=400)
+
+        instance, client, sync_client, error = await _aget_employee_client(data)
+        if error:
+            return error
+
+        record_id = await client.create('asi.asistencia', values)
+        await sync_to_async(attendance_cache.patch_created)(sync_client, data.get("timezone", "UTC"), record_id, values)
+        await sync_to_async(result_cache.invalidate_model)(instance, 'asi.asistencia')
+        return JsonResponse({"success": True, "record_id": record_id})
+
+    except Exception as e:
+        return JsonResponse({"error": str(e)}, status=resilience.error_status(e))
+
+
+@csrf_exempt
+async def update_asistencia_record(request):
+    """ Endpoint asíncrono para actualizar un registro de asistencia """
+    if request.method != "PUT":
+        return JsonResponse({"error": "Método no permitido"}, status=405)
+
+    try:
+        data = json.loads(request.body.decode("utf-8"))
+        record_id = data.get("id")
+        values = data.get("values", {})
+
+        if not all([data.get("instance_name"), data.get("login"), data.get("password"), record_id, values]):
+            return JsonResponse({"error": "Faltan parámetros: instance_name, login, password, id y values"}, status=400)
+
+        instance, client, sync_client, error = await _aget_employee_client(data)
+        if error:
+            return error
+
+        success = await client.write('asi.asistencia', [record_id], values)
+        await sync_to_async(attendance_cache.patch_updated)(sync_client, data.get("timezone", "UTC"), record_id, values)
+        await sync_to_async(result_cache.invalidate_model)(instance, 'asi.asistencia')
+        return JsonResponse({"success": success})
+
+    except Exception as e:
+        return JsonResponse({"error": str(e)}, status=resilience.error_status(e))
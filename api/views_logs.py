@@ -1,35 +1,247 @@
-from django.shortcuts import render
-from django.http import HttpResponse
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils.html import escape
+import asyncio
+import glob
+import json
 import os
+import time
 
 LOG_FILE_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "api_logs.log")
 
+TAIL_BLOCK_SIZE = 8192
+MAX_TAIL_LINES = 1000
+SSE_POLL_INTERVAL = 1.0
+SSE_KEEPALIVE = 15
+# 🔹 Cada conexión SSE se cierra tras este tiempo; el navegador reconecta con Last-Event-ID
+SSE_MAX_DURATION = 300
+# Bajo WSGI: cada cuánto reconecta el navegador para pedir líneas nuevas
+SSE_POLL_RETRY_MS = 2000
+
+
+def _matches(line, level=None, module=None):
+    """ Filtra por nivel/módulo en formato ``verbose`` (``{levelname} {asctime} {module} {message}``) o JSON """
+    if not level and not module:
+        return True
+    if line.startswith("{"):
+        # Formato JSON (LOG_JSON=1)
+        try:
+            record = json.loads(line)
+        except ValueError:
+            return False
+        return (not level or record.get("level") == level) and (not module or record.get("module") == module)
+    parts = line.split(" ", 4)
+    if len(parts) < 5:
+        return False
+    if level and parts[0] != level:
+        return False
+    if module and parts[3] != module:
+        return False
+    return True
+
+
+def tail_lines(path, count, level=None, module=None):
+    """ Devuelve las últimas ``count`` líneas leyendo el archivo hacia atrás por bloques """
+    with open(path, "rb") as log_file:
+        log_file.seek(0, os.SEEK_END)
+        position = log_file.tell()
+        lines = []
+        remainder = b""
+        while position > 0 and len(lines) < count:
+            size = min(TAIL_BLOCK_SIZE, position)
+            position -= size
+            log_file.seek(position)
+            chunk = log_file.read(size) + remainder
+            parts = chunk.split(b"\n")
+            # La primera parte puede ser una línea incompleta: se completa en el siguiente bloque
+            remainder = parts.pop(0) if position > 0 else b""
+            for raw in reversed(parts):
+                line = raw.decode("utf-8", errors="replace")
+                if line and _matches(line, level, module):
+                    lines.append(line)
+                    if len(lines) >= count:
+                        break
+        if remainder and len(lines) < count:
+            line = remainder.decode("utf-8", errors="replace")
+            if _matches(line, level, module):
+                lines.append(line)
+    return list(reversed(lines))
+
 
 def logs_view(request):
-    """ Vista para ver logs con auto-limpieza si el archivo es demasiado grande """
+    """ Vista para ver los últimos logs (la rotación la hace el handler de logging) """
     try:
-        if os.path.exists(LOG_FILE_PATH):
-            file_size = os.path.getsize(LOG_FILE_PATH) / (1024 * 1024)  # Convertir a MB
-
-            if file_size > 10:  # Si el archivo es mayor a 10 MB, lo borra
-                with open(LOG_FILE_PATH, "w") as log_file:
-                    log_file.write("")
+        try:
+            count = min(int(request.GET.get("lines", 50)), MAX_TAIL_LINES)
+        except ValueError:
+            count = 50
+        level = request.GET.get("level") or None
+        module = request.GET.get("module") or None
 
-        with open(LOG_FILE_PATH, "r") as log_file:
-            logs = log_file.readlines()
+        logs = tail_lines(LOG_FILE_PATH, count, level, module)
 
+        stream_url = "/api/logs/stream/?" + request.GET.urlencode() if request.GET else "/api/logs/stream/"
         html = f"""
         <html>
         <head>
-            <meta http-equiv="refresh" content="5">
             <title>Logs de la API</title>
         </head>
         <body>
-            <h2>Logs de la API (últimos 50 registros)</h2>
-            <pre>{''.join(logs[-50:])}</pre>
+            <h2>Logs de la API (últimos {count} registros)</h2>
+            <pre id="logs">{escape(chr(10).join(logs))}</pre>
+            <script>
+                // 🔹 Las líneas nuevas llegan por SSE en lugar de recargar la página
+                const pre = document.getElementById("logs");
+                const source = new EventSource({json.dumps(stream_url)});
+                source.onmessage = (event) => {{
+                    pre.textContent += "\\n" + event.data;
+                    window.scrollTo(0, document.body.scrollHeight);
+                }};
+            </script>
         </body>
         </html>
         """
         return HttpResponse(html)
     except Exception as e:
-        return HttpResponse(f"Error al leer los logs: {e}")
+        return HttpResponse(f"Error al leer los logs: {escape(str(e))}")
+
+
+def _open_at(path, inode, offset):
+    """ Abre el archivo que corresponde a ``inode`` (actual o ya rotado) posicionado en ``offset`` """
+    # RotatingFileHandler renombra a ``.1``; TimedRotatingFileHandler a ``.<fecha>``
+    rotated = sorted(glob.glob(f"{glob.escape(path)}.*"), key=os.path.getmtime, reverse=True)
+    for candidate in [path] + rotated:
+        try:
+            stat = os.stat(candidate)
+        except FileNotFoundError:
+            continue
+        if stat.st_ino == inode and stat.st_size >= offset:
+            log_file = open(candidate, "rb")
+            log_file.seek(offset)
+            return log_file, candidate != path
+    return None, False
+
+
+class _LogFollower:
+    """ Lee las líneas nuevas del archivo de logs a partir de ``<inode>:<offset>``, siguiendo rotaciones """
+
+    def __init__(self, path, inode, offset, level, module):
+        self.path = path
+        self.level = level
+        self.module = module
+        self.file, self.rotated = (None, False)
+        if inode is not None:
+            self.file, self.rotated = _open_at(path, inode, offset)
+        self.pending = b""
+        if self.file is None:
+            # Sin posición guardada se empieza al final; si el archivo rotado ya no existe, desde el inicio
+            self._reopen(at_end=inode is None)
+        else:
+            self.inode = os.fstat(self.file.fileno()).st_ino
+
+    def _reopen(self, at_end=False):
+        """ Abre el archivo actual; si aún no existe queda en ``0:0`` y se reintenta en cada ``poll`` """
+        self.rotated = False
+        self.pending = b""
+        try:
+            self.file = open(self.path, "rb")
+        except FileNotFoundError:
+            self.file = None
+            self.inode = 0
+            return
+        if at_end:
+            self.file.seek(0, os.SEEK_END)
+        self.inode = os.fstat(self.file.fileno()).st_ino
+
+    @property
+    def position(self):
+        if self.file is None:
+            return "0:0"
+        return f"{self.inode}:{self.file.tell() - len(self.pending)}"
+
+    def poll(self):
+        """ Devuelve las líneas ``data:`` nuevas sin bloquear (lista vacía si no hay nada) """
+        events = []
+        if self.file is None:
+            # ⚠ El archivo aún no existe (p. ej. bajo uvicorn con LOG_SOCKET): se sigue desde su inicio
+            self._reopen()
+            if self.file is None:
+                return events
+        while True:
+            chunk = self.file.read(64 * 1024)
+            if chunk:
+                self.pending += chunk
+                *lines, self.pending = self.pending.split(b"\n")
+                for raw in lines:
+                    line = raw.decode("utf-8", errors="replace")
+                    if line and _matches(line, self.level, self.module):
+                        events.append(f"data: {line}\n")
+                continue
+
+            # 🔹 Fin del archivo: ¿hubo rotación o truncado?
+            try:
+                current = os.stat(self.path)
+            except FileNotFoundError:
+                current = None
+            if self.rotated or (current and (current.st_ino != self.inode or current.st_size < self.file.tell())):
+                self.file.close()
+                self._reopen()
+                if self.file is None:
+                    return events
+                continue
+            return events
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+
+
+async def _follow(follower):
+    """ Generador SSE asíncrono (ASGI): no ocupa un hilo mientras espera líneas nuevas """
+    yield f"retry: {SSE_POLL_RETRY_MS}\n\n"
+    started = last_sent = time.monotonic()
+    try:
+        while time.monotonic() - started < SSE_MAX_DURATION:
+            events = follower.poll()
+            if events:
+                yield "".join(events) + f"id: {follower.position}\n\n"
+                last_sent = time.monotonic()
+            elif time.monotonic() - last_sent >= SSE_KEEPALIVE:
+                yield ": keepalive\n\n"
+                last_sent = time.monotonic()
+            await asyncio.sleep(SSE_POLL_INTERVAL)
+    finally:
+        follower.close()
+
+
+def logs_stream_view(request):
+    """ Endpoint SSE que sigue el archivo de logs de forma incremental.
+
+    Bajo ASGI la conexión queda abierta (generador asíncrono). Bajo WSGI un
+    stream largo bloquearía un worker sync, así que se responde con las líneas
+    nuevas y se cierra: el navegador reconecta tras ``retry`` con el
+    ``Last-Event-ID`` recibido (sondeo corto).
+    """
+    inode = offset = None
+    last_event_id = request.headers.get("Last-Event-ID") or request.GET.get("last_event_id")
+    if last_event_id:
+        try:
+            inode, offset = (int(value) for value in last_event_id.split(":", 1))
+        except ValueError:
+            inode = offset = None
+
+    follower = _LogFollower(LOG_FILE_PATH, inode, offset or 0, request.GET.get("level") or None,
+                            request.GET.get("module") or None)
+    if isinstance(request, ASGIRequest):
+        response = StreamingHttpResponse(_follow(follower), content_type="text/event-stream")
+    else:
+        try:
+            events = follower.poll()
+            # El id se envía aunque no haya líneas: así la reconexión sigue desde aquí
+            body = f"retry: {SSE_POLL_RETRY_MS}\n\n" + "".join(events) + f"id: {follower.position}\n\n"
+        finally:
+            follower.close()
+        response = HttpResponse(body, content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
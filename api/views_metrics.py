@@ -0,0 +1,38 @@
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import HttpResponse
+from django.views.decorators.http import require_http_methods
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, generate_latest
+from prometheus_client import multiprocess
+import json
+import os
+from . import resilience
+from .fast_json import JsonResponse
+
+
+def metrics_view(request):
+    """ Métricas en formato de texto de Prometheus, agregadas entre todos los workers """
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        # 🔹 Cada worker escribe sus métricas en el directorio compartido; aquí se suman
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return HttpResponse(generate_latest(registry), content_type=CONTENT_TYPE_LATEST)
+
+
+@staff_member_required
+@require_http_methods(["GET", "POST"])
+def odoo_circuits_view(request):
+    """ Estado de los circuit breakers y bulkheads de todos los workers (POST {"instance"} cierra un circuito)
+
+    Con Redis la consulta y el reinicio se difunden a todos los procesos (ver
+    ``resilience.cluster_snapshot``); sin Redis solo existe este proceso. Un POST
+    sin ``instance`` cierra todos los circuitos.
+    """
+    if request.method == "POST":
+        try:
+            instance = json.loads(request.body or b"{}").get("instance")
+        except (ValueError, AttributeError):
+            return JsonResponse({"error": "JSON inválido"}, status=400)
+        return JsonResponse(resilience.cluster_snapshot(reset_circuits=True, instance=instance))
+    return JsonResponse(resilience.cluster_snapshot())
@@ -0,0 +1,52 @@
+"""Compara req/s de la ruta WSGI (gunicorn sync) contra la ruta ASGI (uvicorn + vistas async).
+
+Ambos modos usan un solo worker y consultan un Odoo de mentira con latencia fija,
+que es justo el caso en el que un worker sync se queda esperando I/O.
+
+Uso:
+    python -m bench.asgi_vs_wsgi --latency-ms 50 --concurrency 100 --duration 10
+"""
+import argparse
+from bench.common import (BENCH_TOKEN, cleanup_database, free_port, prepare_database, print_json, run_load,
+                          start_api, stop_api)
+from bench.fake_odoo import start_server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--latency-ms", type=float, default=50)
+    parser.add_argument("--rows", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--protocol", choices=["xmlrpc", "jsonrpc"], default="xmlrpc")
+    args = parser.parse_args()
+
+    # El Odoo de mentira corre en este proceso; la API en subprocesos
+    _, odoo_url = start_server(latency_ms=args.latency_ms, rows=args.rows)
+    prepare_database(odoo_url, protocol=args.protocol)
+    headers = {"Authorization": BENCH_TOKEN}
+
+    try:
+        results = {"config": vars(args)}
+        for mode, path in (("wsgi", "/api/get_records/"), ("asgi", "/api/async/get_records/")):
+            port = free_port()
+            proc = start_api(mode, port)
+            try:
+                results[mode] = run_load(
+                    f"http://127.0.0.1:{port}",
+                    lambda i: ("GET", f"{path}?model=res.partner&limit={args.rows}", None, headers),
+                    concurrency=args.concurrency,
+                    duration=args.duration,
+                )
+            finally:
+                stop_api(proc)
+    finally:
+        cleanup_database()
+
+    if results["wsgi"]["rps"]:
+        results["speedup"] = round(results["asgi"]["rps"] / results["wsgi"]["rps"], 2)
+    print_json(results)
+
+
+if __name__ == "__main__":
+    main()
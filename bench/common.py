@@ -0,0 +1,215 @@
+"""Utilidades compartidas por los scripts de benchmark.
+
+Levantan la API con gunicorn (WSGI) o uvicorn (ASGI) apuntando a
+``bench.settings``, preparan una instancia de Odoo con token y generan carga
+concurrente con conexiones keep-alive.
+"""
+import http.client
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+from urllib.parse import urlsplit
+
+ROOT = Path(__file__).resolve().parent.parent
+BENCH_TOKEN = "bench-token"
+BENCH_INSTANCE = "bench"
+BENCH_PASSWORD = "admin"
+
+
+def bench_env(**extra):
+    env = dict(os.environ)
+    env.setdefault("DJANGO_SETTINGS_MODULE", "bench.settings")
+    env["PYTHONPATH"] = str(ROOT) + os.pathsep + env.get("PYTHONPATH", "")
+    env.update({k: str(v) for k, v in extra.items()})
+    return env
+
+
+def setup_django():
+    """Inicializa Django con los settings de benchmark en este proceso."""
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "bench.settings")
+    sys.path.insert(0, str(ROOT))
+    import django
+    django.setup()
+
+
+def prepare_database(odoo_url, protocol="xmlrpc"):
+    """Migra la base de benchmark y registra la instancia con un token fijo (ver ``cleanup_database``)."""
+    setup_django()
+    from django.core.management import call_command
+    from api.models import OdooInstance
+
+    call_command("migrate", verbosity=0, skip_checks=True)
+    OdooInstance.objects.update_or_create(
+        name=BENCH_INSTANCE,
+        defaults={"url": odoo_url, "database": "bench", "username": "admin", "password": BENCH_PASSWORD,
+                  "token": BENCH_TOKEN, "token_lifetime": "forever", "expires_at": None, "protocol": protocol},
+    )
+
+
+def cleanup_database():
+    """Borra la instancia de benchmark: su token fijo no debe sobrevivir a la ejecución."""
+    from api.models import OdooInstance
+
+    OdooInstance.objects.filter(name=BENCH_INSTANCE).delete()
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_api(mode, port, workers=1, threads=1, **env):
+    """Arranca la API en un subproceso: ``mode`` es ``"wsgi"`` (gunicorn sync) o ``"asgi"`` (uvicorn)."""
+    if mode == "wsgi":
+        cmd = [sys.executable, "-m", "gunicorn", "DjangoProject.wsgi:application", "--bind", f"127.0.0.1:{port}",
+               "--workers", str(workers), "--threads", str(threads), "--log-level", "warning"]
+    elif mode == "asgi":
+        cmd = [sys.executable, "-m", "uvicorn", "DjangoProject.asgi:application", "--host", "127.0.0.1",
+               "--port", str(port), "--workers", str(workers), "--log-level", "warning", "--no-access-log"]
+    else:
+        raise ValueError(f"Modo desconocido: {mode}")
+
+    proc = subprocess.Popen(cmd, cwd=ROOT, env=bench_env(**env))
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"El servidor {mode} terminó al arrancar (código {proc.returncode})")
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+                return proc
+        except OSError:
+            time.sleep(0.2)
+    proc.terminate()
+    raise RuntimeError(f"El servidor {mode} no respondió en 30 s")
+
+
+def stop_api(proc):
+    proc.terminate()
+    try:
+        proc.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+
+
+def process_tree(pid):
+    """``pid`` y todos sus descendientes (workers de gunicorn/uvicorn), leyendo ``/proc``."""
+    children = {}
+    for entry in Path("/proc").iterdir():
+        if not entry.name.isdigit():
+            continue
+        try:
+            # El nombre del proceso va entre paréntesis y puede contener espacios
+            stat = (entry / "stat").read_text().rsplit(")", 1)[1].split()
+        except OSError:
+            continue
+        children.setdefault(int(stat[1]), []).append(int(entry.name))
+    tree, pending = [], [pid]
+    while pending:
+        current = pending.pop()
+        tree.append(current)
+        pending.extend(children.get(current, []))
+    return tree
+
+
+def peak_rss_kb(pid):
+    """Pico de memoria residente (``VmHWM``) del proceso y sus hijos, en KiB.
+
+    Devuelve ``{"total": suma, "max": mayor proceso}``; ``None`` fuera de Linux.
+    """
+    peaks = []
+    for member in process_tree(pid):
+        try:
+            for line in Path(f"/proc/{member}/status").read_text().splitlines():
+                if line.startswith("VmHWM:"):
+                    peaks.append(int(line.split()[1]))
+        except OSError:
+            continue
+    if not peaks:
+        return None
+    return {"total": sum(peaks), "max": max(peaks)}
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100.0 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def run_load(base_url, make_request, concurrency=10, duration=10.0, warmup=1.0):
+    """Lanza ``concurrency`` hilos con conexión keep-alive propia durante ``duration`` segundos.
+
+    ``make_request(i)`` devuelve ``(método, ruta, cuerpo_o_None, headers)``.
+    Devuelve un resumen con req/s, percentiles de latencia (ms) y errores.
+    """
+    parts = urlsplit(base_url)
+    latencies = []
+    errors = []
+    status_counts = {}
+    lock = threading.Lock()
+    start_at = time.monotonic() + warmup
+    stop_at = start_at + duration
+
+    def worker(worker_id):
+        conn = http.client.HTTPConnection(parts.hostname, parts.port, timeout=60)
+        i = 0
+        local_latencies = []
+        while True:
+            now = time.monotonic()
+            if now >= stop_at:
+                break
+            method, path, body, headers = make_request(worker_id * 1_000_000 + i)
+            i += 1
+            t0 = time.perf_counter()
+            try:
+                conn.request(method, path, body=body, headers=headers)
+                resp = conn.getresponse()
+                resp.read()
+                status = resp.status
+            except Exception as e:
+                conn.close()
+                conn = http.client.HTTPConnection(parts.hostname, parts.port, timeout=60)
+                with lock:
+                    errors.append(type(e).__name__)
+                continue
+            elapsed = (time.perf_counter() - t0) * 1000
+            # 🔹 Las peticiones iniciadas durante el calentamiento no cuentan
+            if now >= start_at:
+                local_latencies.append(elapsed)
+                with lock:
+                    status_counts[status] = status_counts.get(status, 0) + 1
+        conn.close()
+        with lock:
+            latencies.extend(local_latencies)
+
+    threads = [threading.Thread(target=worker, args=(n,), daemon=True) for n in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "rps": round(len(latencies) / duration, 2),
+        "latency_ms": {
+            "mean": round(statistics.fmean(latencies), 2) if latencies else 0.0,
+            "p50": round(percentile(latencies, 50), 2),
+            "p95": round(percentile(latencies, 95), 2),
+            "p99": round(percentile(latencies, 99), 2),
+            "max": round(latencies[-1], 2) if latencies else 0.0,
+        },
+        "status": {str(k): v for k, v in sorted(status_counts.items())},
+        "errors": len(errors),
+    }
+
+
+def print_json(data):
+    print(json.dumps(data, indent=2, ensure_ascii=False))
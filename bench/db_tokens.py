@@ -0,0 +1,136 @@
+"""Latencia de la búsqueda de tokens en la base de datos bajo concurrencia.
+
+Es la consulta que hace ``instance_resolver`` cuando el token no está en la LRU
+ni en Redis. Cada hilo usa su propia conexión de Django y mezcla lecturas
+(``OdooInstance.objects.get(token=...)``) con una fracción de escrituras que
+imitan ``generate_token``/``use_once_token``. Con SQLite las escrituras toman
+el lock de toda la base; con PostgreSQL (``BENCH_POSTGRES_DB=...``, una base
+dedicada, ver ``bench/settings.py``) solo la fila. Las filas sembradas se
+borran al terminar.
+
+Uso:
+    python -m bench.db_tokens --concurrency 1,8,32 --duration 5 --write-ratio 0.05
+    BENCH_POSTGRES_DB=api_odoo_bench POSTGRES_PASSWORD=... python -m bench.db_tokens
+"""
+import argparse
+import random
+import threading
+import time
+import uuid
+from bench.common import percentile, print_json, setup_django
+
+TOKEN_PREFIX = "bench-db-"
+
+
+def _seed(instances):
+    from django.core.management import call_command
+    from api.models import OdooInstance
+
+    call_command("migrate", verbosity=0, skip_checks=True)
+    OdooInstance.objects.filter(name__startswith=TOKEN_PREFIX).delete()
+    OdooInstance.objects.bulk_create([
+        OdooInstance(name=f"{TOKEN_PREFIX}{i}", url="http://127.0.0.1:8069", database="bench", username="admin",
+                     password="admin", token=f"{TOKEN_PREFIX}{i}", token_lifetime="forever")
+        for i in range(instances)
+    ])
+    return list(OdooInstance.objects.filter(name__startswith=TOKEN_PREFIX).values_list("pk", "token"))
+
+
+def _cleanup():
+    from api.models import OdooInstance
+
+    OdooInstance.objects.filter(name__startswith=TOKEN_PREFIX).delete()
+
+
+def _summary(latencies, duration):
+    latencies.sort()
+    return {
+        "ops": len(latencies),
+        "ops_per_s": round(len(latencies) / duration, 1),
+        "p50_ms": round(percentile(latencies, 50), 3),
+        "p95_ms": round(percentile(latencies, 95), 3),
+        "p99_ms": round(percentile(latencies, 99), 3),
+        "max_ms": round(latencies[-1], 3) if latencies else 0.0,
+    }
+
+
+def run(rows, concurrency, duration, write_ratio):
+    from django.db import connection
+    from api.models import OdooInstance
+
+    reads, writes, errors = [], [], []
+    lock = threading.Lock()
+    # Cada hilo escribe solo en sus filas: se mide la contención del motor, no conflictos lógicos
+    own_rows = [rows[n::concurrency] for n in range(concurrency)]
+    tokens = dict(rows)
+    stop_at = time.monotonic() + duration
+
+    def worker(n):
+        rng = random.Random(n)
+        local_reads, local_writes, local_errors = [], [], []
+        try:
+            while time.monotonic() < stop_at:
+                write = own_rows[n] and rng.random() < write_ratio
+                t0 = time.perf_counter()
+                try:
+                    if write:
+                        pk = rng.choice(own_rows[n])[0]
+                        new_token = f"{TOKEN_PREFIX}{uuid.uuid4()}"
+                        with lock:
+                            old_token = tokens[pk]
+                        # Actualización condicionada, como use_once_token
+                        OdooInstance.objects.filter(pk=pk, token=old_token).update(token=new_token)
+                        with lock:
+                            tokens[pk] = new_token
+                    else:
+                        with lock:
+                            token = tokens[rng.choice(rows)[0]]
+                        OdooInstance.objects.filter(token=token).first()
+                except Exception as e:
+                    local_errors.append(type(e).__name__)
+                    continue
+                (local_writes if write else local_reads).append((time.perf_counter() - t0) * 1000)
+        finally:
+            connection.close()
+            with lock:
+                reads.extend(local_reads)
+                writes.extend(local_writes)
+                errors.extend(local_errors)
+
+    threads = [threading.Thread(target=worker, args=(n,), daemon=True) for n in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    result = {"reads": _summary(reads, duration), "writes": _summary(writes, duration), "errors": len(errors)}
+    if errors:
+        result["error_types"] = sorted(set(errors))
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--instances", type=int, default=1000, help="Filas de OdooInstance con token")
+    parser.add_argument("--concurrency", default="1,8,32", help="Hilos, separados por comas")
+    parser.add_argument("--duration", type=float, default=5)
+    parser.add_argument("--write-ratio", type=float, default=0.05, help="Fracción de operaciones que escriben")
+    args = parser.parse_args()
+
+    setup_django()
+    from django.db import connection
+
+    try:
+        rows = _seed(args.instances)
+        results = {"config": vars(args), "vendor": connection.vendor, "runs": {}}
+        connection.close()
+        for concurrency in (int(c) for c in args.concurrency.split(",")):
+            results["runs"][str(concurrency)] = run(rows, concurrency, args.duration, args.write_ratio)
+    finally:
+        _cleanup()
+        connection.close()
+    print_json(results)
+
+
+if __name__ == "__main__":
+    main()
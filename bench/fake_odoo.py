@@ -0,0 +1,180 @@
+"""Servidor Odoo de mentira para benchmarks y pruebas locales.
+
+Atiende ``/xmlrpc/2/common``, ``/xmlrpc/2/object`` y ``/jsonrpc`` con latencia
+y tamaño de resultados configurables. Acepta cualquier usuario cuya contraseña
+sea ``--password`` (por defecto ``admin``).
+
+Uso:
+    python -m bench.fake_odoo --port 8069 --latency-ms 50 --rows 200
+"""
+import argparse
+import itertools
+import json
+import threading
+import time
+import xmlrpc.client
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class FakeOdoo:
+    """Estado y lógica del Odoo simulado (independiente del protocolo)."""
+
+    def __init__(self, latency_ms=0, rows=100, row_size=64, password="admin"):
+        self.latency = latency_ms / 1000.0
+        self.rows = rows
+        self.row_size = row_size
+        self.password = password
+        self.calls = {}
+        self._ids = itertools.count(1000)
+        self._lock = threading.Lock()
+
+    def _count(self, name):
+        with self._lock:
+            self.calls[name] = self.calls.get(name, 0) + 1
+
+    def _row(self, model, record_id):
+        row = {"id": record_id, "name": f"{model} {record_id}", "display_name": f"{model} {record_id}",
+               "write_date": "2025-01-01 00:00:00", "padding": "x" * self.row_size}
+        if model == "asi.asistencia":
+            row.update({"empleadoId": [1, "Empleado"], "horaIngreso": "2025-01-01 08:00:00",
+                        "horaSalidaComida": False, "horaSalida": False, "horaRegresoComida": False})
+        return row
+
+    @staticmethod
+    def _group(group_id):
+        return {"id": group_id, "name": f"Nivel {group_id % 3}",
+                "display_name": f"Categoria {group_id} / Nivel {group_id % 3}"}
+
+    def dispatch(self, service, method, args):
+        if self.latency:
+            time.sleep(self.latency)
+
+        if service == "common":
+            self._count("authenticate")
+            if method == "authenticate":
+                return 2 if args[2] == self.password else False
+            if method == "version":
+                return {"server_version": "17.0"}
+            raise xmlrpc.client.Fault(1, f"Method not available {method}")
+
+        if service != "object" or method != "execute_kw":
+            raise xmlrpc.client.Fault(1, f"Method not available {method}")
+
+        db, uid, password, model, model_method = args[:5]
+        call_args = args[5] if len(args) > 5 else []
+        kwargs = args[6] if len(args) > 6 else {}
+        self._count(model_method)
+        if password != self.password:
+            raise xmlrpc.client.Fault(3, "odoo.exceptions.AccessDenied: Access Denied")
+
+        if model == "res.groups" and model_method == "search":
+            return list(range(1, 21))
+        if model == "res.groups" and model_method == "read":
+            return [self._group(i) for i in call_args[0]]
+        if model == "res.groups" and model_method == "search_read":
+            return [self._group(i) for i in range(1, 21)]
+        if model_method == "search":
+            return list(range(1, self.rows + 1))
+        if model_method == "search_read":
+            offset = kwargs.get("offset", 0)
+            limit = kwargs.get("limit") or self.rows
+            return [self._row(model, i) for i in range(offset + 1, min(self.rows, offset + limit) + 1)]
+        if model_method == "search_count":
+            return self.rows
+        if model_method == "read":
+            return [self._row(model, i) for i in call_args[0]]
+        if model_method == "fields_get":
+            return {
+                "id": {"type": "integer", "store": True, "string": "ID"},
+                "name": {"type": "char", "store": True, "string": "Name"},
+                "display_name": {"type": "char", "store": False, "string": "Display Name"},
+                "write_date": {"type": "datetime", "store": True, "string": "Last Updated on"},
+                "padding": {"type": "text", "store": True, "string": "Padding"},
+                "image_1920": {"type": "binary", "store": True, "string": "Image"},
+            }
+        if model_method == "create":
+            values = call_args[0]
+            if isinstance(values, list):
+                return [next(self._ids) for _ in values]
+            return next(self._ids)
+        if model_method in ("write", "unlink"):
+            return True
+        raise xmlrpc.client.Fault(1, f"Method not available {model_method}")
+
+
+class FakeOdooHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # 🔹 Cabeceras y cuerpo en un solo send(): evita el retraso Nagle + delayed ACK
+    wbufsize = 64 * 1024
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        odoo = self.server.odoo
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if self.path == "/jsonrpc":
+            request = json.loads(body)
+            params = request.get("params", {})
+            try:
+                result = odoo.dispatch(params.get("service"), params.get("method"), params.get("args", []))
+                response = {"jsonrpc": "2.0", "id": request.get("id"), "result": result}
+            except xmlrpc.client.Fault as e:
+                name, _, message = e.faultString.partition(": ")
+                response = {"jsonrpc": "2.0", "id": request.get("id"), "error": {
+                    "code": 200, "message": "Odoo Server Error",
+                    "data": {"name": name if message else "", "message": message or e.faultString},
+                }}
+            data = json.dumps(response).encode("utf-8")
+            content_type = "application/json"
+        elif self.path.startswith("/xmlrpc/2/"):
+            params, method = xmlrpc.client.loads(body)
+            try:
+                result = odoo.dispatch(self.path.rsplit("/", 1)[-1], method, params)
+                data = xmlrpc.client.dumps((result,), methodresponse=True, allow_none=True)
+            except xmlrpc.client.Fault as e:
+                data = xmlrpc.client.dumps(e, methodresponse=True)
+            data = data.encode("utf-8")
+            content_type = "text/xml"
+        else:
+            self.send_error(404)
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+def start_server(host="127.0.0.1", port=0, **options):
+    """Arranca el servidor en un hilo y devuelve ``(server, url)``."""
+    server = ThreadingHTTPServer((host, port), FakeOdooHandler)
+    server.daemon_threads = True
+    server.odoo = FakeOdoo(**options)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor Odoo de mentira para benchmarks")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8069)
+    parser.add_argument("--latency-ms", type=float, default=0, help="Latencia añadida a cada RPC")
+    parser.add_argument("--rows", type=int, default=100, help="Registros devueltos por search_read")
+    parser.add_argument("--row-size", type=int, default=64, help="Bytes de relleno por registro")
+    parser.add_argument("--password", default="admin")
+    args = parser.parse_args()
+
+    server, url = start_server(args.host, args.port, latency_ms=args.latency_ms, rows=args.rows,
+                               row_size=args.row_size, password=args.password)
+    print(f"Fake Odoo escuchando en {url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+"""Harness de rendimiento: req/s, p50/p95/p99 y pico de RSS por escenario.
+
+Cada escenario arranca la API desde cero (para que el pico de RSS sea suyo)
+contra el Odoo de mentira y la carga a una o varias concurrencias. El
+resultado se guarda en JSON para compararlo con otra ejecución.
+
+Uso:
+    python -m bench.harness --latency-ms 20 --concurrency 1,10,50 --duration 10
+    python -m bench.harness --scenarios get_records,create_user_core --mode asgi
+    python -m bench.harness --compare bench/results/antes.json bench/results/despues.json
+"""
+import argparse
+import json
+import subprocess
+import sys
+import time
+from pathlib import Path
+from urllib.parse import urlencode
+from bench.common import (BENCH_INSTANCE, BENCH_PASSWORD, BENCH_TOKEN, ROOT, cleanup_database, free_port,
+                          peak_rss_kb, prepare_database, print_json, run_load, start_api, stop_api)
+from bench.fake_odoo import start_server
+
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+
+JSON_HEADERS = {"Authorization": BENCH_TOKEN, "Content-Type": "application/json"}
+# Las vistas de asistencia se autentican con las credenciales del empleado, sin token
+EMPLOYEE = {"instance_name": BENCH_INSTANCE, "login": "empleado", "password": BENCH_PASSWORD}
+
+
+def _scenarios(args):
+    """Escenario → ``make_request(i)`` para ``run_load``."""
+    return {
+        "get_records": lambda i: (
+            "GET", f"/api/get_records/?model=res.partner&limit={args.rows}", None, {"Authorization": BENCH_TOKEN},
+        ),
+        "create_record": lambda i: (
+            "POST", "/api/create_record/",
+            json.dumps({"model": "res.partner", "values": {"name": f"Bench {i}"}}), JSON_HEADERS,
+        ),
+        "get_asistencia_records": lambda i: (
+            "GET", f"/api/get_asistencia_records/?{urlencode(EMPLOYEE)}", None, {},
+        ),
+        "create_asistencia_record": lambda i: (
+            "POST", "/api/create_asistencia_record/",
+            json.dumps({**EMPLOYEE, "values": {"empleadoId": 1, "horaIngreso": "2025-01-01 08:00:00"}}),
+            {"Content-Type": "application/json"},
+        ),
+        "update_asistencia_record": lambda i: (
+            "PUT", "/api/update_asistencia_record/",
+            json.dumps({**EMPLOYEE, "id": 1, "values": {"horaSalida": "2025-01-01 17:00:00"}}),
+            {"Content-Type": "application/json"},
+        ),
+        "create_user_core": lambda i: (
+            "POST", "/api/create_user_core/",
+            json.dumps({"name": f"Bench {i}", "login": f"bench{i}", "email": f"bench{i}@example.com",
+                        "password_new": "secret", "tipo": "Nivel 1"}),
+            JSON_HEADERS,
+        ),
+    }
+
+
+def _git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args):
+    scenarios = _scenarios(args)
+    selected = args.scenarios.split(",") if args.scenarios else list(scenarios)
+    unknown = [name for name in selected if name not in scenarios]
+    if unknown:
+        sys.exit(f"Escenarios desconocidos: {', '.join(unknown)} (disponibles: {', '.join(scenarios)})")
+    levels = [int(level) for level in args.concurrency.split(",")]
+
+    # El Odoo de mentira corre en este proceso; la API en subprocesos
+    _, odoo_url = start_server(latency_ms=args.latency_ms, rows=args.rows, row_size=args.row_size)
+    prepare_database(odoo_url)
+    try:
+        results = {
+            "config": {key: value for key, value in vars(args).items() if key not in ("compare", "output")},
+            "revision": _git_revision(),
+            "started_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "scenarios": {},
+        }
+        for name in selected:
+            port = free_port()
+            proc = start_api(args.mode, port, workers=args.workers, threads=args.threads)
+            try:
+                runs = {}
+                for level in levels:
+                    runs[str(level)] = run_load(f"http://127.0.0.1:{port}", scenarios[name],
+                                                concurrency=level, duration=args.duration)
+                    print(f"{name} c={level}: {runs[str(level)]['rps']} req/s, "
+                          f"p95 {runs[str(level)]['latency_ms']['p95']} ms", file=sys.stderr)
+                results["scenarios"][name] = {"runs": runs, "peak_rss_kb": peak_rss_kb(proc.pid)}
+            finally:
+                stop_api(proc)
+    finally:
+        cleanup_database()
+    return results
+
+
+def compare(base_path, new_path):
+    """Tabla de diferencias entre dos ejecuciones (positivo = más req/s o más latencia)."""
+    base = json.loads(Path(base_path).read_text())
+    new = json.loads(Path(new_path).read_text())
+
+    def delta(old, current):
+        return f"{(current - old) / old * 100:+.1f}%" if old else "n/a"
+
+    print(f"{'escenario':<26}{'c':>5}{'req/s':>18}{'p50':>10}{'p95':>10}{'p99':>10}{'rss':>10}")
+    for name, scenario in new["scenarios"].items():
+        previous = base["scenarios"].get(name)
+        if not previous:
+            continue
+        rss_old = (previous.get("peak_rss_kb") or {}).get("total", 0)
+        rss_new = (scenario.get("peak_rss_kb") or {}).get("total", 0)
+        for level, current in scenario["runs"].items():
+            old = previous["runs"].get(level)
+            if not old:
+                continue
+            print(f"{name:<26}{level:>5}"
+                  f"{current['rps']:>10} {delta(old['rps'], current['rps']):>7}"
+                  f"{delta(old['latency_ms']['p50'], current['latency_ms']['p50']):>10}"
+                  f"{delta(old['latency_ms']['p95'], current['latency_ms']['p95']):>10}"
+                  f"{delta(old['latency_ms']['p99'], current['latency_ms']['p99']):>10}"
+                  f"{delta(rss_old, rss_new):>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scenarios", help="Lista separada por comas (por defecto, todos)")
+    parser.add_argument("--concurrency", default="1,10,50", help="Niveles de concurrencia separados por comas")
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--mode", choices=["wsgi", "asgi"], default="wsgi")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--latency-ms", type=float, default=20, help="Latencia del Odoo de mentira por RPC")
+    parser.add_argument("--rows", type=int, default=50, help="Registros devueltos por search_read")
+    parser.add_argument("--row-size", type=int, default=64, help="Bytes de relleno por registro")
+    parser.add_argument("--output", help="Archivo JSON de salida (por defecto bench/results/<fecha>-<rev>.json)")
+    parser.add_argument("--compare", nargs=2, metavar=("BASE", "NUEVO"), help="Compara dos resultados y sale")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    results = run(args)
+    output = Path(args.output) if args.output else (
+        RESULTS_DIR / f"{time.strftime('%Y%m%d-%H%M%S')}-{results['revision'] or 'local'}.json"
+    )
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(results, indent=2, ensure_ascii=False))
+    print_json(results)
+    print(f"Resultados guardados en {output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,356 @@
+"""Modelo de tráfico a partir de ``api_logs.log`` y reproducción a 1x–Nx.
+
+``model`` recorre los logs línea a línea (sin cargarlos en memoria) y extrae de
+las líneas de acceso de ``basehttp`` la mezcla de endpoints, los tiempos entre
+llegadas y los tamaños de respuesta. De los query strings solo se guardan los
+nombres de los parámetros: los logs llevan contraseñas en claro.
+
+``replay`` genera llegadas muestreando ese modelo (lazo abierto: las peticiones
+salen a su hora aunque el servidor vaya atrasado) contra una API que arranca
+apuntando al Odoo de mentira, o contra ``--url`` si ya hay una corriendo.
+
+Uso:
+    python -m bench.replay model api_logs.log --output bench/results/trafico.json
+    python -m bench.replay replay bench/results/trafico.json --speed 10 --duration 30
+    python -m bench.replay replay bench/results/trafico.json --exclude "^GET /favicon" --speed 50
+"""
+import argparse
+import bisect
+import gzip
+import http.client
+import json
+import queue
+import random
+import re
+import statistics
+import sys
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from urllib.parse import parse_qsl, urlencode, urlsplit
+from bench.common import (BENCH_TOKEN, cleanup_database, free_port, percentile, prepare_database, print_json,
+                          start_api, stop_api)
+from bench.fake_odoo import start_server
+from bench.harness import EMPLOYEE, JSON_HEADERS
+
+# INFO 2025-03-20 15:36:22,568 basehttp "GET /api/...?a=b HTTP/1.1" 200 144
+ACCESS_LINE = re.compile(
+    r'^\w+ (?P<ts>\d{4}-\d\d-\d\d \d\d:\d\d:\d\d,\d{3}) basehttp '
+    r'"(?P<method>[A-Z]+) (?P<target>\S+) HTTP/[\d.]+" (?P<status>\d{3}) (?P<size>\d+)'
+)
+RESERVOIR_SIZE = 5000
+SIZE_SAMPLES = 200
+# Tamaño aproximado de un registro de res.partner del Odoo de mentira en la respuesta JSON
+FAKE_ROW_BYTES = 180
+
+
+def _open_log(path):
+    if str(path).endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8", errors="replace")
+    return open(path, encoding="utf-8", errors="replace")
+
+
+def parse_access_lines(paths):
+    """Genera ``(timestamp, método, path, claves_query, status, tamaño)`` en orden de archivo."""
+    for path in paths:
+        with _open_log(path) as log_file:
+            for line in log_file:
+                match = ACCESS_LINE.match(line)
+                if not match:
+                    continue
+                target = urlsplit(match["target"])
+                yield (
+                    datetime.strptime(match["ts"], "%Y-%m-%d %H:%M:%S,%f").timestamp(),
+                    match["method"],
+                    target.path,
+                    sorted({key for key, _ in parse_qsl(target.query, keep_blank_values=True)}),
+                    int(match["status"]),
+                    int(match["size"]),
+                )
+
+
+class Reservoir:
+    """Muestra uniforme de tamaño fijo sobre un flujo de longitud desconocida (algoritmo R)."""
+
+    def __init__(self, size, rng):
+        self.size = size
+        self.rng = rng
+        self.seen = 0
+        self.items = []
+
+    def add(self, value):
+        self.seen += 1
+        if len(self.items) < self.size:
+            self.items.append(value)
+        else:
+            index = self.rng.randrange(self.seen)
+            if index < self.size:
+                self.items[index] = value
+
+
+def _summary(values):
+    values = sorted(values)
+    if not values:
+        return {}
+    return {"mean": round(statistics.fmean(values), 3), "p50": percentile(values, 50),
+            "p95": percentile(values, 95), "max": values[-1]}
+
+
+def build_model(paths, max_idle=60.0, seed=0):
+    """Modelo de tráfico en una sola pasada; memoria acotada por los reservorios."""
+    rng = random.Random(seed)
+    endpoints = {}
+    gaps = Reservoir(RESERVOIR_SIZE, rng)
+    previous = first = last = None
+    total = idle_breaks = 0
+
+    for ts, method, path, query_keys, status, size in parse_access_lines(paths):
+        total += 1
+        first = ts if first is None else first
+        last = ts
+        if previous is not None:
+            gap = ts - previous
+            # 🔹 Huecos largos (noche, servidor parado) no son tiempo entre llegadas
+            if 0 <= gap <= max_idle:
+                gaps.add(gap)
+            else:
+                idle_breaks += 1
+        previous = ts
+
+        key = f"{method} {path}"
+        endpoint = endpoints.get(key)
+        if endpoint is None:
+            endpoint = endpoints[key] = {"count": 0, "status": {}, "query_keys": set(),
+                                         "sizes": Reservoir(SIZE_SAMPLES, rng)}
+        endpoint["count"] += 1
+        endpoint["status"][str(status)] = endpoint["status"].get(str(status), 0) + 1
+        endpoint["query_keys"].update(query_keys)
+        endpoint["sizes"].add(size)
+
+    return {
+        "source": [str(path) for path in paths],
+        "requests": total,
+        "span_seconds": round(last - first, 3) if total else 0,
+        "inter_arrival": {"max_idle": max_idle, "idle_breaks": idle_breaks,
+                          **_summary(gaps.items), "samples": [round(gap, 4) for gap in gaps.items]},
+        "endpoints": {
+            key: {
+                "count": data["count"],
+                "share": round(data["count"] / total, 5),
+                "status": data["status"],
+                "query_keys": sorted(data["query_keys"]),
+                "size": _summary(data["sizes"].items),
+                "size_samples": data["sizes"].items,
+            }
+            for key, data in sorted(endpoints.items(), key=lambda item: -item[1]["count"])
+        },
+    }
+
+
+def _request_for(method, path, size, i):
+    """Petición equivalente para la API de benchmark: ``(método, ruta, cuerpo, headers)``."""
+    token = {"Authorization": BENCH_TOKEN}
+    if path == "/api/get_records/":
+        # El tamaño registrado decide cuántas filas se piden
+        return method, f"{path}?model=res.partner&limit={max(1, size // FAKE_ROW_BYTES)}", None, token
+    if path in ("/api/get_asistencia_records/", "/api/async/get_asistencia_records/"):
+        return method, f"{path}?{urlencode(EMPLOYEE)}", None, {}
+    if method == "OPTIONS":
+        return method, path, None, {"Origin": "http://localhost", "Access-Control-Request-Method": "POST"}
+
+    bodies = {
+        "/api/verify_odoo_user/": ({**EMPLOYEE}, {}),
+        "/api/create_asistencia_record/": ({**EMPLOYEE, "values": {"empleadoId": 1}}, {}),
+        "/api/update_asistencia_record/": ({**EMPLOYEE, "id": 1, "values": {"horaSalida": "2025-01-01 17:00:00"}}, {}),
+        "/api/create_record/": ({"model": "res.partner", "values": {"name": f"Replay {i}"}}, token),
+        "/api/update_record/": ({"model": "res.partner", "id": 1, "values": {"name": f"Replay {i}"}}, token),
+        "/api/delete_record/": ({"model": "res.partner", "id": 1}, token),
+        "/api/create_user_core/": ({"name": f"Replay {i}", "login": f"replay{i}", "email": f"replay{i}@example.com",
+                                    "password_new": "secret", "tipo": "Nivel 1"}, token),
+        "/api/register_odoo_instance/": ({"name": f"replay-{i}-{time.monotonic_ns()}", "url": "http://127.0.0.1:1",
+                                          "database": "replay", "username": "admin", "password": "admin"}, {}),
+        # Un token inexistente: no se revoca el token de benchmark
+        "/api/revoke_token/": ({"token": "replay-unknown-token"}, {}),
+    }
+    if path in bodies:
+        body, headers = bodies[path]
+        return method, path, json.dumps(body), {**JSON_HEADERS, **headers}
+    # Rutas que ya no existen o no necesitan cuerpo se repiten tal cual (404/401 también cuestan)
+    return method, path, None, token
+
+
+class Sampler:
+    """Muestrea endpoint, tamaño y tiempo entre llegadas del modelo."""
+
+    def __init__(self, model, speed, exclude=None, seed=0):
+        self.rng = random.Random(seed)
+        pattern = re.compile(exclude) if exclude else None
+        self.keys, cumulative, total = [], [], 0
+        for key, endpoint in model["endpoints"].items():
+            if pattern and pattern.search(key):
+                continue
+            total += endpoint["count"]
+            self.keys.append(key)
+            cumulative.append(total)
+        if not self.keys:
+            raise ValueError("No queda ningún endpoint tras aplicar --exclude")
+        self.cumulative = cumulative
+        self.total = total
+        self.sizes = {key: model["endpoints"][key]["size_samples"] or [0] for key in self.keys}
+        # Al excluir endpoints la tasa de llegadas baja en la misma proporción
+        kept = total / max(1, sum(endpoint["count"] for endpoint in model["endpoints"].values()))
+        self.gaps = [gap / speed / kept for gap in model["inter_arrival"]["samples"]] or [1.0 / speed]
+
+    def next(self):
+        key = self.keys[bisect.bisect_right(self.cumulative, self.rng.randrange(self.total))]
+        return key, self.rng.choice(self.sizes[key]), self.rng.choice(self.gaps)
+
+
+def replay(base_url, sampler, duration, max_concurrency):
+    """Lazo abierto: un hilo programa las llegadas y ``max_concurrency`` hilos las envían.
+
+    Si todos los hilos están ocupados la petición espera en cola; ese retraso
+    se reporta como ``lag_ms`` (y está incluido en la latencia observada).
+    """
+    parts = urlsplit(base_url)
+    pending = queue.Queue()
+    stats = {}
+    lock = threading.Lock()
+
+    def sender():
+        conn = http.client.HTTPConnection(parts.hostname, parts.port, timeout=60)
+        while True:
+            item = pending.get()
+            if item is None:
+                break
+            key, scheduled, request = item
+            started = time.monotonic()
+            method, path, body, headers = request
+            for attempt in range(2):
+                try:
+                    conn.request(method, path, body=body, headers=headers)
+                    resp = conn.getresponse()
+                    size = len(resp.read())
+                    status = str(resp.status)
+                    break
+                except Exception as e:
+                    conn.close()
+                    conn = http.client.HTTPConnection(parts.hostname, parts.port, timeout=60)
+                    size, status = 0, type(e).__name__
+                    # 🔹 El servidor cierra conexiones keep-alive ociosas: se reintenta una vez
+                    if not isinstance(e, (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError)):
+                        break
+            finished = time.monotonic()
+            with lock:
+                entry = stats.setdefault(key, {"latency": [], "lag": [], "status": {}, "size": []})
+                entry["latency"].append((finished - scheduled) * 1000)
+                entry["lag"].append((started - scheduled) * 1000)
+                entry["status"][status] = entry["status"].get(status, 0) + 1
+                entry["size"].append(size)
+        conn.close()
+
+    threads = [threading.Thread(target=sender, daemon=True) for _ in range(max_concurrency)]
+    for thread in threads:
+        thread.start()
+
+    start = time.monotonic()
+    next_at, i = start, 0
+    while next_at - start < duration:
+        delay = next_at - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        key, size, gap = sampler.next()
+        method, path = key.split(" ", 1)
+        pending.put((key, next_at, _request_for(method, path, size, i)))
+        i += 1
+        next_at += gap
+    for _ in threads:
+        pending.put(None)
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - start
+
+    report = {"offered": i, "offered_rps": round(i / duration, 2), "achieved_rps": round(i / elapsed, 2),
+              "endpoints": {}}
+    all_latencies = []
+    for key, entry in sorted(stats.items(), key=lambda item: -len(item[1]["latency"])):
+        latencies, lags = sorted(entry["latency"]), sorted(entry["lag"])
+        all_latencies.extend(latencies)
+        report["endpoints"][key] = {
+            "requests": len(latencies),
+            "p50_ms": round(percentile(latencies, 50), 2),
+            "p95_ms": round(percentile(latencies, 95), 2),
+            "p99_ms": round(percentile(latencies, 99), 2),
+            "lag_p95_ms": round(percentile(lags, 95), 2),
+            "status": entry["status"],
+            "mean_size": round(statistics.fmean(entry["size"])),
+        }
+    all_latencies.sort()
+    report["latency_ms"] = {"p50": round(percentile(all_latencies, 50), 2),
+                            "p95": round(percentile(all_latencies, 95), 2),
+                            "p99": round(percentile(all_latencies, 99), 2)}
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    model_parser = commands.add_parser("model", help="Construye el modelo de tráfico desde los logs")
+    model_parser.add_argument("logs", nargs="+", help="Archivos de log (admite rotados y .gz)")
+    model_parser.add_argument("--max-idle", type=float, default=60.0,
+                              help="Huecos mayores (s) se consideran inactividad, no tiempo entre llegadas")
+    model_parser.add_argument("--output", help="Archivo JSON de salida (por defecto, stdout)")
+
+    replay_parser = commands.add_parser("replay", help="Reproduce un modelo contra la API")
+    replay_parser.add_argument("model", help="JSON generado por el subcomando model")
+    replay_parser.add_argument("--speed", type=float, default=1.0, help="Multiplicador de la tasa de llegadas")
+    replay_parser.add_argument("--duration", type=float, default=30)
+    replay_parser.add_argument("--exclude", help="Regex sobre 'MÉTODO /ruta' de endpoints a ignorar")
+    replay_parser.add_argument("--max-concurrency", type=int, default=64)
+    replay_parser.add_argument("--seed", type=int, default=0)
+    replay_parser.add_argument("--url", help="API ya corriendo (debe tener el token e instancia de benchmark)")
+    replay_parser.add_argument("--mode", choices=["wsgi", "asgi"], default="wsgi")
+    replay_parser.add_argument("--workers", type=int, default=2)
+    replay_parser.add_argument("--threads", type=int, default=4)
+    replay_parser.add_argument("--latency-ms", type=float, default=20, help="Latencia del Odoo de mentira")
+    replay_parser.add_argument("--output", help="Guarda el reporte en JSON")
+    args = parser.parse_args()
+
+    if args.command == "model":
+        model = build_model(args.logs, max_idle=args.max_idle)
+        if args.output:
+            Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+            Path(args.output).write_text(json.dumps(model, ensure_ascii=False))
+            print(f"{model['requests']} peticiones, {len(model['endpoints'])} endpoints → {args.output}",
+                  file=sys.stderr)
+        else:
+            print_json(model)
+        return
+
+    sampler = Sampler(json.loads(Path(args.model).read_text()), args.speed, args.exclude, args.seed)
+    proc = None
+    base_url = args.url
+    if not base_url:
+        # El Odoo de mentira corre en este proceso; la API en un subproceso
+        _, odoo_url = start_server(latency_ms=args.latency_ms)
+        prepare_database(odoo_url)
+        port = free_port()
+        proc = start_api(args.mode, port, workers=args.workers, threads=args.threads)
+        base_url = f"http://127.0.0.1:{port}"
+    try:
+        report = replay(base_url, sampler, args.duration, args.max_concurrency)
+    finally:
+        if proc:
+            stop_api(proc)
+            cleanup_database()
+
+    report["config"] = {key: value for key, value in vars(args).items() if key != "command"}
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2, ensure_ascii=False))
+    print_json(report)
+
+
+if __name__ == "__main__":
+    main()
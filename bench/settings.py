@@ -0,0 +1,47 @@
+"""Settings para benchmarks: sin Redis y con una base SQLite temporal (o una PostgreSQL de pruebas).
+
+Nunca usan la base de ``POSTGRES_DB``: los benchmarks crean instancias con
+tokens fijos. Para medir PostgreSQL se indica una base dedicada con
+``BENCH_POSTGRES_DB`` (el resto de la conexión sale de ``POSTGRES_*``).
+"""
+import os
+from django.core.exceptions import ImproperlyConfigured
+from DjangoProject.settings import *  # noqa: F401,F403
+
+DEBUG = False
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    }
+}
+
+BENCH_POSTGRES_DB = os.environ.get("BENCH_POSTGRES_DB")
+if BENCH_POSTGRES_DB:
+    if BENCH_POSTGRES_DB == os.environ.get("POSTGRES_DB"):
+        raise ImproperlyConfigured("BENCH_POSTGRES_DB no puede ser la base de la API (POSTGRES_DB)")
+    DATABASES = {
+        "default": {
+            "ENGINE": "django.db.backends.postgresql",
+            "NAME": BENCH_POSTGRES_DB,
+            "USER": os.environ.get("POSTGRES_USER", "postgres"),
+            "PASSWORD": os.environ.get("POSTGRES_PASSWORD", ""),
+            "HOST": os.environ.get("POSTGRES_HOST", "127.0.0.1"),
+            "PORT": os.environ.get("POSTGRES_PORT", "5432"),
+        }
+    }
+else:
+    DATABASES = {
+        "default": {
+            "ENGINE": "django.db.backends.sqlite3",
+            "NAME": os.environ.get("BENCH_DB", "/tmp/api_odoo_bench.sqlite3"),
+        }
+    }
+
+CORS_ALLOWED_ORIGINS = []
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "root": {"level": "WARNING"},
+}
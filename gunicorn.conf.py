@@ -0,0 +1,55 @@
+"""Configuración de gunicorn (se carga sola desde el directorio de trabajo).
+
+Con ``PROMETHEUS_MULTIPROC_DIR`` definido, las métricas de todos los workers se
+agregan en ``/api/metrics/`` (ver ``api/metrics.py``).
+
+Con ``LOG_SOCKET`` definido, el máster es el único que escribe y rota
+``api_logs.log``; los workers le envían los registros por ese socket (ver
+``api/log_handlers.py``).
+"""
+import glob
+import logging.config
+import os
+
+multiproc_dir = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+log_socket = os.environ.get("LOG_SOCKET")
+log_server = None
+
+
+def _start_log_server():
+    from api.log_handlers import LogSocketServer
+    from DjangoProject import settings
+
+    # Se construye solo el handler del archivo; dictConfig reemplazaría el logging de gunicorn
+    configurator = logging.config.DictConfigurator({
+        "formatters": settings.LOG_FORMATTERS,
+        "handlers": {"file": settings.LOG_FILE_HANDLER},
+    })
+    formatters = configurator.config["formatters"]
+    name = settings.LOG_FILE_HANDLER["formatter"]
+    formatters[name] = configurator.configure_formatter(formatters[name])
+    handler = configurator.configure_handler(configurator.config["handlers"]["file"])
+    return LogSocketServer(log_socket, handler).start()
+
+
+def on_starting(server):
+    global log_server
+    # Los archivos de una ejecución anterior falsearían los contadores
+    if multiproc_dir:
+        os.makedirs(multiproc_dir, exist_ok=True)
+        for path in glob.glob(os.path.join(multiproc_dir, "*.db")):
+            os.remove(path)
+    # Antes de arrancar los workers, para que encuentren el socket
+    if log_socket:
+        log_server = _start_log_server()
+
+
+def on_exit(server):
+    if log_server is not None:
+        log_server.stop()
+
+
+def child_exit(server, worker):
+    if multiproc_dir:
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)